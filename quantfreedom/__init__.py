@@ -1,6 +1,9 @@
 # Import version
 import os
-os.environ["NUMBA_CACHE_DIR"]="numba_cache"
+from quantfreedom._cache_dir import get_numba_cache_dir
+
+# has to be set before numba gets imported, a NUMBA_CACHE_DIR you set yourself is kept
+os.environ.setdefault("NUMBA_CACHE_DIR", get_numba_cache_dir())
 
 from quantfreedom._version import __version__ as _version
 
@@ -8,18 +11,194 @@ __version__ = _version
 
 
 # Most important classes
-from quantfreedom import *
-from quantfreedom.utils import *
-from quantfreedom.data import *
-from quantfreedom.base import *
-from quantfreedom.enums import *
-from quantfreedom.nb import *
-from quantfreedom.indicators import *
-from quantfreedom.evaluators import *
-from quantfreedom.plotting import *
-
-# silence NumbaExperimentalFeatureWarning
-import warnings
-from numba.core.errors import NumbaExperimentalFeatureWarning
-
-warnings.filterwarnings("ignore", category=NumbaExperimentalFeatureWarning)
\ No newline at end of file
+# nothing past this point gets imported until you use it, so import quantfreedom in a backtest
+# worker never has to load dash, plotly, ccxt or talib. qf.backtest_df_only only loads base,
+# qf.strat_dashboard only loads plotting and so on
+_lazy_subpackages = (
+    "base",
+    "data",
+    "enums",
+    "evaluators",
+    "indicators",
+    "nb",
+    "plotting",
+    "utils",
+)
+
+_lazy_modules = {
+    "quantfreedom.base.base": ("backtest_df_only",),
+    "quantfreedom.base.sharded": (
+        "create_backtest_shards",
+        "load_spilled_results",
+        "run_df_backtest_sharded",
+    ),
+    "quantfreedom.data.data_dl": (
+        "data_download_from_ccxt",
+        "data_download_from_ccxt_async",
+    ),
+    "quantfreedom.data.price_store": (
+        "load_price_store_index",
+        "load_prices",
+        "load_volume",
+        "save_prices",
+    ),
+    "quantfreedom.enums.enums": (
+        "AccountState",
+        "Arrays1dTuple",
+        "EntryOrder",
+        "LeverageMode",
+        "OrderResult",
+        "OrderStatus",
+        "OrderStatusInfo",
+        "OrderType",
+        "RejectedOrderError",
+        "ResultFilterOp",
+        "ResultMetric",
+        "SL_BE_or_Trail_BasedOn",
+        "SizeType",
+        "StateField",
+        "StaticVariables",
+        "StopsOrder",
+        "TradeMetricField",
+        "final_array_dt",
+        "or_dt",
+        "settings_array_dt",
+        "strat_df_array_dt",
+        "strat_records_dt",
+    ),
+    "quantfreedom.evaluators.evaluators": (
+        "combine_evals",
+        "is_above",
+        "is_below",
+    ),
+    "quantfreedom.indicators.cache": (
+        "IndicatorCache",
+        "get_indicator_cache",
+        "hash_arrays",
+        "set_indicator_cache",
+    ),
+    "quantfreedom.indicators.talib_ind": (
+        "from_talib",
+        "talib_func_list_website_link",
+        "talib_ind_info",
+        "talib_list_of_indicators",
+    ),
+    "quantfreedom.nb.buy_funcs": (
+        "long_decrease_nb",
+        "long_decrease_state_nb",
+        "long_increase_nb",
+        "long_increase_state_nb",
+    ),
+    "quantfreedom.nb.eval_funcs": (
+        "combine_evals_nb",
+        "eval_cols_nb",
+        "eval_user_args_nb",
+    ),
+    "quantfreedom.nb.execute_funcs": (
+        "check_sl_tp_nb",
+        "check_sl_tp_state_nb",
+        "process_order_nb",
+        "process_order_state_nb",
+    ),
+    "quantfreedom.nb.helper_funcs": (
+        "check_1d_arrays_nb",
+        "collect_result_nb",
+        "create_1d_arrays_nb",
+        "create_cart_product_nb",
+        "create_cart_slice_nb",
+        "create_cart_strides_nb",
+        "create_state_nb",
+        "create_stops_search_tables_nb",
+        "fill_order_records_nb",
+        "fill_settings_result_records_nb",
+        "fill_state_nb",
+        "fill_strat_records_nb",
+        "fill_strategy_result_records_nb",
+        "get_account_state_nb",
+        "get_block_order_settings_nb",
+        "get_cart_value_nb",
+        "get_collected_slots_nb",
+        "get_entries_col_signal_bars_nb",
+        "get_entries_signal_bars_nb",
+        "get_first_stop_hit_bar_nb",
+        "get_max_entries_signals_nb",
+        "get_order_result_nb",
+        "get_order_settings_nb",
+        "get_result_metric_nb",
+        "get_second_entries_signal_bars_nb",
+        "get_sharpe_ratio_nb",
+        "get_sortino_ratio_nb",
+        "get_stops_search_tables_nb",
+        "get_to_the_upside_nb",
+        "get_top_k_key_nb",
+        "passes_result_filters_nb",
+        "reset_state_nb",
+        "reset_trade_metrics_nb",
+        "select_top_k_nb",
+        "static_var_checker_nb",
+        "to_1d_array_nb",
+        "to_2d_array_nb",
+        "top_k_is_better_nb",
+        "top_k_sift_down_nb",
+        "top_k_sift_up_nb",
+        "top_k_swap_nb",
+        "update_trade_metrics_nb",
+    ),
+    "quantfreedom.nb.sell_funcs": (
+        "short_decrease_nb",
+        "short_decrease_state_nb",
+        "short_increase_nb",
+        "short_increase_state_nb",
+    ),
+    "quantfreedom.nb.simulate": (
+        "backtest_df_only_nb",
+        "backtest_df_only_parallel_nb",
+        "check_and_fill_df_results_nb",
+        "simulate_df_block_nb",
+        "simulate_df_lane_nb",
+        "simulate_up_to_6_nb",
+    ),
+    "quantfreedom.plotting.plotting_main": ("strat_dashboard",),
+    "quantfreedom.utils.helpers": (
+        "CombinedEntries",
+        "clear_cache",
+        "generate_candles",
+        "pack_entries",
+        "pretty",
+        "unpack_entries",
+    ),
+    "quantfreedom.utils.polars_frames": (
+        "get_polars_layout",
+        "pandas_to_polars",
+        "polars_to_pandas",
+    ),
+    "quantfreedom.utils.warmup": ("warmup",),
+}
+
+_lazy_imports = {
+    name: module_name for module_name, names in _lazy_modules.items() for name in names
+}
+
+__all__ = [
+    "get_numba_cache_dir",
+    *_lazy_subpackages,
+    *_lazy_imports,
+]
+
+
+def __getattr__(name: str):
+    import importlib
+
+    if name in _lazy_subpackages:
+        value = importlib.import_module(f"quantfreedom.{name}")
+    elif name in _lazy_imports:
+        value = getattr(importlib.import_module(_lazy_imports[name]), name)
+    else:
+        raise AttributeError(f"module 'quantfreedom' has no attribute '{name}'")
+    # so the next time it is just a normal attribute lookup
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
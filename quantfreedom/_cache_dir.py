@@ -0,0 +1,42 @@
+import os
+import platform
+import sys
+
+try:
+    from importlib import metadata
+except ImportError:
+    # importlib.metadata is only there from python 3.8
+    import importlib_metadata as metadata
+
+
+def get_numba_cache_dir() -> str:
+    """
+    Folder the compiled numba kernels get cached in.
+
+    It lives in the user cache folder and has its own sub folder for every numba version,
+    python version and cpu type, so the kernels only get compiled once no matter what folder
+    you run your code from, and upgrading numba or sharing a home folder between machines
+    never picks up a cache that doesn't fit.
+
+    Returns
+    -------
+    str
+        path of the numba cache folder
+    """
+    if sys.platform.startswith("win"):
+        cache_home = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    elif sys.platform == "darwin":
+        cache_home = os.path.expanduser("~/Library/Caches")
+    else:
+        cache_home = os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache"))
+
+    try:
+        numba_version = metadata.version("numba")
+    except metadata.PackageNotFoundError:
+        numba_version = "unknown"
+
+    return os.path.join(
+        cache_home,
+        "quantfreedom",
+        f"numba-{numba_version}-py{sys.version_info[0]}{sys.version_info[1]}-{platform.machine().lower()}",
+    )
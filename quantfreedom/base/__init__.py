@@ -1 +1,3 @@
 from quantfreedom.base.base import *
+from quantfreedom.base.sharded import *
+from quantfreedom.data import *
\ No newline at end of file
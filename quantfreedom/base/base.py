@@ -1,25 +1,179 @@
 import numpy as np
-import numpy as np
 import pandas as pd
+import polars as pl
 
-from quantfreedom.nb.simulate import backtest_df_only_nb
+from quantfreedom.nb.simulate import backtest_df_only_nb, backtest_df_only_parallel_nb
+from quantfreedom.base.sharded import run_df_backtest_sharded
 from quantfreedom.nb.helper_funcs import (
     static_var_checker_nb,
     create_1d_arrays_nb,
     check_1d_arrays_nb,
     create_cart_product_nb,
+    create_cart_strides_nb,
 )
 from quantfreedom._typing import (
+    Array1d,
+    Array2d,
     pdFrame,
+    plFrame,
     PossibleArray,
+    RecordArray,
+    Union,
+)
+from quantfreedom.utils.helpers import CombinedEntries
+from quantfreedom.utils.polars_frames import polars_to_pandas
+from quantfreedom.enums.enums import (
+    OrderType,
+    ResultFilterOp,
+    ResultMetric,
+    SL_BE_or_Trail_BasedOn,
 )
-from quantfreedom.enums.enums import OrderType, SL_BE_or_Trail_BasedOn
+
+_result_filter_ops = {
+    ">": ResultFilterOp.GreaterThan,
+    ">=": ResultFilterOp.GreaterThanOrEqual,
+    "<": ResultFilterOp.LessThan,
+    "<=": ResultFilterOp.LessThanOrEqual,
+}
+
+
+def _create_result_filters(
+    result_filters: list,
+) -> Array2d:
+    """
+    Turns a list of (metric, op, threshold) into the float array of rows the kernels check.
+    The metric can be a ResultMetric or its name and the op a ResultFilterOp or one of
+    > >= < <=.
+    """
+    if result_filters is None:
+        return np.empty((0, 3), dtype=np.float_)
+    rows = []
+    for result_filter in result_filters:
+        if len(result_filter) != 3:
+            raise ValueError("every result filter needs to be (metric, op, threshold)")
+        metric, op, threshold = result_filter
+        if isinstance(metric, str):
+            if metric not in ResultMetric._fields:
+                raise ValueError(f"{metric} isn't a ResultMetric")
+            metric = getattr(ResultMetric, metric)
+        if isinstance(op, str):
+            if op not in _result_filter_ops:
+                raise ValueError(f"result filter op {op} needs to be one of > >= < <=")
+            op = _result_filter_ops[op]
+        if not (0 <= metric < len(ResultMetric)) or metric != int(metric):
+            raise ValueError("result filter metric is invalid")
+        if not (0 <= op < len(ResultFilterOp)) or op != int(op):
+            raise ValueError("result filter op is invalid")
+        if np.isnan(threshold):
+            raise ValueError("result filter threshold can't be nan")
+        rows.append((int(metric), int(op), float(threshold)))
+    return np.array(rows, dtype=np.float_).reshape(-1, 3)
+
+
+def _get_strat_sort_idx(
+    strat_array: RecordArray,
+) -> Array1d:
+    """
+    Order of the strat records with the best to the upside first and then the best gains,
+    the same as sort_values(by=["to_the_upside", "gains_pct"], ascending=False). Ties stay
+    in backtest order and nans go last.
+    """
+    return np.lexsort((-strat_array["gains_pct"], -strat_array["to_the_upside"]))
+
+
+def _get_based_on_names(
+    based_on: Array1d,
+) -> Array1d:
+    names = np.array(SL_BE_or_Trail_BasedOn._fields, dtype=object)
+    based_on_names = based_on.astype(object)
+    is_set = ~np.isnan(based_on)
+    based_on_names[is_set] = names[based_on[is_set].astype(np.int_)]
+    return based_on_names
+
+
+def _create_strat_results_df(
+    strat_array: RecordArray,
+    sort_idx: Array1d,
+    symbols: list,
+) -> pdFrame:
+    sorted_array = strat_array[sort_idx]
+    columns = {name: sorted_array[name] for name in strat_array.dtype.names}
+    columns["symbol"] = pd.Categorical.from_codes(sorted_array["symbol"], categories=symbols)
+    return pd.DataFrame(columns, index=sort_idx)
+
+
+def _create_setting_results_df(
+    settings_array: RecordArray,
+    symbols: list,
+) -> pdFrame:
+    """
+    One column for every strategy in backtest order and one row for every setting that was
+    used by at least one of them.
+    """
+    symbol_names = np.array(symbols, dtype=object)
+    rows = {}
+    for name in settings_array.dtype.names:
+        values = settings_array[name]
+        if values.size == 0 or (values.dtype.kind == "f" and np.isnan(values).all()):
+            continue
+        if name == "symbol":
+            rows[name] = symbol_names[values]
+        elif name == "sl_to_be_based_on" or name == "tsl_based_on":
+            rows[name] = _get_based_on_names(values)
+        else:
+            rows[name] = values
+
+    setting_values = np.empty((len(rows), settings_array.size), dtype=object)
+    for row, values in enumerate(rows.values()):
+        setting_values[row] = values
+    # with the dtype given pandas doesn't look through every column for what type it is
+    return pd.DataFrame(setting_values, index=list(rows), dtype=object, copy=False)
+
+
+def _create_strat_results_pl(
+    strat_array: RecordArray,
+    sort_idx: Array1d,
+    symbols: list,
+) -> plFrame:
+    columns = {
+        name: np.take(strat_array[name], sort_idx) for name in strat_array.dtype.names
+    }
+    symbol_codes = columns["symbol"].astype(np.uint32)
+    columns["symbol"] = pl.Series(symbol_codes).cast(pl.Enum([str(s) for s in symbols]))
+    return pl.DataFrame(columns)
+
+
+def _create_setting_results_pl(
+    settings_array: RecordArray,
+    sort_idx: Array1d,
+    symbols: list,
+) -> plFrame:
+    """
+    One row for every strategy in the same order as the strat results and one column for
+    every setting that was used by at least one of them.
+    """
+    columns = {}
+    for name in settings_array.dtype.names:
+        values = np.take(settings_array[name], sort_idx)
+        if values.dtype.kind == "f" and values.size and np.isnan(values).all():
+            continue
+        if name == "symbol":
+            columns[name] = pl.Series(values.astype(np.uint32)).cast(
+                pl.Enum([str(s) for s in symbols])
+            )
+        elif name == "sl_to_be_based_on" or name == "tsl_based_on":
+            columns[name] = pl.Series(values).fill_nan(None).cast(pl.UInt32).cast(
+                pl.Enum(list(SL_BE_or_Trail_BasedOn._fields))
+            )
+        else:
+            columns[name] = values
+    return pl.DataFrame(columns)
 
 
 def backtest_df_only(
     # entry info
-    prices: pdFrame,
-    entries: pdFrame,
+    prices: Union[pdFrame, plFrame],
+    entries: Union[pdFrame, plFrame, CombinedEntries],
     # required account info
     equity: float,
     fee_pct: float,
@@ -59,8 +213,21 @@ def backtest_df_only(
     # Results Filters
     gains_pct_filter: float = -np.inf,
     total_trade_filter: int = 0,
-    divide_records_array_size_by: float = 1.0,  # between 1 and 1000
     upside_filter: float = -1.0,  # between -1 and 1
+    max_drawdown_pct_filter: float = np.inf,
+    equity_floor_pct_filter: float = 0.0,
+    result_filters: list = None,
+    # Results Collecting
+    top_k: int = 0,
+    top_k_metric: int = ResultMetric.to_the_upside,
+    spill_dir: str = None,
+    # Performance
+    parallel: bool = False,
+    max_workers: int = None,
+    order_settings_per_shard: int = None,
+    order_settings_block_size: int = 1,
+    lazy_cart_product: bool = True,
+    return_type: str = None,
 ) -> tuple[pdFrame, pdFrame]:
     """
     Function Name
@@ -77,10 +244,10 @@ def backtest_df_only(
     
     Parameters
     ----------
-    prices : pdFrame
-        Dataframe of prices
-    entries : pdFrame
-        Dataframe of entries
+    prices : pdFrame or plFrame
+        Dataframe of prices. A polars dataframe in the wide or long layout of polars_to_pandas works too.
+    entries : pdFrame, plFrame or CombinedEntries
+        Dataframe of entries, pandas or polars. These can also be entries packed into uint64 words by pack_entries, which take 8 times less memory, or the CombinedEntries you get from combine_evals with lazy=True, which never get created at all.
     equity : float
         Starting equity. I suggest only doing 100 or 1000 dollars
     fee_pct : float
@@ -142,26 +309,106 @@ def backtest_df_only(
     gains_pct_filter : float, -np.inf
         don't return any strategies that have gains less than the percent set here
     total_trade_filter : int, 0
-        don't return any strategies that have a total trade amount that is less than this filter
-    divide_records_array_size_by : float, 1.0
-        if you have a ton of combinations you are testing with very strict filters then put this number higher like 100 or more, if you have very low filters then set it to 10 or 5 or something and if you have absolutely no filters then leave this at 1. This basically saves you memory so if you have 5 mil combinations but strict filters then you could reduce the amount of rows by like 100 which would be 5000000 / 100 which would create 50,000 rows for the array instead of 5 million
+        don't return any strategies that have a total trade amount that is less than this filter. A strategy stops being backtested as soon as there aren't enough entries left for it to get past this filter.
     upside_filter : float, -1.0
         How you want to filter strategies that don't meet the to the upside numbers you want. Please watch the video to understand what to the upside is but it is basically the r2 value of the cumilative sum of the strategies pnl.
+    max_drawdown_pct_filter : float, np.inf
+        don't return any strategies where the equity, after a trade closes, drops more than this percent from its highest point. As soon as that happens the strategy stops being backtested so this also speeds things up a lot.
+    equity_floor_pct_filter : float, 0.0
+        don't return any strategies where the equity, after a trade closes, drops under this percent of your starting equity. As soon as that happens the strategy stops being backtested. Leave at 0 to turn it off.
+    result_filters : list, None
+        List of (metric, op, threshold) every strategy has to pass to be returned, like [("win_rate", ">=", 40.), ("max_drawdown_pct", "<", 20.)]. The metric is a ResultMetric or its name and op is one of > >= < <= or a ResultFilterOp, look in the enums api section for both. They are checked inside the backtest before a strategy is kept so the ones that fail never take up any memory. A max_drawdown_pct filter with < or <= and a total_trades filter with > or >= also stop a strategy early the same way max_drawdown_pct_filter and total_trade_filter do.
+    top_k : int, 0
+        Only keep the best top_k strategies that pass the filters. The memory used stays the same no matter how many combinations you test, so if you have millions of combinations this is what you want. Leave it at 0 to keep every strategy that passes the filters.
+    top_k_metric : int, ResultMetric.to_the_upside
+        What the best strategies are picked by when using top_k. Look in the enums api section for ResultMetric. Higher is better for every metric except max_drawdown_pct, max_drawdown_bars and longest_losing_streak where lower is better. If two strategies have the same number the one that was backtested first is kept.
+    spill_dir : str, None
+        Folder to write every strategy that passes the filters to instead of keeping them all in memory. The backtest is done one shard at a time and every shard gets written to its own .npy files. Use load_spilled_results to load them back. Can't be used with top_k.
+    parallel : bool, False
+        Set this to True to spread the backtest over all of your cpu cores. The results are exactly the same as the single core backtest, it just finishes faster when you have a lot of combinations.
+    max_workers : int, None
+        Set this to split the backtest into shards and run them in this many separate processes. Prices and entries are put in shared memory once so every process reads the same data. Use this for backtests that are too big for one process. Can't be used with parallel. The processes are started with spawn, so if you run this from a .py file put your code under if __name__ == "__main__":
+    order_settings_per_shard : int, None
+        How many order settings each process backtests at a time when using max_workers or spill_dir. By default it is picked so every process gets a few shards.
+    order_settings_block_size : int, 1
+        How many order settings get backtested together bar by bar. Every bar's prices are read once for the whole block instead of once for every order setting, which helps when you test a lot of order settings on a long price history. Something like 16 to 64 is a good place to start. The results are exactly the same no matter what you set this to.
+    lazy_cart_product : bool, True
+        Instead of creating every row of the cartesian product of your order settings up front, each order setting is worked out from your lists of settings when it is backtested. This means the amount of memory used doesn't grow with the amount of combinations. Set to False to create the full cartesian product first like before.
+    return_type : str, None
+        What you get back, by default "polars" if you sent prices or entries as polars frames and "pandas" if you didn't. "pandas" gives you the two dataframes with the symbol column of the strat results as a categorical. "records" gives you the strat and settings record arrays straight from the backtest without any copy, in the order they were backtested with the symbols as numbers. "polars" gives you two polars dataframes where the settings are one row per strategy lined up with the strat results.
 
     Returns
     -------
     tuple[pdFrame, pdFrame]
         First return is a dataframe of strategy results.
         Second return is a dataframe of the indicator and order settings.
+        If you used spill_dir you get back the lists of strat and settings file paths instead.
     """
+    polars_input = isinstance(prices, plFrame) or isinstance(entries, plFrame)
+    # the kernels read the one fortran ordered array these are built on without another copy
+    if isinstance(prices, plFrame):
+        prices = polars_to_pandas(prices)
+    if isinstance(entries, plFrame):
+        entries = polars_to_pandas(entries)
+    if return_type is None:
+        return_type = "polars" if polars_input else "pandas"
+    if return_type not in ("pandas", "polars", "records"):
+        raise ValueError('return_type needs to be "pandas", "polars" or "records"')
+
+    if parallel and max_workers is not None:
+        raise ValueError("You can't use parallel and max_workers at the same time")
+
+    if spill_dir is not None and top_k > 0:
+        raise ValueError("You can't use spill_dir and top_k at the same time")
+
+    if order_settings_block_size < 1:
+        raise ValueError("order_settings_block_size has to be at least 1")
+
+    if isinstance(entries, CombinedEntries):
+        first_entries = entries.first_entries
+        second_entries = entries.second_entries
+        entries_pairs = np.ascontiguousarray(entries.entries_pairs, dtype=np.int_)
+        if first_entries.shape[0] != second_entries.shape[0]:
+            raise ValueError("Both entries of combined entries need the same number of rows")
+    else:
+        first_entries = entries
+        second_entries = entries
+        entries_pairs = np.empty((0, 2), dtype=np.int_)
+
+    entries_are_packed = all(dtype == np.uint64 for dtype in first_entries.dtypes)
+    if entries_are_packed != all(dtype == np.uint64 for dtype in second_entries.dtypes):
+        raise ValueError("Both entries of combined entries need to be packed or both not packed")
+    if entries_are_packed and entries.shape[0] != -(-prices.shape[0] // 64):
+        raise ValueError("packed entries need one row for every 64 bars of prices")
+    # a bit past the last bar would be decoded as an entry on a bar prices doesn't have
+    if entries_are_packed and prices.shape[0] % 64:
+        for packed_entries in (first_entries, second_entries):
+            if (packed_entries.values[-1] >> np.uint64(prices.shape[0] % 64)).any():
+                raise ValueError("packed entries can't have bits set past the last bar of prices")
+
+    result_filters = _create_result_filters(result_filters)
+    # the filters that can be known to fail before the backtest is done also prune early
+    for metric, op, threshold in result_filters:
+        if not np.isfinite(threshold):
+            continue
+        if metric == ResultMetric.max_drawdown_pct and threshold > 0:
+            if op == ResultFilterOp.LessThan or op == ResultFilterOp.LessThanOrEqual:
+                max_drawdown_pct_filter = min(max_drawdown_pct_filter, threshold)
+        elif metric == ResultMetric.total_trades:
+            if op == ResultFilterOp.GreaterThan:
+                total_trade_filter = max(total_trade_filter, int(np.floor(threshold)))
+            elif op == ResultFilterOp.GreaterThanOrEqual:
+                total_trade_filter = max(total_trade_filter, int(np.ceil(threshold)) - 1)
+
     print("Checking static variables for errors or conflicts.")
     # Static checks
     static_variables_tuple = static_var_checker_nb(
-        divide_records_array_size_by=divide_records_array_size_by,
         equity=equity,
+        equity_floor_pct_filter=equity_floor_pct_filter,
         fee_pct=fee_pct,
         gains_pct_filter=gains_pct_filter,
         lev_mode=lev_mode,
+        max_drawdown_pct_filter=max_drawdown_pct_filter,
         max_lev=max_lev,
         max_order_size_pct=max_order_size_pct,
         max_order_size_value=max_order_size_value,
@@ -172,6 +419,8 @@ def backtest_df_only(
         size_type=size_type,
         sl_to_be_then_trail=sl_to_be_then_trail,
         sl_to_be=sl_to_be,
+        top_k=top_k,
+        top_k_metric=top_k_metric,
         total_trade_filter=total_trade_filter,
         tsl_true_or_false=tsl_true_or_false,
         upside_filter=upside_filter,
@@ -205,19 +454,24 @@ def backtest_df_only(
         static_variables_tuple=static_variables_tuple,
     )
 
-    print(
-        "Creating cartesian product ... after this the backtest will start, I promise :).\n"
-    )
-    cart_array_tuple = create_cart_product_nb(arrays_1d_tuple=arrays_1d_tuple)
+    if lazy_cart_product:
+        cart_array_tuple = arrays_1d_tuple
+        cart_strides = create_cart_strides_nb(arrays_1d_tuple=arrays_1d_tuple)
+    else:
+        print(
+            "Creating cartesian product ... after this the backtest will start, I promise :).\n"
+        )
+        cart_array_tuple = create_cart_product_nb(arrays_1d_tuple=arrays_1d_tuple)
+        cart_strides = np.ones(len(cart_array_tuple), dtype=np.int_)
 
     num_of_symbols = len(prices.columns.levels[0])
 
     # Creating Settings Vars
-    total_order_settings = cart_array_tuple.sl_pcts.shape[0]
+    total_order_settings = int(cart_strides[0] * cart_array_tuple[0].size)
 
     total_indicator_settings = entries.shape[1]
 
-    total_bars = entries.shape[0]
+    total_bars = prices.shape[0]
 
     # Printing out total numbers of things
     print(
@@ -238,42 +492,109 @@ def backtest_df_only(
         f"\nTotal combinations to test: {total_indicator_settings * total_order_settings:,}"
     )
 
-    strat_array, settings_array = backtest_df_only_nb(
-        cart_array_tuple=cart_array_tuple,
-        entries=entries.values,
-        gains_pct_filter=gains_pct_filter,
-        num_of_symbols=num_of_symbols,
-        og_equity=equity,
-        prices=prices.values,
-        static_variables_tuple=static_variables_tuple,
-        total_bars=total_bars,
-        total_indicator_settings=total_indicator_settings,
-        total_order_settings=total_order_settings,
-        total_trade_filter=total_trade_filter,
-    )
-
-    strat_results_df = pd.DataFrame(strat_array).sort_values(
-        by=["to_the_upside", "gains_pct"], ascending=False
-    )
+    # the same types and memory layout no matter what got passed in or how the dataframes were
+    # put together so the kernels only ever get compiled once, column order is also how the
+    # kernels read them
+    prices_values = np.asfortranarray(prices.values, dtype=np.float_)
+    entries_dtype = np.uint64 if entries_are_packed else np.bool_
+    entries_values = np.asfortranarray(first_entries.values, dtype=entries_dtype)
+    if entries_pairs.shape[0]:
+        second_entries_values = np.asfortranarray(second_entries.values, dtype=entries_dtype)
+    else:
+        # not combined, the kernels never read the second entries
+        second_entries_values = entries_values
+    equity = float(equity)
+    gains_pct_filter = float(gains_pct_filter)
+    total_trade_filter = int(total_trade_filter)
 
-    symbols = list(prices.columns.levels[0])
+    if spill_dir is not None:
+        # shards are run one after the other in this process unless max_workers is set
+        return run_df_backtest_sharded(
+            arrays_1d_tuple=arrays_1d_tuple,
+            cart_strides=create_cart_strides_nb(arrays_1d_tuple=arrays_1d_tuple),
+            entries=entries_values,
+            entries_pairs=entries_pairs,
+            gains_pct_filter=gains_pct_filter,
+            max_workers=1 if max_workers is None else max_workers,
+            num_of_symbols=num_of_symbols,
+            og_equity=equity,
+            order_settings_block_size=order_settings_block_size,
+            order_settings_per_shard=order_settings_per_shard,
+            prices=prices_values,
+            result_filters=result_filters,
+            second_entries=second_entries_values,
+            spill_dir=spill_dir,
+            static_variables_tuple=static_variables_tuple,
+            total_trade_filter=total_trade_filter,
+        )
+    elif max_workers is not None:
+        strat_array, settings_array = run_df_backtest_sharded(
+            arrays_1d_tuple=arrays_1d_tuple,
+            cart_strides=create_cart_strides_nb(arrays_1d_tuple=arrays_1d_tuple),
+            entries=entries_values,
+            entries_pairs=entries_pairs,
+            gains_pct_filter=gains_pct_filter,
+            max_workers=max_workers,
+            num_of_symbols=num_of_symbols,
+            og_equity=equity,
+            order_settings_block_size=order_settings_block_size,
+            order_settings_per_shard=order_settings_per_shard,
+            prices=prices_values,
+            result_filters=result_filters,
+            second_entries=second_entries_values,
+            static_variables_tuple=static_variables_tuple,
+            total_trade_filter=total_trade_filter,
+        )
+    else:
+        if parallel:
+            backtest_nb = backtest_df_only_parallel_nb
+        else:
+            backtest_nb = backtest_df_only_nb
 
-    for i in range(len(symbols)):
-        strat_results_df.replace({"symbol": {i: symbols[i]}}, inplace=True)
+        strat_array, settings_array = backtest_nb(
+            cart_array_tuple=cart_array_tuple,
+            cart_strides=cart_strides,
+            entries=entries_values,
+            entries_pairs=entries_pairs,
+            gains_pct_filter=gains_pct_filter,
+            num_of_symbols=num_of_symbols,
+            og_equity=equity,
+            order_settings_block_size=order_settings_block_size,
+            prices=prices_values,
+            result_filters=result_filters,
+            second_entries=second_entries_values,
+            static_variables_tuple=static_variables_tuple,
+            total_bars=total_bars,
+            total_indicator_settings=total_indicator_settings,
+            total_order_settings=total_order_settings,
+            total_trade_filter=total_trade_filter,
+        )
 
-    symbols = list(entries.columns.levels[0])
-    setting_results_df = pd.DataFrame(settings_array).dropna(axis="columns", thresh=1)
+    if return_type == "records":
+        return strat_array, settings_array
 
-    for i in range(len(SL_BE_or_Trail_BasedOn._fields)):
-        setting_results_df.replace(
-            {"tsl_based_on": {i: SL_BE_or_Trail_BasedOn._fields[i]}}, inplace=True
-        )
-        setting_results_df.replace(
-            {"sl_to_be_based_on": {i: SL_BE_or_Trail_BasedOn._fields[i]}}, inplace=True
+    sort_idx = _get_strat_sort_idx(strat_array)
+    if return_type == "polars":
+        return (
+            _create_strat_results_pl(
+                strat_array=strat_array,
+                sort_idx=sort_idx,
+                symbols=list(prices.columns.levels[0]),
+            ),
+            _create_setting_results_pl(
+                settings_array=settings_array,
+                sort_idx=sort_idx,
+                symbols=list(entries.columns.levels[0]),
+            ),
         )
-    for i in range(len(symbols)):
-        setting_results_df.replace({"symbol": {i: symbols[i]}}, inplace=True)
-
-    setting_results_df = setting_results_df.T
 
+    strat_results_df = _create_strat_results_df(
+        strat_array=strat_array,
+        sort_idx=sort_idx,
+        symbols=list(prices.columns.levels[0]),
+    )
+    setting_results_df = _create_setting_results_df(
+        settings_array=settings_array,
+        symbols=list(entries.columns.levels[0]),
+    )
     return strat_results_df, setting_results_df
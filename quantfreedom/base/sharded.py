@@ -0,0 +1,488 @@
+"""
+Multi-process sharded runner for backtest_df_only_nb.
+
+Prices and entries are copied once into shared memory and every worker process attaches to
+them instead of getting its own pickled copy. Each shard is a range of symbols and a range of
+order settings from the cartesian product. Workers only get the small 1d order settings arrays
+and create the rows of the cartesian product for their own shard, and the shard results are
+merged back into the exact order the single process backtest would have returned them in.
+
+With a spill_dir every shard writes its results to its own .npy files instead of sending them
+back, so keeping everything that passes the filters doesn't need it all to fit in memory.
+"""
+
+import os
+import numpy as np
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+from quantfreedom.nb.simulate import backtest_df_only_nb
+from quantfreedom.nb.helper_funcs import create_cart_slice_nb, select_top_k_nb
+from quantfreedom.enums.enums import (
+    Arrays1dTuple,
+    StaticVariables,
+    strat_df_array_dt,
+    settings_array_dt,
+)
+from quantfreedom._typing import Array1d, Array2d, RecordArray, Tuple
+
+__all__ = [
+    "run_df_backtest_sharded",
+    "create_backtest_shards",
+    "load_spilled_results",
+]
+
+# filled in each worker process by _init_shard_worker
+_worker_shared = {}
+
+
+def create_backtest_shards(
+    num_of_symbols: int,
+    total_order_settings: int,
+    max_workers: int,
+    order_settings_per_shard: int = None,
+) -> list:
+    """
+    Splits the backtest into (symbol_start, symbol_end, order_settings_start, order_settings_end) shards.
+
+    Parameters
+    ----------
+    num_of_symbols : int
+        number of symbols in prices
+    total_order_settings : int
+        number of rows in the cartesian product of order settings
+    max_workers : int
+        number of worker processes
+    order_settings_per_shard : int, None
+        how many order settings go in one shard. By default it is picked so every worker gets about 4 shards.
+
+    Returns
+    -------
+    list
+        list of shard tuples
+    """
+    if order_settings_per_shard is None:
+        shards_per_symbol = max(1, -(-max_workers * 4 // num_of_symbols))
+        order_settings_per_shard = -(-total_order_settings // shards_per_symbol)
+    order_settings_per_shard = max(1, int(order_settings_per_shard))
+
+    shards = []
+    for symbol in range(num_of_symbols):
+        for order_settings_start in range(
+            0, total_order_settings, order_settings_per_shard
+        ):
+            shards.append(
+                (
+                    symbol,
+                    symbol + 1,
+                    order_settings_start,
+                    min(order_settings_start + order_settings_per_shard, total_order_settings),
+                )
+            )
+    return shards
+
+
+def _to_shared_memory(array: np.ndarray) -> Tuple[shared_memory.SharedMemory, tuple]:
+    array = np.ascontiguousarray(array)
+    shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _from_shared_memory(shm_info: tuple) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+    name, shape, dtype = shm_info
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def _slice_symbols(
+    prices: Array2d,
+    entries: Array2d,
+    second_entries: Array2d,
+    entries_pairs: Array2d,
+    entries_per_symbol: int,
+    symbol_start: int,
+    symbol_end: int,
+) -> Tuple[Array2d, Array2d, Array2d, Array2d]:
+    entries_cols = slice(symbol_start * entries_per_symbol, symbol_end * entries_per_symbol)
+    if entries_pairs.shape[0]:
+        # combined entries keep the whole first and second entries, the pairs point into them
+        return (
+            prices[:, symbol_start * 4 : symbol_end * 4],
+            entries,
+            second_entries,
+            entries_pairs[entries_cols],
+        )
+    entries = entries[:, entries_cols]
+    return (
+        prices[:, symbol_start * 4 : symbol_end * 4],
+        entries,
+        entries,
+        entries_pairs,
+    )
+
+
+def _sort_by_work(
+    strat_array: RecordArray,
+    settings_array: RecordArray,
+) -> Tuple[RecordArray, RecordArray]:
+    # same order as the single process loops: symbol, then entries column, then order setting
+    sort_idx = np.lexsort((strat_array["or_set"], strat_array["entries_col"]))
+    return strat_array[sort_idx], settings_array[sort_idx]
+
+
+def _init_shard_worker(
+    prices_info: tuple,
+    entries_info: tuple,
+    second_entries_info: tuple,
+    entries_pairs: Array2d,
+    numba_cache_dir: str,
+):
+    if numba_cache_dir is not None:
+        os.environ["NUMBA_CACHE_DIR"] = numba_cache_dir
+    _worker_shared["prices_shm"], _worker_shared["prices"] = _from_shared_memory(
+        prices_info
+    )
+    _worker_shared["entries_shm"], _worker_shared["entries"] = _from_shared_memory(
+        entries_info
+    )
+    if second_entries_info is None:
+        _worker_shared["second_entries"] = _worker_shared["entries"]
+    else:
+        (
+            _worker_shared["second_entries_shm"],
+            _worker_shared["second_entries"],
+        ) = _from_shared_memory(second_entries_info)
+    _worker_shared["entries_pairs"] = entries_pairs
+
+
+def _run_shard(
+    shard_id: int,
+    shard: tuple,
+    arrays_1d_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    entries_per_symbol: int,
+    gains_pct_filter: float,
+    og_equity: float,
+    order_settings_block_size: int,
+    result_filters: Array2d,
+    spill_dir: str,
+    static_variables_tuple: StaticVariables,
+    total_trade_filter: int,
+):
+    prices, entries, second_entries, entries_pairs = _slice_symbols(
+        prices=_worker_shared["prices"],
+        entries=_worker_shared["entries"],
+        entries_pairs=_worker_shared["entries_pairs"],
+        entries_per_symbol=entries_per_symbol,
+        second_entries=_worker_shared["second_entries"],
+        symbol_start=shard[0],
+        symbol_end=shard[1],
+    )
+    num_of_symbols = shard[1] - shard[0]
+    strat_array, settings_array = backtest_df_only_nb(
+        cart_array_tuple=create_cart_slice_nb(
+            arrays_1d_tuple=arrays_1d_tuple,
+            cart_strides=cart_strides,
+            order_settings_start=shard[2],
+            order_settings_end=shard[3],
+        ),
+        cart_strides=np.ones(len(arrays_1d_tuple), dtype=np.int_),
+        entries=entries,
+        entries_pairs=entries_pairs,
+        gains_pct_filter=gains_pct_filter,
+        num_of_symbols=num_of_symbols,
+        og_equity=og_equity,
+        order_settings_block_size=order_settings_block_size,
+        prices=prices,
+        result_filters=result_filters,
+        second_entries=second_entries,
+        static_variables_tuple=static_variables_tuple,
+        total_bars=prices.shape[0],
+        total_indicator_settings=entries_per_symbol * num_of_symbols,
+        total_order_settings=shard[3] - shard[2],
+        total_trade_filter=total_trade_filter,
+    )
+
+    # putting the shard ids back into the ids of the full backtest
+    strat_array["symbol"] += shard[0]
+    strat_array["entries_col"] += shard[0] * entries_per_symbol
+    strat_array["or_set"] += shard[2]
+    settings_array["symbol"] += shard[0]
+    settings_array["entries_col"] += shard[0] * entries_per_symbol
+
+    if spill_dir is None:
+        return strat_array, settings_array
+
+    strat_path = os.path.join(spill_dir, f"strat_records_{shard_id:06d}.npy")
+    settings_path = os.path.join(spill_dir, f"settings_records_{shard_id:06d}.npy")
+    np.save(strat_path, strat_array)
+    np.save(settings_path, settings_array)
+    return strat_path, settings_path
+
+
+def load_spilled_results(
+    spill_dir: str,
+    mmap_mode: str = None,
+) -> Tuple[RecordArray, RecordArray]:
+    """
+    Loads the strat and settings records a backtest with spill_dir wrote.
+
+    Parameters
+    ----------
+    spill_dir : str
+        the folder the backtest spilled into
+    mmap_mode : str, None
+        passed to np.load for every shard file
+
+    Returns
+    -------
+    Tuple[RecordArray, RecordArray]
+        strat records and settings records in the same order the single process backtest returns them
+    """
+    strat_files = sorted(
+        f for f in os.listdir(spill_dir) if f.startswith("strat_records_")
+    )
+    settings_files = sorted(
+        f for f in os.listdir(spill_dir) if f.startswith("settings_records_")
+    )
+    if not strat_files:
+        return (
+            np.empty(0, dtype=strat_df_array_dt),
+            np.empty(0, dtype=settings_array_dt),
+        )
+    return _sort_by_work(
+        strat_array=np.concatenate(
+            [np.load(os.path.join(spill_dir, f), mmap_mode=mmap_mode) for f in strat_files]
+        ),
+        settings_array=np.concatenate(
+            [
+                np.load(os.path.join(spill_dir, f), mmap_mode=mmap_mode)
+                for f in settings_files
+            ]
+        ),
+    )
+
+
+def run_df_backtest_sharded(
+    prices: Array2d,
+    entries: Array2d,
+    num_of_symbols: int,
+    og_equity: float,
+    gains_pct_filter: float,
+    total_trade_filter: int,
+    static_variables_tuple: StaticVariables,
+    arrays_1d_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    max_workers: int = None,
+    order_settings_per_shard: int = None,
+    order_settings_block_size: int = 1,
+    spill_dir: str = None,
+    second_entries: Array2d = None,
+    entries_pairs: Array2d = None,
+    result_filters: Array2d = None,
+):
+    """
+    Runs backtest_df_only_nb over a pool of processes and returns the same strat and settings
+    record arrays the single process backtest returns.
+
+    Parameters
+    ----------
+    prices : Array2d
+        prices values laid out as open high low close per symbol
+    entries : Array2d
+        entries values with the same number of columns for every symbol
+    num_of_symbols : int
+        number of symbols
+    og_equity : float
+        starting equity
+    gains_pct_filter : float
+        gains percent filter
+    total_trade_filter : int
+        total trade filter
+    static_variables_tuple : StaticVariables
+        checked static variables
+    arrays_1d_tuple : Arrays1dTuple
+        1d arrays of the order settings
+    cart_strides : Array1d
+        strides of the order settings cartesian product from create_cart_strides_nb
+    max_workers : int, None
+        number of processes, defaults to the number of cpus. With 1 the shards are run one
+        after the other in this process.
+    order_settings_per_shard : int, None
+        how many order settings each shard backtests
+    order_settings_block_size : int, 1
+        how many order settings of an entries column are run in lockstep
+    spill_dir : str, None
+        folder every shard writes its records to instead of returning them
+    second_entries : Array2d, None
+        second entries values of combined entries
+    entries_pairs : Array2d, None
+        pairs of entries and second_entries columns that make up every combined entries
+        column, by default the entries aren't combined
+    result_filters : Array2d, None
+        rows of ResultMetric, ResultFilterOp and threshold every kept strategy has to pass, by
+        default there are none
+
+    Returns
+    -------
+    Tuple[RecordArray, RecordArray]
+        strat records and settings records, or the lists of strat and settings file paths
+        when spill_dir is set
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count()
+    if spill_dir is not None:
+        if static_variables_tuple.top_k > 0:
+            raise ValueError("You can't use spill_dir and top_k at the same time")
+        os.makedirs(spill_dir, exist_ok=True)
+    total_order_settings = int(cart_strides[0] * arrays_1d_tuple[0].size)
+    if entries_pairs is None:
+        entries_pairs = np.empty((0, 2), dtype=np.int_)
+    entries_pairs = np.ascontiguousarray(entries_pairs, dtype=np.int_)
+    if result_filters is None:
+        result_filters = np.empty((0, 3))
+    result_filters = np.ascontiguousarray(result_filters, dtype=np.float_)
+    if entries_pairs.shape[0]:
+        entries_per_symbol = int(entries_pairs.shape[0] / num_of_symbols)
+    else:
+        entries_per_symbol = int(entries.shape[1] / num_of_symbols)
+    shards = create_backtest_shards(
+        num_of_symbols=num_of_symbols,
+        total_order_settings=total_order_settings,
+        max_workers=max_workers,
+        order_settings_per_shard=order_settings_per_shard,
+    )
+    shard_kwargs = dict(
+        arrays_1d_tuple=arrays_1d_tuple,
+        cart_strides=cart_strides,
+        entries_per_symbol=entries_per_symbol,
+        gains_pct_filter=gains_pct_filter,
+        og_equity=og_equity,
+        order_settings_block_size=order_settings_block_size,
+        result_filters=result_filters,
+        spill_dir=spill_dir,
+        static_variables_tuple=static_variables_tuple,
+        total_trade_filter=total_trade_filter,
+    )
+
+    prices = np.ascontiguousarray(prices)
+    entries = np.ascontiguousarray(entries)
+    if entries_pairs.shape[0]:
+        second_entries = np.ascontiguousarray(second_entries)
+    else:
+        second_entries = entries
+    if max_workers == 1:
+        _worker_shared["prices"] = prices
+        _worker_shared["entries"] = entries
+        _worker_shared["second_entries"] = second_entries
+        _worker_shared["entries_pairs"] = entries_pairs
+        try:
+            shard_results = [
+                _run_shard(shard_id=shard_id, shard=shard, **shard_kwargs)
+                for shard_id, shard in enumerate(shards)
+            ]
+        finally:
+            _worker_shared.clear()
+    else:
+        # compiling here first writes the numba cache so the workers load it instead of compiling
+        (
+            warmup_prices,
+            warmup_entries,
+            warmup_second_entries,
+            warmup_entries_pairs,
+        ) = _slice_symbols(
+            prices=prices,
+            entries=entries,
+            entries_pairs=entries_pairs,
+            entries_per_symbol=entries_per_symbol,
+            second_entries=second_entries,
+            symbol_start=0,
+            symbol_end=1,
+        )
+        backtest_df_only_nb(
+            cart_array_tuple=create_cart_slice_nb(
+                arrays_1d_tuple=arrays_1d_tuple,
+                cart_strides=cart_strides,
+                order_settings_start=0,
+                order_settings_end=0,
+            ),
+            cart_strides=np.ones(len(arrays_1d_tuple), dtype=np.int_),
+            entries=warmup_entries,
+            entries_pairs=warmup_entries_pairs,
+            gains_pct_filter=gains_pct_filter,
+            num_of_symbols=1,
+            og_equity=og_equity,
+            order_settings_block_size=order_settings_block_size,
+            prices=warmup_prices,
+            result_filters=result_filters,
+            second_entries=warmup_second_entries,
+            static_variables_tuple=static_variables_tuple,
+            total_bars=prices.shape[0],
+            total_indicator_settings=entries_per_symbol,
+            total_order_settings=0,
+            total_trade_filter=total_trade_filter,
+        )
+
+        prices_shm, prices_info = _to_shared_memory(prices)
+        entries_shm, entries_info = _to_shared_memory(entries)
+        if entries_pairs.shape[0]:
+            second_entries_shm, second_entries_info = _to_shared_memory(second_entries)
+        else:
+            second_entries_shm, second_entries_info = None, None
+        try:
+            # spawn because forking after numba started its threading layer can hang
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_shard_worker,
+                initargs=(
+                    prices_info,
+                    entries_info,
+                    second_entries_info,
+                    entries_pairs,
+                    os.environ.get("NUMBA_CACHE_DIR"),
+                ),
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _run_shard, shard_id=shard_id, shard=shard, **shard_kwargs
+                    )
+                    for shard_id, shard in enumerate(shards)
+                ]
+                shard_results = [future.result() for future in futures]
+        finally:
+            prices_shm.close()
+            prices_shm.unlink()
+            entries_shm.close()
+            entries_shm.unlink()
+            if second_entries_shm is not None:
+                second_entries_shm.close()
+                second_entries_shm.unlink()
+
+    if spill_dir is not None:
+        return (
+            [result[0] for result in shard_results],
+            [result[1] for result in shard_results],
+        )
+
+    if not shard_results:
+        return (
+            np.empty(0, dtype=strat_df_array_dt),
+            np.empty(0, dtype=settings_array_dt),
+        )
+    strat_array, settings_array = _sort_by_work(
+        strat_array=np.concatenate([result[0] for result in shard_results]),
+        settings_array=np.concatenate([result[1] for result in shard_results]),
+    )
+
+    # every shard kept its own top k so the best of those are the top k of the whole backtest
+    if static_variables_tuple.top_k > 0:
+        top_k_idx = select_top_k_nb(
+            strategy_result_records=strat_array,
+            top_k=static_variables_tuple.top_k,
+            top_k_metric=static_variables_tuple.top_k_metric,
+        )
+        return strat_array[top_k_idx], settings_array[top_k_idx]
+    return strat_array, settings_array
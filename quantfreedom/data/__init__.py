@@ -1 +1 @@
-from quantfreedom.data import *
\ No newline at end of file
+from quantfreedom.data.price_store import *
@@ -1,12 +1,340 @@
+import asyncio
 import ccxt
+import json
+import os
+import time
 import pandas as pd
 import numpy as np
 from tqdm import tqdm
-from quantfreedom._typing import Union
+from quantfreedom._typing import Union, Array2d, List, Tuple
 from re import sub
 
+# how many pages get downloaded before they are written to the cache, which is also the most
+# that gets downloaded again if a download gets interrupted
+CACHE_FLUSH_PAGES = 50
+
+# a failed request waits 1, 2, 4, 8 ... seconds before it is tried again, never more than 60
+RETRY_BACKOFF_SECONDS = 1.0
+RETRY_MAX_BACKOFF_SECONDS = 60.0
+
+
+def _get_symbol_cache_dir(
+    cache_dir: str,
+    exchange_id: str,
+    timeframe: str,
+    symbol: str,
+) -> str:
+    return os.path.join(cache_dir, exchange_id, timeframe, sub(r"[^\w\-.]", "_", symbol))
+
+
+def _get_chunk_files(
+    symbol_dir: str,
+) -> List[str]:
+    return sorted(
+        file
+        for file in os.listdir(symbol_dir)
+        if file.endswith(".npy") and file[:-4].isdigit()
+    )
+
+
+def _load_held_ranges(
+    symbol_dir: str,
+) -> list:
+    held_path = os.path.join(symbol_dir, "held.json")
+    if not os.path.exists(held_path):
+        return []
+    with open(held_path) as f:
+        return json.load(f)
+
+
+def _load_symbol_cache(
+    symbol_dir: str,
+) -> Tuple[Array2d, list]:
+    """
+    Every cached chunk of a symbol in the order they got written, so when a candle got
+    downloaded more than once the newest one is kept, and the time ranges that are held.
+    """
+    held = _load_held_ranges(symbol_dir)
+    if not held:
+        return np.empty((0, 6), dtype=np.float_), []
+
+    chunk_files = _get_chunk_files(symbol_dir)
+    if not chunk_files:
+        return np.empty((0, 6), dtype=np.float_), held
+    ohlcvs = np.concatenate(
+        [np.load(os.path.join(symbol_dir, file)) for file in chunk_files]
+    )
+    # keep the last time a candle shows up
+    _, last_idx = np.unique(ohlcvs[::-1, 0], return_index=True)
+    return ohlcvs[len(ohlcvs) - 1 - last_idx], held
+
+
+def _write_symbol_cache(
+    symbol_dir: str,
+    ohlcvs: Array2d,
+    held: list,
+    replace_chunks: bool = False,
+):
+    """
+    Writes the ohlcvs as a new chunk and then the held time ranges, each to a temp file first
+    so an interrupted download never leaves a half written file behind.
+    """
+    os.makedirs(symbol_dir, exist_ok=True)
+    old_chunks = _get_chunk_files(symbol_dir)
+    if len(ohlcvs):
+        chunk_number = int(old_chunks[-1][:-4]) + 1 if old_chunks else 0
+        chunk_path = os.path.join(symbol_dir, f"{chunk_number:08d}.npy")
+        with open(chunk_path + ".tmp", "wb") as f:
+            np.save(f, np.asarray(ohlcvs, dtype=np.float_))
+        os.replace(chunk_path + ".tmp", chunk_path)
+
+    held_path = os.path.join(symbol_dir, "held.json")
+    with open(held_path + ".tmp", "w") as f:
+        json.dump(held, f)
+    os.replace(held_path + ".tmp", held_path)
+
+    if replace_chunks and len(ohlcvs):
+        for file in old_chunks:
+            os.remove(os.path.join(symbol_dir, file))
+
+
+def _add_held_range(
+    held: list,
+    range_start: int,
+    range_end: int,
+) -> list:
+    if range_start > range_end:
+        return held
+    merged = []
+    for held_start, held_end in sorted(held + [[range_start, range_end]]):
+        if merged and held_start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], held_end)
+        else:
+            merged.append([held_start, held_end])
+    return merged
+
+
+def _get_missing_ranges(
+    start: int,
+    end: int,
+    held: list,
+) -> List[Tuple[int, int]]:
+    missing = []
+    for held_start, held_end in held:
+        if held_end < start or held_start > end:
+            continue
+        if held_start > start:
+            missing.append((start, held_start - 1))
+        start = max(start, held_end + 1)
+    if start <= end:
+        missing.append((start, end))
+    return missing
+
+
+def _get_symbols(
+    symbols: Union[str, list],
+) -> List[str]:
+    if not isinstance(symbols, list):
+        symbols = [symbols]
+    if not all(isinstance(x, str) for x in symbols):
+        raise ValueError("your symbols must be strings")
+    return sorted(symbols)
+
+
+def _get_timeframe_ms(
+    timeframe: str,
+) -> int:
+    timeframe_int = int(sub(r"\D", "", timeframe))
+    timeframe_str = sub(r"\d", "", timeframe)
+    if timeframe_str == "m":
+        time_in = 1000 * 60
+    elif timeframe_str == "h":
+        time_in = 1000 * 60 * 60
+    elif timeframe_str == "d":
+        time_in = 1000 * 60 * 60 * 24
+    elif timeframe_str == "w":
+        time_in = 1000 * 60 * 60 * 24 * 7
+    elif timeframe_str == "m":
+        time_in = 1000 * 60 * 60 * 24 * 7 * 12
+    else:
+        raise ValueError("something wrong with your timeframe")
+    return time_in * timeframe_int
+
+
+def _get_symbols_missing_ranges(
+    cache_dir: str,
+    exchange_id: str,
+    timeframe: str,
+    symbols: List[str],
+    start: int,
+    end: int,
+) -> dict:
+    """
+    symbol: (symbol cache folder, time ranges already held, time ranges that need downloading)
+    """
+    symbols_missing_ranges = {}
+    for symbol in symbols:
+        if cache_dir is None:
+            symbol_dir = None
+            held = []
+        else:
+            symbol_dir = _get_symbol_cache_dir(
+                cache_dir=cache_dir,
+                exchange_id=exchange_id,
+                timeframe=timeframe,
+                symbol=symbol,
+            )
+            held = _load_held_ranges(symbol_dir)
+        symbols_missing_ranges[symbol] = (
+            symbol_dir,
+            held,
+            _get_missing_ranges(start=start, end=end, held=held),
+        )
+    return symbols_missing_ranges
+
+
+def _finish_symbol_download(
+    symbol_dir: str,
+    missing_ranges: list,
+    all_ohlcvs: list,
+    start: int,
+    end: int,
+) -> Array2d:
+    """
+    All the candles of a symbol from start to end, straight from what got downloaded or from
+    the cache if there is one.
+    """
+    if symbol_dir is None:
+        return np.array(all_ohlcvs).reshape(-1, 6)
+    all_ohlcvs, held = _load_symbol_cache(symbol_dir)
+    if missing_ranges:
+        # put all the chunks back together into one so the next load is just one file
+        _write_symbol_cache(symbol_dir, all_ohlcvs, held, replace_chunks=True)
+    return all_ohlcvs[(all_ohlcvs[:, 0] >= start) & (all_ohlcvs[:, 0] <= end)]
+
+
+def _get_backoff_seconds(
+    attempt: int,
+) -> float:
+    return min(RETRY_MAX_BACKOFF_SECONDS, RETRY_BACKOFF_SECONDS * 2**attempt)
+
+
+def _fetch_ohlcv(
+    exchange: ccxt.Exchange,
+    symbol: str,
+    timeframe: str,
+    since: int,
+    limit: int,
+    end: int,
+    max_retries: int,
+) -> list:
+    for attempt in range(max_retries + 1):
+        try:
+            return exchange.fetch_ohlcv(
+                symbol=symbol,
+                timeframe=timeframe,
+                since=since,
+                limit=limit,
+                params={"end": end},
+            )
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            print(type(e).__name__, str(e))
+            time.sleep(_get_backoff_seconds(attempt))
+
+
+def _assemble_prices_df(
+    symbols: List[str],
+    symbols_ohlcvs: dict,
+    start: int,
+    end: int,
+    timeframe_ms: int,
+    drop_volume: bool,
+) -> pd.DataFrame:
+    """
+    Puts the candles of every symbol onto one grid of open times from start to end. The rows
+    where no symbol has a candle and the last row get dropped. The values are written straight
+    into the one block the dataframe ends up using, so the memory it takes is about the size of
+    the dataframe and not that times the number of symbols.
+    """
+    candle_info = ["open", "high", "low", "close"]
+    if not drop_volume:
+        candle_info.append("volume")
+    candles_per_symbol = len(candle_info)
+    open_times = start + timeframe_ms * np.arange(-(-(end - start) // timeframe_ms) + 1)
+
+    # where every symbol's candles land on the grid
+    symbols = [symbol for symbol in symbols if len(symbols_ohlcvs[symbol])]
+    symbols_grid_idx = []
+    has_candle = np.zeros(open_times.size, dtype=np.bool_)
+    for symbol in symbols:
+        grid_idx, off_grid = np.divmod(
+            symbols_ohlcvs[symbol][:, 0].astype(np.int_) - start, timeframe_ms
+        )
+        on_grid = (off_grid == 0) & (grid_idx >= 0) & (grid_idx < open_times.size)
+        symbols_grid_idx.append((grid_idx[on_grid], on_grid))
+        has_candle[grid_idx[on_grid]] = True
+
+    rows = np.flatnonzero(has_candle)[:-1]
+    grid_row = np.full(open_times.size, -1, dtype=np.int_)
+    grid_row[rows] = np.arange(rows.size)
+
+    values = np.full(
+        (rows.size, len(symbols) * candles_per_symbol), np.nan, dtype=np.float_, order="F"
+    )
+    for symbol_counter, symbol in enumerate(symbols):
+        grid_idx, on_grid = symbols_grid_idx[symbol_counter]
+        symbol_rows = grid_row[grid_idx]
+        in_rows = symbol_rows >= 0
+        values[
+            symbol_rows[in_rows],
+            symbol_counter * candles_per_symbol : (symbol_counter + 1) * candles_per_symbol,
+        ] = symbols_ohlcvs[symbol][on_grid][in_rows, 1 : 1 + candles_per_symbol]
+
+    return pd.DataFrame(
+        values,
+        index=pd.Index(
+            data=pd.to_datetime(open_times[rows], unit="ms"),
+            name="open_time",
+        ),
+        columns=pd.MultiIndex.from_product(
+            [symbols, candle_info],
+            names=["symbol", "candle_info"],
+        ),
+        copy=False,
+    )
+
+
+def _print_download_size(
+    symbols_missing_ranges: dict,
+    timeframe_ms: int,
+    bars_per_loop: int,
+) -> int:
+    # Example if you selected your timeframe as 30 minute candles
+
+    # Get the distance between the end date and start date of every time range we don't have yet in miliseconds
+    # Divide that by the amount of miliseconds in what ever timeframe you set ex: there are 60,000 miliseconds in one minute times 30 for 30 minutes to get the amount of 30 min bars in that distance of time
+    # Then divide by limit because that is the amount of rows of data you can return
+    # Then add one because that is the amount of loops we will have to do
+    # then add up the loops of every time range of every symbol
+    # Then last we do + len of symbols because we will do an extra pbar update after we create the dataframe
+    num_candles = 0
+    total_tqdm = len(symbols_missing_ranges)
+    for symbol_dir, held, missing_ranges in symbols_missing_ranges.values():
+        for range_start, range_end in missing_ranges:
+            range_candles = (range_end - range_start) / timeframe_ms
+            num_candles += int(range_candles)
+            total_tqdm += int(range_candles / bars_per_loop) + 1
+    print(
+        f"Total possible candles to be download: {num_candles}\n"
+        f"It could finish earlier than expected because maybe not all coins have data starting from the start date selected."
+    )
+    return total_tqdm
+
+
 def data_download_from_ccxt(
-    exchange: str,
+    exchange: Union[str, ccxt.Exchange],
     start: str,
     end: str,
     symbols: Union[str, list],
@@ -14,6 +342,8 @@ def data_download_from_ccxt(
     drop_volume: bool = True,
     remove_rate_limit: bool = False,
     bars_per_loop: int = 200,
+    cache_dir: str = None,
+    max_retries: int = 5,
 ):
     """
     Function Name
@@ -32,8 +362,8 @@ def data_download_from_ccxt(
     ----------
     cls: self
         passing all the information from the created class
-    exchange : str
-        'bybit' or 'binance' or whatever exchange works with ccxt
+    exchange : str or ccxt.Exchange
+        'bybit' or 'binance' or whatever exchange works with ccxt. You can also pass in an exchange you already made yourself, or anything else that has load_markets, fetch_ohlcv and an id.
     start : str
         needs to be in this format '2022-01-01T00:00:00Z'
     end : str
@@ -56,129 +386,349 @@ def data_download_from_ccxt(
         This is the default rate limit the exchange asks for. If you remove it then its possible that if you are trying to get tons and tons of data from the exchange they could ban you or time you out.
     bars_per_loop: int = 200
         How many bars you want to grab at a time. Some exchanges let you grab more info per loop and some don't. I don't think grabbing more would make anything faster but you can try if the exchange allows for more. You would have to do your research and figure out how man bars but i know bybit says you can grab a max of 200 and apparently binance lets you grab up to 1000.
+    cache_dir: str = None
+        Folder to keep the candles you downloaded in, one folder for every exchange, timeframe and symbol. Every time you download it remembers which time ranges it already has and only downloads what is missing, so getting the newest candles for a lot of symbols only downloads those new candles. If a download gets interrupted the next one picks up where it stopped. Candles that haven't closed yet never count as downloaded so they get downloaded again next time.
+    max_retries: int = 5
+        How many times a request that failed gets tried again before giving up. It waits 1, 2, 4, 8 ... seconds between tries.
 
     Returns
     -------
         Pandas dataframe of prices
     """
-    if remove_rate_limit:
-        exchange = getattr(ccxt, exchange)()
-    else:
-        exchange = getattr(ccxt, exchange)({"enableRateLimit": True})
+    if isinstance(exchange, str):
+        if remove_rate_limit:
+            exchange = getattr(ccxt, exchange)()
+        else:
+            exchange = getattr(ccxt, exchange)({"enableRateLimit": True})
     print("Loading exchange data")
     exchange.load_markets()
     # exchange.verbose = True  # uncomment for debugging purposes if necessary
-    start = exchange.parse8601(start)
-    end = exchange.parse8601(end)
+    start = int(pd.Timestamp(start).value // 10**6)
+    end = int(pd.Timestamp(end).value // 10**6)
     timeframe = timeframe.lower()
-    if not isinstance(symbols, list):
-        symbols = [symbols]
-    if not all(isinstance(x, str) for x in symbols):
-        raise ValueError("your symbols must be strings")
-
-    symbols = sorted(symbols)
-    timeframe_int = int(sub(r"\D", "", timeframe))
-    timeframe_str = sub(r"\d", "", timeframe)
-    len_symbols = len(symbols)
-    if timeframe_str == "m":
-        time_in = 1000 * 60
-    elif timeframe_str == "h":
-        time_in = 1000 * 60 * 60
-    elif timeframe_str == "d":
-        time_in = 1000 * 60 * 60 * 24
-    elif timeframe_str == "w":
-        time_in = 1000 * 60 * 60 * 24 * 7
-    elif timeframe_str == "m":
-        time_in = 1000 * 60 * 60 * 24 * 7 * 12
-    else:
-        raise ValueError("something wrong with your timeframe")
-
-    x = start
-    timelist = [x]
-    while x < end:
-        x += time_in * timeframe_int
-        timelist.append(x)
+    symbols = _get_symbols(symbols)
+    timeframe_ms = _get_timeframe_ms(timeframe)
 
-    final_df = pd.DataFrame(
-        columns=pd.MultiIndex.from_tuples(
-            tuples=[],
-            name=["symbol", "candle_info"],
-        ),
-        index=pd.Index(
-            data=pd.to_datetime(timelist, unit="ms"),
-            name="open_time",
-        ),
+    # candles that open after this haven't closed yet so they are never counted as downloaded
+    closed_end = int(time.time() * 1000) - timeframe_ms
+    symbols_missing_ranges = _get_symbols_missing_ranges(
+        cache_dir=cache_dir,
+        exchange_id=exchange.id,
+        timeframe=timeframe,
+        symbols=symbols,
+        start=start,
+        end=end,
     )
-    # Example if you selected your timeframe as 30 minute candles
-
-    # Get the distance between the end date and start date in miliseconds
-    # Divide that by the amount of miliseconds in what ever timeframe you set ex: there are 60,000 miliseconds in one minute.
-    # Then you divide that by the number for the timeframe you set like 30 for 30 minutes to get the amount of 30 min bars in that distance of time
-    # Then divide by limit because that is the amount of rows of data you can return
-    # Then add one because that is the amount of loops we will have to do
-    # then multiple by the amount of symbols so if we have to do 2 loops per symbol and we have 2 symbols we have to do a total of 4 loops
-    # Then last we do + len of symbols because we will do an extra pbar update after we create the dataframe
-    num_candles_per_coin = ((end - start) / time_in) / timeframe_int
-    total_tqdm = (
-        (int(num_candles_per_coin / bars_per_loop) + 1) * len_symbols
-    ) + len_symbols
-    print(
-        f"Total possible rows of data to be download: {int(num_candles_per_coin)}\n"
-        f"Total possible candles to be download: {int(num_candles_per_coin) * len_symbols}\n"
-        f"It could finish earlier than expected because maybe not all coins have data starting from the start date selected."
+    total_tqdm = _print_download_size(
+        symbols_missing_ranges=symbols_missing_ranges,
+        timeframe_ms=timeframe_ms,
+        bars_per_loop=bars_per_loop,
     )
+    symbols_ohlcvs = {}
     with tqdm(total=total_tqdm) as pbar:
-        # with tqdm(total=96*2) as pbar:
         for symbol in symbols:
+            symbol_dir, held, missing_ranges = symbols_missing_ranges[symbol]
             all_ohlcvs = []
-            temp_end = end
             pbar.set_description(f"Downloading {symbol}")
-            while True:
-                try:
-                    ohlcvs = exchange.fetch_ohlcv(
+            for range_start, range_end in missing_ranges:
+                temp_end = range_end
+                unsaved_ohlcvs = []
+                unsaved_pages = 0
+                while True:
+                    ohlcvs = _fetch_ohlcv(
+                        exchange=exchange,
                         symbol=symbol,
                         timeframe=timeframe,
-                        since=start,
+                        since=range_start,
                         limit=bars_per_loop,
-                        params={"end": temp_end},
+                        end=temp_end,
+                        max_retries=max_retries,
                     )
-                    all_ohlcvs += ohlcvs
-                    if len(ohlcvs):
-                        temp_end = ohlcvs[0][0] - 1
-                        pbar.update(1)
-                    else:
+                    if not len(ohlcvs):
                         break
+                    all_ohlcvs += ohlcvs
+                    temp_end = ohlcvs[0][0] - 1
+                    unsaved_ohlcvs += ohlcvs
+                    unsaved_pages += 1
+                    pbar.update(1)
+
+                    if symbol_dir is not None and unsaved_pages == CACHE_FLUSH_PAGES:
+                        # everything from the oldest candle we got so far to the end of the range is held now
+                        held = _add_held_range(
+                            held=held,
+                            range_start=temp_end + 1,
+                            range_end=min(range_end, closed_end),
+                        )
+                        _write_symbol_cache(symbol_dir, np.array(unsaved_ohlcvs), held)
+                        unsaved_ohlcvs = []
+                        unsaved_pages = 0
+
+                if symbol_dir is not None:
+                    held = _add_held_range(
+                        held=held,
+                        range_start=range_start,
+                        range_end=min(range_end, closed_end),
+                    )
+                    _write_symbol_cache(
+                        symbol_dir, np.array(unsaved_ohlcvs).reshape(-1, 6), held
+                    )
 
-                except Exception as e:
-                    print(type(e).__name__, str(e))
-
-            if all_ohlcvs:
-                all_ohlcvs = np.array(all_ohlcvs)
-                data_columns = pd.MultiIndex.from_tuples(
-                    [
-                        (symbol, "open"),
-                        (symbol, "high"),
-                        (symbol, "low"),
-                        (symbol, "close"),
-                        (symbol, "volume"),
-                    ],
-                    name=["symbol", "candle_info"],
+            symbols_ohlcvs[symbol] = _finish_symbol_download(
+                symbol_dir=symbol_dir,
+                missing_ranges=missing_ranges,
+                all_ohlcvs=all_ohlcvs,
+                start=start,
+                end=end,
+            )
+            pbar.update(1)
+
+    return _assemble_prices_df(
+        symbols=symbols,
+        symbols_ohlcvs=symbols_ohlcvs,
+        start=start,
+        end=end,
+        timeframe_ms=timeframe_ms,
+        drop_volume=drop_volume,
+    )
+
+
+class _TokenBucket:
+    """
+    Token bucket rate limiter shared by every request of an async download. A token comes back
+    every rate_limit_ms and a request has to take one before it can go out, so no matter how
+    many requests are running at the same time the exchange never sees more than one request
+    every rate_limit_ms on average.
+    """
+
+    def __init__(
+        self,
+        rate_limit_ms: float,
+        capacity: int = 1,
+    ):
+        self.seconds_per_token = rate_limit_ms / 1000
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.seconds_per_token <= 0:
+            return
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill) / self.seconds_per_token,
                 )
-                data_index = pd.Index(
-                    data=pd.to_datetime(all_ohlcvs[:, 0].flatten(), unit="ms"),
-                    name="open_time",
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.seconds_per_token)
+
+
+async def _fetch_ohlcv_async(
+    exchange,
+    rate_limiter: _TokenBucket,
+    symbol: str,
+    timeframe: str,
+    since: int,
+    limit: int,
+    end: int,
+    max_retries: int,
+) -> list:
+    for attempt in range(max_retries + 1):
+        await rate_limiter.acquire()
+        try:
+            return await exchange.fetch_ohlcv(
+                symbol=symbol,
+                timeframe=timeframe,
+                since=since,
+                limit=limit,
+                params={"end": end},
+            )
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            print(type(e).__name__, str(e))
+            await asyncio.sleep(_get_backoff_seconds(attempt))
+
+
+async def data_download_from_ccxt_async(
+    exchange,
+    start: str,
+    end: str,
+    symbols: Union[str, list],
+    timeframe: str,
+    drop_volume: bool = True,
+    remove_rate_limit: bool = False,
+    bars_per_loop: int = 200,
+    cache_dir: str = None,
+    max_retries: int = 5,
+    max_concurrent_requests: int = 10,
+):
+    """
+    Function Name
+    -------------
+    data_download_from_ccxt_async
+
+    Quick Summary
+    -------------
+    Same as data_download_from_ccxt and gives back the exact same dataframe, but it uses ccxt.async_support to download a lot of symbols and pages at the same time instead of one after the other. In a jupyter notebook you call it with `prices = await data_download_from_ccxt_async(...)` and in a script with `prices = asyncio.run(data_download_from_ccxt_async(...))`.
+
+    Every time range that needs downloading gets split into pages of bars_per_loop candles, and up to max_concurrent_requests pages are downloaded at the same time. All of them share one rate limiter that lets out one request every exchange.rateLimit miliseconds, so you still get the rate limit the exchange asks for, you just don't sit around waiting for every answer before asking for the next page.
+
+    Parameters
+    ----------
+    exchange : str or ccxt.async_support.Exchange
+        'bybit' or 'binance' or whatever exchange works with ccxt. You can also pass in an async exchange you already made yourself, or anything else that has async load_markets and fetch_ohlcv, an id and a rateLimit. If you pass in your own exchange you have to close it yourself.
+    start : str
+        needs to be in this format '2022-01-01T00:00:00Z'
+    end : str
+        needs to be in this format '2022-01-01T00:00:00Z'
+    symbols : list or str
+        Same as data_download_from_ccxt
+    timeframe : str
+        '1m', '5m', '1h' '4h' '1d' '1w'
+    drop_volume: bool = True
+        Set this to False if you want to keep volume data.
+    remove_rate_limit: bool = False
+        Don't wait between requests at all. If you remove it then its possible that if you are trying to get tons and tons of data from the exchange they could ban you or time you out.
+    bars_per_loop: int = 200
+        How many bars you want to grab with every request, same as data_download_from_ccxt.
+    cache_dir: str = None
+        Same as data_download_from_ccxt and it uses the same cache, so you can switch between the two.
+    max_retries: int = 5
+        How many times a request that failed gets tried again before giving up. It waits 1, 2, 4, 8 ... seconds between tries.
+    max_concurrent_requests: int = 10
+        Most requests that can be waiting on the exchange at the same time.
+
+    Returns
+    -------
+        Pandas dataframe of prices
+    """
+    close_exchange = isinstance(exchange, str)
+    if close_exchange:
+        import ccxt.async_support as ccxt_async
+
+        # the rate limiting is done by our own rate limiter so it works across all the requests
+        exchange = getattr(ccxt_async, exchange)({"enableRateLimit": False})
+    try:
+        print("Loading exchange data")
+        await exchange.load_markets()
+        start = int(pd.Timestamp(start).value // 10**6)
+        end = int(pd.Timestamp(end).value // 10**6)
+        timeframe = timeframe.lower()
+        symbols = _get_symbols(symbols)
+        timeframe_ms = _get_timeframe_ms(timeframe)
+
+        # candles that open after this haven't closed yet so they are never counted as downloaded
+        closed_end = int(time.time() * 1000) - timeframe_ms
+        symbols_missing_ranges = _get_symbols_missing_ranges(
+            cache_dir=cache_dir,
+            exchange_id=exchange.id,
+            timeframe=timeframe,
+            symbols=symbols,
+            start=start,
+            end=end,
+        )
+
+        total_tqdm = _print_download_size(
+            symbols_missing_ranges=symbols_missing_ranges,
+            timeframe_ms=timeframe_ms,
+            bars_per_loop=bars_per_loop,
+        )
+
+        # every page is its own (symbol, page start, page end) so they can all be downloaded at the same time
+        pages = asyncio.Queue()
+        symbols_pages_left = {}
+        for symbol, (symbol_dir, held, missing_ranges) in symbols_missing_ranges.items():
+            symbols_pages_left[symbol] = 0
+            for range_start, range_end in missing_ranges:
+                for page_start in range(
+                    range_start, range_end + 1, timeframe_ms * bars_per_loop
+                ):
+                    page_end = min(page_start + timeframe_ms * bars_per_loop - 1, range_end)
+                    pages.put_nowait((symbol, page_start, page_end))
+                    symbols_pages_left[symbol] += 1
+
+        rate_limiter = _TokenBucket(
+            rate_limit_ms=0 if remove_rate_limit else getattr(exchange, "rateLimit", 0)
+        )
+        symbols_ohlcvs = {symbol: [] for symbol in symbols}
+        symbols_held = {symbol: symbols_missing_ranges[symbol][1] for symbol in symbols}
+        symbols_unsaved = {symbol: ([], []) for symbol in symbols}
+
+        async def download_pages(pbar):
+            while not pages.empty():
+                symbol, page_start, page_end = pages.get_nowait()
+                ohlcvs = await _fetch_ohlcv_async(
+                    exchange=exchange,
+                    rate_limiter=rate_limiter,
+                    symbol=symbol,
+                    timeframe=timeframe,
+                    since=page_start,
+                    limit=bars_per_loop,
+                    end=page_end,
+                    max_retries=max_retries,
                 )
-                data = pd.DataFrame(
-                    all_ohlcvs[:, 1:],
-                    columns=data_columns,
-                    index=data_index,
+                ohlcvs = [ohlcv for ohlcv in ohlcvs if page_start <= ohlcv[0] <= page_end]
+                if ohlcvs and ohlcvs[-1][0] + timeframe_ms <= min(page_end, closed_end):
+                    # the exchange gave back less than the whole page so the rest is its own page
+                    pages.put_nowait((symbol, ohlcvs[-1][0] + 1, page_end))
+                    symbols_pages_left[symbol] += 1
+                    page_end = ohlcvs[-1][0]
+                symbols_ohlcvs[symbol] += ohlcvs
+                symbols_pages_left[symbol] -= 1
+                pbar.update(1)
+
+                symbol_dir = symbols_missing_ranges[symbol][0]
+                if symbol_dir is not None:
+                    unsaved_ohlcvs, unsaved_pages = symbols_unsaved[symbol]
+                    unsaved_ohlcvs += ohlcvs
+                    unsaved_pages.append((page_start, page_end))
+                    if (
+                        len(unsaved_pages) == CACHE_FLUSH_PAGES
+                        or not symbols_pages_left[symbol]
+                    ):
+                        held = symbols_held[symbol]
+                        for unsaved_start, unsaved_end in unsaved_pages:
+                            held = _add_held_range(
+                                held=held,
+                                range_start=unsaved_start,
+                                range_end=min(unsaved_end, closed_end),
+                            )
+                        symbols_held[symbol] = held
+                        _write_symbol_cache(
+                            symbol_dir, np.array(unsaved_ohlcvs).reshape(-1, 6), held
+                        )
+                        symbols_unsaved[symbol] = ([], [])
+
+        with tqdm(total=total_tqdm) as pbar:
+            pbar.set_description("Downloading")
+            await asyncio.gather(
+                *[download_pages(pbar) for _ in range(max(1, max_concurrent_requests))]
+            )
+            for symbol in symbols:
+                symbol_dir, held, missing_ranges = symbols_missing_ranges[symbol]
+                symbols_ohlcvs[symbol] = _finish_symbol_download(
+                    symbol_dir=symbol_dir,
+                    missing_ranges=missing_ranges,
+                    all_ohlcvs=sorted(symbols_ohlcvs[symbol]),
+                    start=start,
+                    end=end,
                 )
-                if drop_volume:
-                    data.drop(columns=(symbol, "volume"), inplace=True, axis=1)
-                final_df = final_df.join(data)
-            pbar.update(1)
-    final_df.sort_index(ascending=True, inplace=True)
-    final_df.sort_index(axis=1, level=0, sort_remaining=False)
-    final_df.dropna(how="all", inplace=True)
-    final_df.drop(final_df.tail(1).index, inplace=True)
-    return final_df
+                pbar.update(1)
+    finally:
+        if close_exchange:
+            await exchange.close()
+
+    return _assemble_prices_df(
+        symbols=symbols,
+        symbols_ohlcvs=symbols_ohlcvs,
+        start=start,
+        end=end,
+        timeframe_ms=timeframe_ms,
+        drop_volume=drop_volume,
+    )
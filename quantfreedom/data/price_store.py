@@ -0,0 +1,268 @@
+"""
+On disk price store the backtest can read straight from.
+
+A store is a folder with
+    prices.npy      float64 open high low close of every symbol, shape (bars, 4 * symbols),
+                    saved in fortran order so every column is one contiguous run on disk
+    volume.npy      float64 volume of every symbol, shape (bars, symbols), only if you saved volume
+    open_time.npy   datetime64[ns] open time of every bar
+    index.json      symbols, candle info and the first and last open time
+
+prices.npy is already laid out exactly the way backtest_df_only_nb reads prices, so load_prices
+memory maps it instead of reading it. Opening years of 1 minute candles for hundreds of symbols
+is instant, only the bars a backtest actually touches get read from disk, and every process that
+opens the same store shares the same pages of memory.
+"""
+
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from quantfreedom._typing import pdFrame, Union
+
+__all__ = [
+    "save_prices",
+    "load_prices",
+    "load_volume",
+    "load_price_store_index",
+]
+
+_candle_info = ["open", "high", "low", "close"]
+_index_file = "index.json"
+_prices_file = "prices.npy"
+_volume_file = "volume.npy"
+_open_time_file = "open_time.npy"
+
+
+def save_prices(
+    prices: pdFrame,
+    path: str,
+) -> str:
+    """
+    Saves a prices dataframe to a price store folder.
+
+    Parameters
+    ----------
+    prices : pdFrame
+        Dataframe of prices like the one you get from data_download_from_ccxt. Columns need to
+        be symbol and candle_info with open high low close for every symbol, volume gets saved
+        too if you kept it. The index has to be the open time of each bar.
+    path : str
+        folder to save the store in, it gets created if it isn't there and anything already in
+        it gets overwritten
+
+    Returns
+    -------
+    str
+        path of the store
+    """
+    if not isinstance(prices.columns, pd.MultiIndex) or prices.columns.nlevels != 2:
+        raise ValueError("prices columns need to be a MultiIndex of symbol and candle_info")
+    if not isinstance(prices.index, pd.DatetimeIndex):
+        raise ValueError("prices index needs to be a DatetimeIndex of the open time of each bar")
+    symbols = list(prices.columns.get_level_values(0).unique())
+    has_volume = "volume" in prices.columns.get_level_values(1)
+    for symbol in symbols:
+        symbol_candle_info = list(prices[symbol].columns)
+        if not set(_candle_info).issubset(symbol_candle_info):
+            raise ValueError(f"{symbol} needs to have open high low close columns")
+        if has_volume and "volume" not in symbol_candle_info:
+            raise ValueError(f"{symbol} has no volume but other symbols do")
+
+    os.makedirs(path, exist_ok=True)
+    total_bars = prices.shape[0]
+
+    # filled in one column at a time straight into the file so the prices never have to be
+    # copied into one big block in memory first
+    prices_mm = np.lib.format.open_memmap(
+        os.path.join(path, _prices_file),
+        mode="w+",
+        dtype=np.float_,
+        shape=(total_bars, len(symbols) * 4),
+        fortran_order=True,
+    )
+    for symbol_counter, symbol in enumerate(symbols):
+        for candle_counter, candle_info in enumerate(_candle_info):
+            prices_mm[:, symbol_counter * 4 + candle_counter] = prices[
+                (symbol, candle_info)
+            ].to_numpy(dtype=np.float_)
+    prices_mm.flush()
+    del prices_mm
+
+    volume_path = os.path.join(path, _volume_file)
+    if has_volume:
+        volume_mm = np.lib.format.open_memmap(
+            volume_path,
+            mode="w+",
+            dtype=np.float_,
+            shape=(total_bars, len(symbols)),
+            fortran_order=True,
+        )
+        for symbol_counter, symbol in enumerate(symbols):
+            volume_mm[:, symbol_counter] = prices[(symbol, "volume")].to_numpy(
+                dtype=np.float_
+            )
+        volume_mm.flush()
+        del volume_mm
+    elif os.path.exists(volume_path):
+        os.remove(volume_path)
+
+    # saved in utc, the timezone goes in the index so load_prices can put it back
+    open_time = np.asarray(prices.index, dtype="datetime64[ns]")
+    np.save(os.path.join(path, _open_time_file), open_time)
+    tz = None if prices.index.tz is None else str(prices.index.tz)
+
+    store_index = {
+        "symbols": [str(symbol) for symbol in symbols],
+        "candle_info": _candle_info,
+        "has_volume": bool(has_volume),
+        "total_bars": int(total_bars),
+        "start": str(prices.index[0]) if total_bars else None,
+        "end": str(prices.index[-1]) if total_bars else None,
+        "tz": tz,
+    }
+    with open(os.path.join(path, _index_file), "w") as f:
+        json.dump(store_index, f, indent=4)
+    return path
+
+
+def _load_open_time(
+    path: str,
+    store_index: dict,
+) -> pd.DatetimeIndex:
+    open_time = pd.DatetimeIndex(
+        np.load(os.path.join(path, _open_time_file)),
+        name="open_time",
+    )
+    # stores saved before the timezone was kept have no tz
+    if store_index.get("tz") is not None:
+        open_time = open_time.tz_localize("UTC").tz_convert(store_index["tz"])
+    return open_time
+
+
+def load_price_store_index(
+    path: str,
+) -> dict:
+    """
+    Reads the json index of a price store without opening any of the prices.
+
+    Parameters
+    ----------
+    path : str
+        folder of the store
+
+    Returns
+    -------
+    dict
+        symbols, candle_info, has_volume, total_bars, start and end of the store
+    """
+    with open(os.path.join(path, _index_file)) as f:
+        return json.load(f)
+
+
+def _get_symbol_columns(
+    store_symbols: list,
+    symbols: Union[str, list],
+    columns_per_symbol: int,
+) -> Union[slice, np.ndarray]:
+    if not isinstance(symbols, list):
+        symbols = [symbols]
+    missing = [symbol for symbol in symbols if symbol not in store_symbols]
+    if missing:
+        raise ValueError(f"{missing} aren't in the price store")
+    positions = np.array([store_symbols.index(symbol) for symbol in symbols])
+    # symbols that are next to each other in the store are just a view of the memory map
+    if np.all(np.diff(positions) == 1):
+        return slice(
+            positions[0] * columns_per_symbol,
+            (positions[-1] + 1) * columns_per_symbol,
+        )
+    return (
+        positions[:, None] * columns_per_symbol + np.arange(columns_per_symbol)
+    ).ravel()
+
+
+def load_prices(
+    path: str,
+    symbols: Union[str, list] = None,
+    mmap: bool = True,
+) -> pdFrame:
+    """
+    Loads the prices from a price store into the same dataframe save_prices was given, without
+    volume, ready for backtest_df_only.
+
+    Parameters
+    ----------
+    path : str
+        folder of the store
+    symbols : str or list, None
+        Only load these symbols. By default every symbol in the store gets loaded. Symbols that
+        sit next to each other in the store are still memory mapped, any other pick of symbols
+        gets copied into memory.
+    mmap : bool, True
+        Memory map the prices instead of reading them into memory. The memory map is copy on
+        write so changing the dataframe never changes the store.
+
+    Returns
+    -------
+    pdFrame
+        Dataframe of prices with an open_time index and symbol and candle_info columns
+    """
+    store_index = load_price_store_index(path)
+    store_symbols = store_index["symbols"]
+
+    prices = np.load(os.path.join(path, _prices_file), mmap_mode="c" if mmap else None)
+    if symbols is not None:
+        prices = prices[:, _get_symbol_columns(store_symbols, symbols, 4)]
+        store_symbols = symbols if isinstance(symbols, list) else [symbols]
+
+    return pd.DataFrame(
+        prices,
+        index=_load_open_time(path, store_index),
+        columns=pd.MultiIndex.from_product(
+            [store_symbols, store_index["candle_info"]],
+            names=["symbol", "candle_info"],
+        ),
+        copy=False,
+    )
+
+
+def load_volume(
+    path: str,
+    symbols: Union[str, list] = None,
+    mmap: bool = True,
+) -> pdFrame:
+    """
+    Loads the volume from a price store.
+
+    Parameters
+    ----------
+    path : str
+        folder of the store
+    symbols : str or list, None
+        Only load these symbols. By default every symbol in the store gets loaded.
+    mmap : bool, True
+        Memory map the volume instead of reading it into memory.
+
+    Returns
+    -------
+    pdFrame
+        Dataframe of volume with an open_time index and one column per symbol
+    """
+    store_index = load_price_store_index(path)
+    if not store_index["has_volume"]:
+        raise ValueError("this price store was saved without volume")
+    store_symbols = store_index["symbols"]
+
+    volume = np.load(os.path.join(path, _volume_file), mmap_mode="c" if mmap else None)
+    if symbols is not None:
+        volume = volume[:, _get_symbol_columns(store_symbols, symbols, 1)]
+        store_symbols = symbols if isinstance(symbols, list) else [symbols]
+
+    return pd.DataFrame(
+        volume,
+        index=_load_open_time(path, store_index),
+        columns=pd.Index(store_symbols, name="symbol"),
+        copy=False,
+    )
@@ -30,9 +30,13 @@ __all__ = [
     "OrderResult",
     "OrderType",
     "RejectedOrderError",
+    "ResultFilterOp",
+    "ResultMetric",
     "SL_BE_or_Trail_BasedOn",
     "LeverageMode",
     "SizeType",
+    "StateField",
+    "TradeMetricField",
     "EntryOrder",
     "StopsOrder",
     "StaticVariables",
@@ -107,9 +111,10 @@ class OrderResult(tp.NamedTuple):
 
 
 class StaticVariables(tp.NamedTuple):
-    divide_records_array_size_by: float
+    equity_floor_pct_filter: float
     fee_pct: float
     lev_mode: int
+    max_drawdown_pct_filter: float
     max_lev: float
     max_order_size_pct: float
     max_order_size_value: float
@@ -120,6 +125,8 @@ class StaticVariables(tp.NamedTuple):
     size_type: int
     sl_to_be_then_trail: bool
     sl_to_be: bool
+    top_k: int
+    top_k_metric: int
     tsl_true_or_false: bool
     upside_filter: float
 
@@ -184,6 +191,36 @@ class OrderTypeT(tp.NamedTuple):
 OrderType = OrderTypeT()
 
 
+class ResultMetricT(tp.NamedTuple):
+    total_trades: int = 0
+    gains_pct: int = 1
+    win_rate: int = 2
+    to_the_upside: int = 3
+    total_pnl: int = 4
+    ending_eq: int = 5
+    sharpe_ratio: int = 6
+    sortino_ratio: int = 7
+    max_drawdown_pct: int = 8
+    max_drawdown_bars: int = 9
+    profit_factor: int = 10
+    expectancy: int = 11
+    avg_r: int = 12
+    longest_losing_streak: int = 13
+
+
+ResultMetric = ResultMetricT()
+
+
+class ResultFilterOpT(tp.NamedTuple):
+    GreaterThan: int = 0
+    GreaterThanOrEqual: int = 1
+    LessThan: int = 2
+    LessThanOrEqual: int = 3
+
+
+ResultFilterOp = ResultFilterOpT()
+
+
 class SL_BE_or_Trail_BasedOnT(tp.NamedTuple):
     open_price: int = 0
     high_price: int = 1
@@ -202,6 +239,89 @@ class SizeTypeT(tp.NamedTuple):
 
 SizeType = SizeTypeT()
 
+
+class StateFieldT(tp.NamedTuple):
+    """
+    Where every field of AccountState and OrderResult lives in a state array.
+    The bool and int fields are stored as floats.
+    """
+
+    available_balance: int = 0
+    cash_borrowed: int = 1
+    cash_used: int = 2
+    equity: int = 3
+    average_entry: int = 4
+    fees_paid: int = 5
+    leverage: int = 6
+    liq_price: int = 7
+    moved_sl_to_be: int = 8
+    order_status: int = 9
+    order_status_info: int = 10
+    order_type: int = 11
+    pct_chg_trade: int = 12
+    position: int = 13
+    price: int = 14
+    realized_pnl: int = 15
+    size_value: int = 16
+    sl_pcts: int = 17
+    sl_prices: int = 18
+    tp_pcts: int = 19
+    tp_prices: int = 20
+    tsl_pcts_init: int = 21
+    tsl_prices: int = 22
+
+
+StateField = StateFieldT()
+
+
+class TradeMetricFieldT(tp.NamedTuple):
+    """
+    Where every running metric of a combination lives in a trade metrics array. They get
+    updated every time a trade closes so the results of a combination never need its trades.
+
+    no_be_trades, wins and cum_pnl up to sxy only count the trades that weren't break even.
+    x is the count of those trades and y is their cumulative pnl, mean_x, mean_y, sxx, syy and
+    sxy are the running means and sums of squares and products to_the_upside needs.
+
+    mean_return, m2_return and downside_sq_return are the running mean, sum of squared
+    differences and sum of squared losses of the return of every trade on the equity it was
+    opened with, for the sharpe and sortino ratios. peak_equity and peak_bar are the highest
+    equity so far and the bar it was hit on for the max drawdown and its duration in bars.
+    open_risk is what the open position loses if its stop loss gets hit, which every pnl gets
+    divided by for its R.
+    """
+
+    closed_trades: int = 0
+    total_trades: int = 1
+    total_pnl: int = 2
+    ending_eq: int = 3
+    no_be_trades: int = 4
+    wins: int = 5
+    cum_pnl: int = 6
+    mean_x: int = 7
+    mean_y: int = 8
+    sxx: int = 9
+    syy: int = 10
+    sxy: int = 11
+    mean_return: int = 12
+    m2_return: int = 13
+    downside_sq_return: int = 14
+    peak_equity: int = 15
+    peak_bar: int = 16
+    in_drawdown: int = 17
+    max_drawdown_pct: int = 18
+    max_drawdown_bars: int = 19
+    gross_profit: int = 20
+    gross_loss: int = 21
+    open_risk: int = 22
+    r_trades: int = 23
+    total_r: int = 24
+    losing_streak: int = 25
+    longest_losing_streak: int = 26
+
+
+TradeMetricField = TradeMetricFieldT()
+
 # ############# Records ############# #
 
 strat_df_array_dt = np.dtype(
@@ -215,6 +335,14 @@ strat_df_array_dt = np.dtype(
         ("to_the_upside", np.float_),
         ("total_pnl", np.float_),
         ("ending_eq", np.float_),
+        ("sharpe_ratio", np.float_),
+        ("sortino_ratio", np.float_),
+        ("max_drawdown_pct", np.float_),
+        ("max_drawdown_bars", np.float_),
+        ("profit_factor", np.float_),
+        ("expectancy", np.float_),
+        ("avg_r", np.float_),
+        ("longest_losing_streak", np.float_),
     ],
     align=True,
 )
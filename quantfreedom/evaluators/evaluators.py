@@ -3,45 +3,119 @@ import numpy as np
 import plotly.graph_objects as go
 from itertools import product
 from plotly.subplots import make_subplots
-from quantfreedom._typing import pdFrame, Union, Array1d
+from quantfreedom._typing import pdFrame, plFrame, Union, Array1d, Array2d
+from quantfreedom.utils.helpers import CombinedEntries, pack_entries, unpack_entries
+from quantfreedom.utils.polars_frames import accepts_polars
+from quantfreedom.nb.eval_funcs import (
+    combine_evals_nb,
+    eval_cols_nb,
+    eval_user_args_nb,
+)
+
+
+def _get_col_positions(
+    columns: pd.Index,
+    key,
+) -> Array1d:
+    """Positions of the columns key selects, the same ones data[key] gives back."""
+    return np.atleast_1d(np.arange(len(columns))[columns.get_loc(key)])
+
+
+def _add_eval_level(
+    columns: pd.MultiIndex,
+    repeats: int,
+    eval_level_values: Array1d,
+) -> pd.MultiIndex:
+    """Every column repeated repeats times with the eval level added to the end."""
+    return pd.MultiIndex.from_arrays(
+        [
+            columns.get_level_values(level).repeat(repeats)
+            for level in range(columns.nlevels)
+        ]
+        + [eval_level_values]
+    )
+
+
+def _eval_by_cols(
+    want_to_evaluate: pdFrame,
+    other_values: Array2d,
+    other_keys: list,
+    is_above: bool,
+) -> Array2d:
+    """
+    Compares the columns of want_to_evaluate that other_keys[i] selects to column i of
+    other_values, in the order of other_keys.
+    """
+    eval_cols = []
+    other_cols = []
+    for other_col, key in enumerate(other_keys):
+        key_cols = _get_col_positions(want_to_evaluate.columns, key)
+        eval_cols.append(key_cols)
+        other_cols.append(np.full(key_cols.size, other_col))
+    eval_cols = np.concatenate(eval_cols)
+
+    want_to_evaluate_values = want_to_evaluate.values
+    if not np.array_equal(eval_cols, np.arange(want_to_evaluate.shape[1])):
+        want_to_evaluate_values = want_to_evaluate_values[:, eval_cols]
+    return eval_cols_nb(
+        values=np.asfortranarray(want_to_evaluate_values, dtype=np.float_),
+        other_values=np.asfortranarray(other_values, dtype=np.float_),
+        other_cols=np.concatenate(other_cols),
+        is_above=is_above,
+    )
 
 
+@accepts_polars(
+    "first_eval_data", "second_eval_data", "prices", "first_ind_data", "second_ind_data"
+)
 def combine_evals(
-    first_eval_data: pdFrame,
-    second_eval_data: pdFrame,
+    first_eval_data: Union[pdFrame, plFrame],
+    second_eval_data: Union[pdFrame, plFrame],
     plot_results: bool = False,
     first_eval_data_needs_prices: bool = False,
     second_eval_data_needs_prices: bool = False,
-    prices: pdFrame = None,
-    first_ind_data: pdFrame = None,
-    second_ind_data: pdFrame = None,
-) -> pdFrame:
+    prices: Union[pdFrame, plFrame] = None,
+    first_ind_data: Union[pdFrame, plFrame] = None,
+    second_ind_data: Union[pdFrame, plFrame] = None,
+    packed: bool = False,
+    lazy: bool = False,
+) -> Union[pdFrame, plFrame, CombinedEntries]:
     """
     _summary_
 
     Parameters
     ----------
-    first_eval_data : pdFrame
-        _description_
-    second_eval_data : pdFrame
-        _description_
+    first_eval_data : pdFrame or plFrame
+        _description_, a polars frame in the wide or long layout of polars_to_pandas works too
+    second_eval_data : pdFrame or plFrame
+        _description_, a polars frame in the wide or long layout of polars_to_pandas works too
     plot_results : bool, optional
         _description_, by default False
     first_eval_data_needs_prices : bool, optional
         _description_, by default False
     second_eval_data_needs_prices : bool, optional
         _description_, by default False
-    prices : pdFrame, optional
+    prices : pdFrame or plFrame, optional
         _description_, by default None
-    first_ind_data : pdFrame, optional
+    first_ind_data : pdFrame or plFrame, optional
         _description_, by default None
-    second_ind_data : pdFrame, optional
+    second_ind_data : pdFrame or plFrame, optional
         _description_, by default None
+    packed : bool, optional
+        Give back the combined entries packed into uint64 words like pack_entries does. The evals
+        get packed first and then anded 64 bars at a time, so the combined entries never exist as
+        bools. This also happens on its own when either eval data is already packed, by default
+        False
+    lazy : bool, optional
+        Give back CombinedEntries instead of a dataframe. They only keep the two eval data and
+        which of their columns go together, and backtest_df_only combines every column as it
+        gets to it, so you can backtest far more combinations than would fit in memory, by
+        default False
 
     Returns
     -------
-    pdFrame
-        _description_
+    pdFrame, plFrame or CombinedEntries
+        _description_, a polars frame in the layout of the first polars frame you sent
 
     Raises
     ------
@@ -89,10 +163,6 @@ def combine_evals(
     pd_col_names = pd_col_names + list(first_eval_data.droplevel(pd_col_names, axis=1).columns.names) + \
         list(second_eval_data.droplevel(pd_col_names, axis=1).columns.names)
 
-    combine_array = np.empty(
-        (first_eval_data.shape[0], first_eval_data[levels[0]].shape[1] * second_eval_data[levels[0]].shape[1] * len(levels)), dtype=np.bool_
-    )
-
     try:
         second_eval_data[levels[0]].columns[0][0]
         temp_smaller_def_columns = list(second_eval_data[levels[0]].columns)
@@ -109,33 +179,69 @@ def combine_evals(
         for value in list(first_eval_data[levels[0]].columns):
             temp_big_def_columns.append((value,))
 
-    comb_counter = 0
-    pd_multind_tuples = ()
-    for level in levels:
-        temp_big_df = first_eval_data[level]
-        temp_small_df = second_eval_data[level]
-        for big_count, big_values in enumerate(temp_big_df.values.T):
-
-            for small_count, small_values in enumerate(temp_small_df.values.T):
-
-                combine_array[:, comb_counter] = np.logical_and(
-                    big_values == True, small_values == True
-                )
-
-                pd_multind_tuples = pd_multind_tuples + (
-                    level + temp_big_def_columns[big_count] +
-                    temp_smaller_def_columns[small_count],
-                )
+    # every level, every first eval column of that level and every second eval column of that
+    # level, with the second eval columns changing the fastest
+    first_level_cols = np.array(
+        [_get_col_positions(first_eval_data.columns, level) for level in levels]
+    )
+    second_level_cols = np.array(
+        [_get_col_positions(second_eval_data.columns, level) for level in levels]
+    )
+    level_idx, big_idx, small_idx = np.unravel_index(
+        np.arange(len(levels) * len(temp_big_def_columns) * len(temp_smaller_def_columns)),
+        (len(levels), len(temp_big_def_columns), len(temp_smaller_def_columns)),
+    )
+    first_is_packed = all(dtype == np.uint64 for dtype in first_eval_data.dtypes)
+    second_is_packed = all(dtype == np.uint64 for dtype in second_eval_data.dtypes)
+    packed = packed or first_is_packed or second_is_packed
+    if packed:
+        first_eval_data = first_eval_data if first_is_packed else pack_entries(first_eval_data)
+        second_eval_data = (
+            second_eval_data if second_is_packed else pack_entries(second_eval_data)
+        )
+        first_evals = np.asfortranarray(first_eval_data.values, dtype=np.uint64)
+        second_evals = np.asfortranarray(second_eval_data.values, dtype=np.uint64)
+    else:
+        first_evals = np.asfortranarray(first_eval_data.values == True)
+        second_evals = np.asfortranarray(second_eval_data.values == True)
+    first_cols = first_level_cols[level_idx, big_idx]
+    second_cols = second_level_cols[level_idx, small_idx]
+    if lazy:
+        # only the last column gets created, it is the one that gets plotted
+        first_cols_to_combine = first_cols[-1:]
+        second_cols_to_combine = second_cols[-1:]
+    else:
+        first_cols_to_combine = first_cols
+        second_cols_to_combine = second_cols
+    combine_array = combine_evals_nb(
+        first_evals=first_evals,
+        second_evals=second_evals,
+        first_cols=first_cols_to_combine,
+        second_cols=second_cols_to_combine,
+    )
 
-                comb_counter += 1
+    levels_columns = pd.MultiIndex.from_tuples(levels)
+    big_columns = pd.MultiIndex.from_tuples(temp_big_def_columns)
+    small_columns = pd.MultiIndex.from_tuples(temp_smaller_def_columns)
+    combine_columns = pd.MultiIndex.from_arrays(
+        [levels_columns.get_level_values(level)[level_idx] for level in range(levels_columns.nlevels)]
+        + [big_columns.get_level_values(level)[big_idx] for level in range(big_columns.nlevels)]
+        + [small_columns.get_level_values(level)[small_idx] for level in range(small_columns.nlevels)],
+        names=pd_col_names,
+    )
 
     if plot_results:
-        plot_index = second_eval_data.index
+        plot_index = second_ind_data.index if packed else second_eval_data.index
 
         temp_first_ind_data = first_ind_data.iloc[:, -1]
         temp_second_ind_data = second_ind_data.iloc[:, -1]
 
-        temp_combine_array = combine_array[:, -1]
+        if packed:
+            temp_combine_array = unpack_entries(
+                pd.DataFrame(combine_array[:, -1:]), index=plot_index
+            ).values[:, 0]
+        else:
+            temp_combine_array = combine_array[:, -1]
 
         # candle data with subplot
         if first_eval_data_needs_prices and not second_eval_data_needs_prices:
@@ -289,24 +395,30 @@ def combine_evals(
             fig.update_layout(height=500, title="Last Column of the Results")
             fig.show()
 
+    if lazy:
+        return CombinedEntries(
+            first_entries=first_eval_data,
+            second_entries=second_eval_data,
+            entries_pairs=np.column_stack((first_cols, second_cols)),
+            columns=combine_columns,
+        )
     return pd.DataFrame(
         combine_array,
         index=second_eval_data.index,
-        columns=pd.MultiIndex.from_tuples(
-            tuples=list(pd_multind_tuples),
-            names=pd_col_names,
-        ),
+        columns=combine_columns,
     )
 
 
+@accepts_polars("want_to_evaluate", "indicator_data", "prices")
 def is_above(
-    want_to_evaluate: pdFrame,
+    want_to_evaluate: Union[pdFrame, plFrame],
     user_args: Union[list[int, float], int, float, Array1d] = None,
-    indicator_data: pdFrame = None,
-    prices: pdFrame = None,
+    indicator_data: Union[pdFrame, plFrame] = None,
+    prices: Union[pdFrame, plFrame] = None,
     cand_ohlc: str = None,
     plot_results: bool = False,
-) -> pdFrame:
+    packed: bool = False,
+) -> Union[pdFrame, plFrame]:
     if not isinstance(want_to_evaluate, pdFrame):
         raise ValueError("Data must be a dataframe with multindex")
 
@@ -315,29 +427,22 @@ def is_above(
     pd_col_names = list(want_to_evaluate.columns.names) + [
         want_to_evaluate_name + "_is_above"
     ]
-    pd_multind_tuples = ()
 
     if isinstance(user_args, (list, Array1d)):
         if not all(isinstance(x, (int, float, np.int_, np.float_)) for x in user_args):
             raise ValueError("user_args must be a list of ints or floats")
         user_args = np.asarray(user_args)
 
-        eval_array = np.empty(
-            (want_to_evaluate.shape[0], want_to_evaluate.shape[1] * user_args.size), dtype=np.bool_
+        eval_array = eval_user_args_nb(
+            values=np.asfortranarray(want_to_evaluate_values, dtype=np.float_),
+            user_args=user_args.astype(np.float_),
+            is_above=True,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns,
+            repeats=user_args.size,
+            eval_level_values=np.tile(user_args, want_to_evaluate.shape[1]),
         )
-
-        eval_array_counter = 0
-        temp_eval_values = want_to_evaluate.values.T
-        for count, value in enumerate(want_to_evaluate.values.T):
-            for eval_col in range(user_args.size):
-                eval_array[:, eval_array_counter] = np.where(
-                    value > user_args[eval_col], True, False
-                )
-                eval_array_counter += 1
-
-                pd_multind_tuples = pd_multind_tuples + (
-                    want_to_evaluate.columns[count] + (user_args[eval_col],),
-                )
 
         if plot_results:
             temp_eval_values = want_to_evaluate.iloc[:, -1].values
@@ -379,27 +484,25 @@ def is_above(
                 "cand_ohlc must be open, high, low or close when sending price data"
             )
 
-        eval_array = np.empty_like(want_to_evaluate, dtype=np.bool_)
         symbols = list(prices.columns.levels[0])
-        eval_array_counter = 0
-
-        for symbol in symbols:
+        prices_values = np.empty((prices.shape[0], len(symbols)), order="F")
+        for symbol_counter, symbol in enumerate(symbols):
             temp_prices_values = prices[symbol][cand_ohlc].values
-            if not all(isinstance(x, (np.int_, np.float_)) for x in temp_prices_values):
+            if temp_prices_values.dtype not in (np.int_, np.float_):
                 raise ValueError("price data must be ints or floats")
+            prices_values[:, symbol_counter] = temp_prices_values
 
-            temp_eval_values = want_to_evaluate[symbol].values.T
-
-            for values in temp_eval_values:
-                eval_array[:, eval_array_counter] = np.where(
-                    values > temp_prices_values, True, False
-                )
-
-                pd_multind_tuples = pd_multind_tuples + (
-                    want_to_evaluate.columns[eval_array_counter] +
-                    (cand_ohlc,),
-                )
-                eval_array_counter += 1
+        eval_array = _eval_by_cols(
+            want_to_evaluate=want_to_evaluate,
+            other_values=prices_values,
+            other_keys=symbols,
+            is_above=True,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns[: eval_array.shape[1]],
+            repeats=1,
+            eval_level_values=np.full(eval_array.shape[1], cand_ohlc, dtype=object),
+        )
 
         if plot_results:
             temp_prices = prices[prices.columns.levels[0][-1]]
@@ -440,14 +543,12 @@ def is_above(
             fig.update_layout(height=500, title="Last Column of the Results")
             fig.show()
 
-        return pd.DataFrame(
+        eval_df = pd.DataFrame(
             eval_array,
             index=want_to_evaluate.index,
-            columns=pd.MultiIndex.from_tuples(
-                tuples=list(pd_multind_tuples),
-                names=pd_col_names,
-            ),
+            columns=eval_columns.set_names(pd_col_names),
         ).swaplevel(1, -1, axis=1)
+        return pack_entries(eval_df) if packed else eval_df
 
     elif isinstance(indicator_data, pdFrame):
         want_to_evaluate_name = want_to_evaluate.columns.names[-1].split("_")[
@@ -458,28 +559,17 @@ def is_above(
             want_to_evaluate_name + "_is_above"
         ]
 
-        want_to_evaluate_settings_tuple_list = want_to_evaluate.columns.to_list()
-
-        eval_array = np.empty_like(want_to_evaluate,  dtype=np.bool_,)
-        pd_multind_tuples = ()
-
-        indicator_data_levels = list(indicator_data.columns)
-        eval_array_counter = 0
-
-        for level in indicator_data_levels:
-            temp_indicator_values = indicator_data[level].values
-            temp_evaluate_values = want_to_evaluate[level].values.T
-
-            for values in temp_evaluate_values:
-                eval_array[:, eval_array_counter] = np.where(
-                    values > temp_indicator_values,
-                    True,
-                    False,
-                )
-                pd_multind_tuples = pd_multind_tuples + \
-                    (want_to_evaluate_settings_tuple_list[eval_array_counter] + (
-                        indicator_data_name,),)
-                eval_array_counter += 1
+        eval_array = _eval_by_cols(
+            want_to_evaluate=want_to_evaluate,
+            other_values=indicator_data.values,
+            other_keys=list(indicator_data.columns),
+            is_above=True,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns[: eval_array.shape[1]],
+            repeats=1,
+            eval_level_values=np.full(eval_array.shape[1], indicator_data_name, dtype=object),
+        )
 
         if plot_results:
             temp_eval_values = want_to_evaluate.iloc[:, -1].values
@@ -519,12 +609,16 @@ def is_above(
             fig.show()
 
     elif isinstance(user_args, (int, float)):
-        eval_array = np.where(want_to_evaluate_values > user_args, True, False)
-
-        for col in range(want_to_evaluate.shape[1]):
-            pd_multind_tuples = pd_multind_tuples + (
-                want_to_evaluate.columns[col] + (user_args,),
-            )
+        eval_array = eval_user_args_nb(
+            values=np.asfortranarray(want_to_evaluate_values, dtype=np.float_),
+            user_args=np.array([user_args], dtype=np.float_),
+            is_above=True,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns,
+            repeats=1,
+            eval_level_values=np.full(want_to_evaluate.shape[1], user_args),
+        )
 
         if plot_results:
             temp_eval_values = want_to_evaluate.iloc[:, -1].values
@@ -558,46 +652,48 @@ def is_above(
         raise ValueError(
             "something is wrong with what you sent please make sure the type of variable you are sending matches with the type required"
         )
-    return pd.DataFrame(
+    eval_df = pd.DataFrame(
         eval_array,
         index=want_to_evaluate.index,
-        columns=pd.MultiIndex.from_tuples(
-            tuples=list(pd_multind_tuples),
-            names=pd_col_names,
-        ),
+        columns=eval_columns.set_names(pd_col_names),
     )
+    return pack_entries(eval_df) if packed else eval_df
 
 
+@accepts_polars("want_to_evaluate", "indicator_data", "prices")
 def is_below(
-    want_to_evaluate: pdFrame,
+    want_to_evaluate: Union[pdFrame, plFrame],
     user_args: Union[list[int, float], int, float, Array1d] = None,
-    indicator_data: pdFrame = None,
-    prices: pdFrame = None,
+    indicator_data: Union[pdFrame, plFrame] = None,
+    prices: Union[pdFrame, plFrame] = None,
     cand_ohlc: str = None,
     plot_results: bool = False,
-) -> pdFrame:
+    packed: bool = False,
+) -> Union[pdFrame, plFrame]:
     """
     _summary_
 
     Parameters
     ----------
-    want_to_evaluate : pdFrame
-        _description_
+    want_to_evaluate : pdFrame or plFrame
+        _description_, a polars frame in the wide or long layout of polars_to_pandas works too
     user_args : Union[list[int, float], int, float, Array1d], optional
         _description_, by default None
-    indicator_data : pdFrame, optional
+    indicator_data : pdFrame or plFrame, optional
         _description_, by default None
-    prices : pdFrame, optional
+    prices : pdFrame or plFrame, optional
         _description_, by default None
     cand_ohlc : str, optional
         _description_, by default None
     plot_results : bool, optional
         _description_, by default False
+    packed : bool, optional
+        Give back the entries packed into uint64 words like pack_entries does, by default False
 
     Returns
     -------
-    pdFrame
-        _description_
+    pdFrame or plFrame
+        _description_, a polars frame in the layout of the first polars frame you sent
 
     Raises
     ------
@@ -620,29 +716,22 @@ def is_below(
     pd_col_names = list(want_to_evaluate.columns.names) + [
         want_to_evaluate_name + "_is_below"
     ]
-    pd_multind_tuples = ()
 
     if isinstance(user_args, (list, Array1d)):
         if not all(isinstance(x, (int, float, np.int_, np.float_)) for x in user_args):
             raise ValueError("user_args must be a list of ints or floats")
         user_args = np.asarray(user_args)
 
-        eval_array = np.empty(
-            (want_to_evaluate.shape[0], want_to_evaluate.shape[1] * user_args.size), dtype=np.bool_
+        eval_array = eval_user_args_nb(
+            values=np.asfortranarray(want_to_evaluate_values, dtype=np.float_),
+            user_args=user_args.astype(np.float_),
+            is_above=False,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns,
+            repeats=user_args.size,
+            eval_level_values=np.tile(user_args, want_to_evaluate.shape[1]),
         )
-
-        eval_array_counter = 0
-        temp_eval_values = want_to_evaluate.values.T
-        for count, value in enumerate(want_to_evaluate.values.T):
-            for eval_col in range(user_args.size):
-                eval_array[:, eval_array_counter] = np.where(
-                    value < user_args[eval_col], True, False
-                )
-                eval_array_counter += 1
-
-                pd_multind_tuples = pd_multind_tuples + (
-                    want_to_evaluate.columns[count] + (user_args[eval_col],),
-                )
 
         if plot_results:
             temp_eval_values = want_to_evaluate.iloc[:, -1].values
@@ -684,27 +773,25 @@ def is_below(
                 "cand_ohlc must be open, high, low or close when sending price data"
             )
 
-        eval_array = np.empty_like(want_to_evaluate, dtype=np.bool_)
         symbols = list(prices.columns.levels[0])
-        eval_array_counter = 0
-
-        for symbol in symbols:
+        prices_values = np.empty((prices.shape[0], len(symbols)), order="F")
+        for symbol_counter, symbol in enumerate(symbols):
             temp_prices_values = prices[symbol][cand_ohlc].values
-            if not all(isinstance(x, (np.int_, np.float_)) for x in temp_prices_values):
+            if temp_prices_values.dtype not in (np.int_, np.float_):
                 raise ValueError("price data must be ints or floats")
+            prices_values[:, symbol_counter] = temp_prices_values
 
-            temp_eval_values = want_to_evaluate[symbol].values.T
-
-            for values in temp_eval_values:
-                eval_array[:, eval_array_counter] = np.where(
-                    values < temp_prices_values, True, False
-                )
-
-                pd_multind_tuples = pd_multind_tuples + (
-                    want_to_evaluate.columns[eval_array_counter] +
-                    (cand_ohlc,),
-                )
-                eval_array_counter += 1
+        eval_array = _eval_by_cols(
+            want_to_evaluate=want_to_evaluate,
+            other_values=prices_values,
+            other_keys=symbols,
+            is_above=False,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns[: eval_array.shape[1]],
+            repeats=1,
+            eval_level_values=np.full(eval_array.shape[1], cand_ohlc, dtype=object),
+        )
 
         if plot_results:
             temp_prices = prices[prices.columns.levels[0][-1]]
@@ -745,14 +832,12 @@ def is_below(
             fig.update_layout(height=500, title="Last Column of the Results")
             fig.show()
 
-        return pd.DataFrame(
+        eval_df = pd.DataFrame(
             eval_array,
             index=want_to_evaluate.index,
-            columns=pd.MultiIndex.from_tuples(
-                tuples=list(pd_multind_tuples),
-                names=pd_col_names,
-            ),
+            columns=eval_columns.set_names(pd_col_names),
         ).swaplevel(1, -1, axis=1)
+        return pack_entries(eval_df) if packed else eval_df
 
     elif isinstance(indicator_data, pdFrame):
         want_to_evaluate_name = want_to_evaluate.columns.names[-1].split("_")[
@@ -763,28 +848,17 @@ def is_below(
             want_to_evaluate_name + "_is_below"
         ]
 
-        want_to_evaluate_settings_tuple_list = want_to_evaluate.columns.to_list()
-
-        eval_array = np.empty_like(want_to_evaluate,  dtype=np.bool_,)
-        pd_multind_tuples = ()
-
-        indicator_data_levels = list(indicator_data.columns)
-        eval_array_counter = 0
-
-        for level in indicator_data_levels:
-            temp_indicator_values = indicator_data[level].values
-            temp_evaluate_values = want_to_evaluate[level].values.T
-
-            for values in temp_evaluate_values:
-                eval_array[:, eval_array_counter] = np.where(
-                    values < temp_indicator_values,
-                    True,
-                    False,
-                )
-                pd_multind_tuples = pd_multind_tuples + \
-                    (want_to_evaluate_settings_tuple_list[eval_array_counter] + (
-                        indicator_data_name,),)
-                eval_array_counter += 1
+        eval_array = _eval_by_cols(
+            want_to_evaluate=want_to_evaluate,
+            other_values=indicator_data.values,
+            other_keys=list(indicator_data.columns),
+            is_above=False,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns[: eval_array.shape[1]],
+            repeats=1,
+            eval_level_values=np.full(eval_array.shape[1], indicator_data_name, dtype=object),
+        )
 
         if plot_results:
             temp_eval_values = want_to_evaluate.iloc[:, -1].values
@@ -824,12 +898,16 @@ def is_below(
             fig.show()
 
     elif isinstance(user_args, (int, float)):
-        eval_array = np.where(want_to_evaluate_values < user_args, True, False)
-
-        for col in range(want_to_evaluate.shape[1]):
-            pd_multind_tuples = pd_multind_tuples + (
-                want_to_evaluate.columns[col] + (user_args,),
-            )
+        eval_array = eval_user_args_nb(
+            values=np.asfortranarray(want_to_evaluate_values, dtype=np.float_),
+            user_args=np.array([user_args], dtype=np.float_),
+            is_above=False,
+        )
+        eval_columns = _add_eval_level(
+            columns=want_to_evaluate.columns,
+            repeats=1,
+            eval_level_values=np.full(want_to_evaluate.shape[1], user_args),
+        )
 
         if plot_results:
             temp_eval_values = want_to_evaluate.iloc[:, -1].values
@@ -863,11 +941,9 @@ def is_below(
         raise ValueError(
             "something is wrong with what you sent please make sure the type of variable you are sending matches with the type required"
         )
-    return pd.DataFrame(
+    eval_df = pd.DataFrame(
         eval_array,
         index=want_to_evaluate.index,
-        columns=pd.MultiIndex.from_tuples(
-            tuples=list(pd_multind_tuples),
-            names=pd_col_names,
-        ),
+        columns=eval_columns.set_names(pd_col_names),
     )
+    return pack_entries(eval_df) if packed else eval_df
@@ -1 +1,2 @@
+from quantfreedom.indicators.cache import *
 from quantfreedom.indicators.talib_ind import *
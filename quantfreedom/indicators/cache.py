@@ -0,0 +1,232 @@
+"""
+Cache for indicator results.
+
+Every run of an indicator is saved under a key made from the function name, a hash of the
+arrays it was run on and the settings it was run with, so running the same indicator with the
+same settings on the same prices again just copies the saved result. Overlapping parameter
+grids only compute the settings that are new.
+
+Results are kept in memory, and the least recently used ones get thrown out once they take
+more than max_bytes. With a cache_dir every result is also saved as an .npy file there, so
+other processes and later sessions that point to the same folder reuse them too.
+"""
+
+import hashlib
+import os
+import threading
+import numpy as np
+
+from collections import OrderedDict
+
+from quantfreedom._typing import Array, Array2d, Optional
+
+__all__ = [
+    "IndicatorCache",
+    "get_indicator_cache",
+    "hash_arrays",
+    "set_indicator_cache",
+]
+
+DEFAULT_CACHE_MAX_BYTES = 256 * 2**20
+
+# the cache from_talib uses, made the first time it is needed
+_indicator_cache = None
+
+
+def hash_arrays(
+    *arrays: Array,
+) -> str:
+    """
+    Hash of the values, shapes and dtypes of arrays.
+
+    Returns
+    -------
+    str
+        hex digest
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        hasher.update(f"{array.dtype.str}{array.shape}".encode())
+        hasher.update(memoryview(array).cast("B"))
+    return hasher.hexdigest()
+
+
+class IndicatorCache:
+    """
+    Indicator results kept in memory up to max_bytes, least recently used first out, and
+    optionally saved to cache_dir.
+
+    Parameters
+    ----------
+    max_bytes : int, 256 MiB
+        Most bytes of results kept in memory. 0 keeps nothing in memory, which only makes
+        sense with a cache_dir.
+    cache_dir : str, None
+        Folder to also save every result in as an .npy file.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+        cache_dir: str = None,
+    ):
+        if max_bytes < 0:
+            raise ValueError("max_bytes can't be negative")
+        self.max_bytes = int(max_bytes)
+        self.cache_dir = cache_dir
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        # from_talib looks things up from its threads
+        self._lock = threading.Lock()
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    @staticmethod
+    def make_key(
+        func_name: str,
+        inputs_hash: str,
+        ind_settings_tup: tuple,
+    ) -> str:
+        """
+        Key of running func_name with the settings in ind_settings_tup on the arrays that
+        hash to inputs_hash.
+        """
+        return hashlib.blake2b(
+            repr((func_name.upper(), inputs_hash, ind_settings_tup)).encode(),
+            digest_size=16,
+        ).hexdigest()
+
+    def _get_path(
+        self,
+        key: str,
+    ) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def _keep_in_memory(
+        self,
+        key: str,
+        result: Array2d,
+    ):
+        if result.nbytes > self.max_bytes:
+            return
+        if key in self._results:
+            self.nbytes -= self._results.pop(key).nbytes
+        self._results[key] = result
+        self.nbytes += result.nbytes
+        while self.nbytes > self.max_bytes:
+            self.nbytes -= self._results.popitem(last=False)[1].nbytes
+
+    def get(
+        self,
+        key: str,
+    ) -> Optional[Array2d]:
+        """
+        Saved result of key, or None if there isn't one. The result is read only.
+        """
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+
+        if self.cache_dir is not None:
+            try:
+                result = np.load(self._get_path(key))
+            except (FileNotFoundError, ValueError, EOFError):
+                result = None
+            if result is not None:
+                result.flags.writeable = False
+                with self._lock:
+                    self._keep_in_memory(key, result)
+                    self.hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(
+        self,
+        key: str,
+        result: Array2d,
+    ):
+        """
+        Saves the result of key. The result is kept as it is and made read only, so don't
+        change it after putting it in.
+        """
+        result = np.ascontiguousarray(result, dtype=np.float_)
+        result.flags.writeable = False
+        with self._lock:
+            self._keep_in_memory(key, result)
+
+        if self.cache_dir is not None:
+            path = self._get_path(key)
+            # written to a temp file first so another process never reads half a result
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "wb") as f:
+                np.save(f, result)
+            os.replace(temp_path, path)
+
+    def clear(
+        self,
+        disk: bool = False,
+    ):
+        """
+        Throws out every result kept in memory, and the ones in cache_dir too with disk=True.
+        """
+        with self._lock:
+            self._results.clear()
+            self.nbytes = 0
+            self.hits = 0
+            self.misses = 0
+        if disk and self.cache_dir is not None:
+            for file_name in os.listdir(self.cache_dir):
+                if file_name.endswith(".npy"):
+                    os.remove(os.path.join(self.cache_dir, file_name))
+
+
+def set_indicator_cache(
+    max_bytes: int = DEFAULT_CACHE_MAX_BYTES,
+    cache_dir: str = None,
+) -> IndicatorCache:
+    """
+    Sets up the cache from_talib uses. Anything in the old cache's memory is thrown out.
+
+    Parameters
+    ----------
+    max_bytes : int, 256 MiB
+        Most bytes of indicator results kept in memory
+    cache_dir : str, None
+        Folder to also save the results in so other processes can use them
+
+    Returns
+    -------
+    IndicatorCache
+        the new cache
+    """
+    global _indicator_cache
+    _indicator_cache = IndicatorCache(max_bytes=max_bytes, cache_dir=cache_dir)
+    return _indicator_cache
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """
+    The cache from_talib uses, a memory only one of 256 MiB unless you called
+    set_indicator_cache.
+
+    Returns
+    -------
+    IndicatorCache
+        the cache
+    """
+    global _indicator_cache
+    if _indicator_cache is None:
+        _indicator_cache = IndicatorCache()
+    return _indicator_cache
@@ -4,18 +4,24 @@ import numpy as np
 import talib
 from talib.abstract import Function
 from talib import get_functions
+from concurrent.futures import ThreadPoolExecutor
 from itertools import product
-from quantfreedom._typing import pdFrame, Array1d
+from quantfreedom._typing import pdFrame, plFrame, Array1d, Union
+from quantfreedom.indicators.cache import get_indicator_cache, hash_arrays
+from quantfreedom.utils.polars_frames import accepts_polars
 
 
+@accepts_polars("prices", "indicator_data")
 def from_talib(
     func_name: str,
-    prices: pdFrame = None,
-    indicator_data: pdFrame = None,
+    prices: Union[pdFrame, plFrame] = None,
+    indicator_data: Union[pdFrame, plFrame] = None,
     cart_product: bool = False,
     combos: bool = False,
+    max_workers: int = None,
+    use_cache: bool = True,
     **kwargs,
-) -> pdFrame:
+) -> Union[pdFrame, plFrame]:
     """
     Function Name
     -------------
@@ -29,19 +35,26 @@ def from_talib(
     ----------
     func_name : str
         _description_
-    prices : pdFrame, None
-        _description_
-    indicator_data : pdFrame, None
-        _description_
+    prices : pdFrame or plFrame, None
+        _description_, a polars frame in the wide or long layout of polars_to_pandas works too
+    indicator_data : pdFrame or plFrame, None
+        _description_, a polars frame in the wide or long layout of polars_to_pandas works too
     cart_product : bool, False
         _description_
     combos : bool, False
         _description_
+    max_workers : int, None
+        How many threads run the indicator. Every setting of every symbol or indicator column
+        is its own run, by default the number the python thread pool picks for your cpu
+    use_cache : bool, True
+        Reuse the results of settings that were already run on the same data, and save the
+        new ones, in the cache from get_indicator_cache. Use set_indicator_cache to change
+        its size or to also keep the results on disk
     
     Returns
     -------
-    pdFrame
-        _description_
+    pdFrame or plFrame
+        _description_, a polars frame in the layout of the polars frame you sent
     """
     if all(x is None for x in (prices, indicator_data)):
         raise ValueError(
@@ -57,7 +70,7 @@ def from_talib(
         or not isinstance(prices, pdFrame)
         and prices is not None
     ):
-        raise ValueError(f"You must send this as a pandas dataframe")
+        raise ValueError(f"You must send this as a pandas or polars dataframe")
     elif isinstance(indicator_data, pdFrame):
         pd_index = indicator_data.index
     elif isinstance(prices, pdFrame):
@@ -202,185 +215,155 @@ def from_talib(
     else:
         final_user_args = tuple(users_args_list)
 
-    ind_settings_tup = ()
-    pd_multind_tuples = ()
     ind_setings_len = final_user_args[0].size
     output_names_len = len(output_names)
+    talib_func = getattr(talib, func_name.upper())
+
+    # the args of every indicator setting, worked out once instead of for every symbol
+    ind_settings_tups = []
+    for c in range(ind_setings_len):
+        ind_settings_tup = ()
+        # x is the array object in the tuple (x,x)
+        for x in final_user_args:
+            if type(x[c]) == np.int_:
+                ind_settings_tup = ind_settings_tup + (int(x[c]),)
+            if type(x[c]) == np.float_:
+                ind_settings_tup = ind_settings_tup + (float(x[c]),)
+        ind_settings_tups.append(ind_settings_tup)
 
     # sending price data as your data to work with
     if prices is not None:
         symbols = list(prices.columns.levels[0])
-        num_of_symbols = len(symbols)
-        final_array = np.empty(
-            (prices.shape[0], ind_setings_len * output_names_len * num_of_symbols))
-        counter = 0
-
         if output_names_len == 1:
             param_keys = [list(prices.columns.names)[0]] + \
                 [ind_name + "_" + x for x in ind_params]
-
-            for symbol in symbols:
-                temp_prices_tuple = ()
-
-                for input_name in input_names:
-                    temp_prices_tuple = temp_prices_tuple + \
-                        (prices[symbol][input_name].values,)
-
-                for c in range(ind_setings_len):
-
-                    # x is the array object in the tuple (x,x)
-                    for x in final_user_args:
-                        if type(x[c]) == np.int_:
-                            ind_settings_tup = ind_settings_tup + (int(x[c]),)
-                        if type(x[c]) == np.float_:
-                            ind_settings_tup = ind_settings_tup + \
-                                (float(x[c]),)
-
-                    final_array[:, counter] = getattr(talib, func_name.upper())(
-                        *temp_prices_tuple,
-                        *ind_settings_tup,
-                    )
-
-                    pd_multind_tuples = pd_multind_tuples + \
-                        ((symbol,) + ind_settings_tup,)
-
-                    ind_settings_tup = ()
-                    counter += 1
-
         elif output_names_len > 1:
             param_keys = [list(prices.columns.names)[
                 0]] + [ind_name + "_output_names"] + [ind_name + "_" + x for x in ind_params]
-
-            for symbol in symbols:
-                temp_prices_tuple = ()
-
-                for input_name in input_names:
-                    temp_prices_tuple = temp_prices_tuple + \
-                        (prices[symbol][input_name].values,)
-
-                # these are the names called by the fun like talib('rsi').real - real is the output name
-                for out_name_count, out_name in enumerate(output_names):
-
-                    # c is the indicator result of the array within the tuple (array[x], array[x])
-                    for c in range(ind_setings_len):
-
-                        # x is the array object in the tuple (x,x)
-                        for x in final_user_args:
-                            if type(x[c]) == np.int_:
-                                ind_settings_tup = ind_settings_tup + \
-                                    (int(x[c]),)
-                            if type(x[c]) == np.float_:
-                                ind_settings_tup = ind_settings_tup + \
-                                    (float(x[c]),)
-
-                        final_array[:, counter] = getattr(talib, func_name.upper())(
-                            *temp_prices_tuple,
-                            *ind_settings_tup,
-                        )[out_name_count]
-
-                        pd_multind_tuples = pd_multind_tuples + (
-                            (symbol,) + (out_name,) + ind_settings_tup,
-                        )
-
-                        ind_settings_tup = ()
-                        counter += 1
-
         else:
             raise ValueError("Something is wrong with the output name length")
 
+        # every symbol's inputs are made contiguous once and shared by all of its settings
+        inputs_tuples = [
+            tuple(
+                np.ascontiguousarray(prices[symbol][input_name].values, dtype=np.float_)
+                for input_name in input_names
+            )
+            for symbol in symbols
+        ]
+        data_columns = pd.MultiIndex.from_product([symbols])
+        total_bars = prices.shape[0]
+
     # sending indicator data as the data you want to work with
     elif indicator_data is not None:
-        counter = 0
-        user_ind_settings = tuple(indicator_data.columns)
-        user_ind_values = indicator_data.values
         user_ind_names = list(indicator_data.columns.names)
-        user_ind_name = user_ind_names[1].split("_")[0]
-        param_keys = [user_ind_name + "_" +
-                      ind_name + "_" + x for x in ind_params]
-        param_keys = user_ind_names + param_keys
-        final_array = np.empty(
-            (
-                indicator_data.shape[0],
-                ind_setings_len * output_names_len * indicator_data.shape[1],
-            )
-        )
         if output_names_len == 1:
-            for col in range(user_ind_values.shape[1]):
-
-                # c is the indicator result of the array within the tuple (array[x], array[x])
-                for c in range(ind_setings_len):
-
-                    # x is the array object in the tuple (x,x)
-                    for x in final_user_args:
-                        if type(x[c]) == np.int_:
-                            ind_settings_tup = ind_settings_tup + (int(x[c]),)
-                        if type(x[c]) == np.float_:
-                            ind_settings_tup = ind_settings_tup + \
-                                (float(x[c]),)
-                    final_array[:, counter] = getattr(talib, func_name.upper())(
-                        user_ind_values[:, col],
-                        *ind_settings_tup,
-                    )
-
-                    pd_multind_tuples = pd_multind_tuples + (
-                        user_ind_settings[col] + ind_settings_tup,
-                    )
-
-                    counter += 1
-                    ind_settings_tup = ()
-
+            user_ind_name = user_ind_names[1].split("_")[0]
+            param_keys = [user_ind_name + "_" +
+                          ind_name + "_" + x for x in ind_params]
+            param_keys = user_ind_names + param_keys
         elif output_names_len > 1:
-            user_ind_col_names = []
-            for col_name in list(indicator_data.columns.names):
-                user_ind_col_names.append(col_name)
-            param_keys = user_ind_col_names + [ind_name + "_output_names"] + [ind_name + "_" + x for x in ind_params]
-
-            # these are the names called by the fun like talib('rsi').real - real is the output name
-            for col in range(user_ind_values.shape[1]):
-                for out_name_count, out_name in enumerate(output_names):
-
-                    # c is the indicator result of the array within the tuple (array[x], array[x])
-                    for c in range(ind_setings_len):
-
-                        # x is the array object in the tuple (x,x)
-                        for x in final_user_args:
-                            if type(x[c]) == np.int_:
-                                ind_settings_tup = ind_settings_tup + \
-                                    (int(x[c]),)
-                            if type(x[c]) == np.float_:
-                                ind_settings_tup = ind_settings_tup + \
-                                    (float(x[c]),)
-
-                        final_array[:, counter] = getattr(talib, func_name.upper())(
-                            user_ind_values[:, col],
-                            *ind_settings_tup,
-                        )[out_name_count]
-
-                        pd_multind_tuples = pd_multind_tuples + (
-                            user_ind_settings[col] +
-                            (out_name,) + ind_settings_tup,
-                        )
-
-                        counter += 1
-                        ind_settings_tup = ()
-
+            param_keys = user_ind_names + [ind_name + "_output_names"] + [ind_name + "_" + x for x in ind_params]
         else:
             raise ValueError(
                 "Something is wrong with the output name length for user ind data"
             )
+
+        # fortran order so every column the indicator gets run on is already contiguous
+        user_ind_values = np.asfortranarray(indicator_data.values, dtype=np.float_)
+        inputs_tuples = [
+            (user_ind_values[:, col],) for col in range(user_ind_values.shape[1])
+        ]
+        data_columns = indicator_data.columns
+        total_bars = indicator_data.shape[0]
     else:
         raise ValueError(
             "Something is wrong with either df prices or user indicator")
+
+    # column (data_col * output_names_len + out_name_count) * ind_setings_len + c is output
+    # out_name_count of setting c on data column data_col, the same order the columns get named in
+    final_array = np.empty(
+        (len(inputs_tuples) * output_names_len * ind_setings_len, total_bars)
+    ).T
+
+    indicator_cache = get_indicator_cache() if use_cache else None
+
+    def run_talib_func(data_col: int, c: int):
+        if indicator_cache is not None:
+            cache_key = indicator_cache.make_key(
+                func_name=func_name,
+                inputs_hash=inputs_hashes[data_col],
+                ind_settings_tup=ind_settings_tups[c],
+            )
+            ind_outputs = indicator_cache.get(cache_key)
+        if indicator_cache is None or ind_outputs is None:
+            ind_outputs = talib_func(*inputs_tuples[data_col], *ind_settings_tups[c])
+            if output_names_len == 1:
+                ind_outputs = (ind_outputs,)
+            if indicator_cache is not None:
+                indicator_cache.put(cache_key, np.stack(ind_outputs))
+        for out_name_count in range(output_names_len):
+            final_array[
+                :, (data_col * output_names_len + out_name_count) * ind_setings_len + c
+            ] = ind_outputs[out_name_count]
+
+    # every setting of every data column is only computed once and talib lets go of the gil so
+    # they all get spread over the threads
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        if indicator_cache is not None:
+            inputs_hashes = list(
+                executor.map(lambda inputs: hash_arrays(*inputs), inputs_tuples)
+            )
+        for ind_run in [
+            executor.submit(run_talib_func, data_col, c)
+            for data_col, c in product(range(len(inputs_tuples)), range(ind_setings_len))
+        ]:
+            ind_run.result()
+
     return pd.DataFrame(
         final_array,
         index=pd_index,
-        columns=pd.MultiIndex.from_tuples(
-            tuples=list(pd_multind_tuples),
+        columns=_get_talib_columns(
+            data_columns=data_columns,
+            output_names=output_names if output_names_len > 1 else None,
+            ind_settings_tups=ind_settings_tups,
             names=param_keys,
         ),
     )
 
 
+def _get_talib_columns(
+    data_columns: pd.MultiIndex,
+    output_names: list,
+    ind_settings_tups: list,
+    names: list,
+) -> pd.MultiIndex:
+    """
+    Every data column, every output name and every indicator setting, with the settings
+    changing the fastest. The settings themselves don't have to be a product of the params
+    because of combos, so the product is over their positions and the levels get filled in
+    from them.
+    """
+    settings_columns = pd.MultiIndex.from_tuples(ind_settings_tups)
+    product_levels = [range(len(data_columns))]
+    if output_names is not None:
+        product_levels.append(range(len(output_names)))
+    product_levels.append(range(len(ind_settings_tups)))
+    product_codes = pd.MultiIndex.from_product(product_levels).codes
+
+    columns = [
+        data_columns.get_level_values(level)[product_codes[0]]
+        for level in range(data_columns.nlevels)
+    ]
+    if output_names is not None:
+        columns.append(pd.Index(output_names)[product_codes[1]])
+    columns += [
+        settings_columns.get_level_values(level)[product_codes[-1]]
+        for level in range(settings_columns.nlevels)
+    ]
+    return pd.MultiIndex.from_arrays(columns, names=names)
+
+
 def talib_ind_info(func_name: str):
     return Function(func_name).info
 
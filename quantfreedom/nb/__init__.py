@@ -1,5 +1,12 @@
 from quantfreedom.nb.buy_funcs import *
+from quantfreedom.nb.eval_funcs import *
 from quantfreedom.nb.execute_funcs import *
 from quantfreedom.nb.helper_funcs import *
 from quantfreedom.nb.sell_funcs import *
 from quantfreedom.nb.simulate import *
+
+# silence NumbaExperimentalFeatureWarning
+import warnings
+from numba.core.errors import NumbaExperimentalFeatureWarning
+
+warnings.filterwarnings("ignore", category=NumbaExperimentalFeatureWarning)
@@ -0,0 +1,83 @@
+import numpy as np
+from numba import njit, prange
+
+from quantfreedom._typing import (
+    Array1d,
+    Array2d,
+)
+
+
+@njit(cache=True, parallel=True)
+def eval_user_args_nb(
+    values: Array2d,
+    user_args: Array1d,
+    is_above: bool,
+) -> Array2d:
+    """
+    Compares every column of values to every one of the user args. The user args change the
+    fastest so eval column col * user_args.size + arg is values[:, col] compared to
+    user_args[arg]. Every eval column gets filled by its own thread.
+    """
+    total_bars = values.shape[0]
+    total_args = user_args.size
+    eval_array = np.empty((values.shape[1] * total_args, total_bars), dtype=np.bool_).T
+    for eval_col in prange(eval_array.shape[1]):
+        col = eval_col // total_args
+        user_arg = user_args[eval_col % total_args]
+        if is_above:
+            for bar in range(total_bars):
+                eval_array[bar, eval_col] = values[bar, col] > user_arg
+        else:
+            for bar in range(total_bars):
+                eval_array[bar, eval_col] = values[bar, col] < user_arg
+    return eval_array
+
+
+@njit(cache=True, parallel=True)
+def eval_cols_nb(
+    values: Array2d,
+    other_values: Array2d,
+    other_cols: Array1d,
+    is_above: bool,
+) -> Array2d:
+    """
+    Compares every column of values to the column of other_values other_cols says, like an
+    indicator to the close prices of its symbol or to another indicator.
+    """
+    total_bars = values.shape[0]
+    eval_array = np.empty((values.shape[1], total_bars), dtype=np.bool_).T
+    for col in prange(values.shape[1]):
+        other_col = other_cols[col]
+        if is_above:
+            for bar in range(total_bars):
+                eval_array[bar, col] = values[bar, col] > other_values[bar, other_col]
+        else:
+            for bar in range(total_bars):
+                eval_array[bar, col] = values[bar, col] < other_values[bar, other_col]
+    return eval_array
+
+
+@njit(cache=True, parallel=True)
+def combine_evals_nb(
+    first_evals: Array2d,
+    second_evals: Array2d,
+    first_cols: Array1d,
+    second_cols: Array1d,
+) -> Array2d:
+    """
+    Column combine_col is first_evals[:, first_cols[combine_col]] and
+    second_evals[:, second_cols[combine_col]].
+
+    The evals can be bools or entries packed into uint64 words by pack_entries, where every
+    and does 64 bars at once.
+    """
+    total_rows = first_evals.shape[0]
+    combine_array = np.empty((first_cols.size, total_rows), dtype=first_evals.dtype).T
+    for combine_col in prange(first_cols.size):
+        first_col = first_cols[combine_col]
+        second_col = second_cols[combine_col]
+        for row in range(total_rows):
+            combine_array[row, combine_col] = (
+                first_evals[row, first_col] & second_evals[row, second_col]
+            )
+    return combine_array
@@ -6,9 +6,24 @@ import numpy as np
 from numba import njit
 
 from quantfreedom._typing import Optional
-from quantfreedom.nb.helper_funcs import fill_order_records_nb, fill_strat_records_nb
-from quantfreedom.nb.buy_funcs import long_increase_nb, long_decrease_nb
-from quantfreedom.nb.sell_funcs import short_increase_nb, short_decrease_nb
+from quantfreedom.nb.helper_funcs import (
+    create_state_nb,
+    fill_order_records_nb,
+    fill_strat_records_nb,
+    get_order_result_nb,
+)
+from quantfreedom.nb.buy_funcs import (
+    long_decrease_nb,
+    long_decrease_state_nb,
+    long_increase_nb,
+    long_increase_state_nb,
+)
+from quantfreedom.nb.sell_funcs import (
+    short_decrease_nb,
+    short_decrease_state_nb,
+    short_increase_nb,
+    short_increase_state_nb,
+)
 from quantfreedom._typing import (
     RecordArray,
     Array1d,
@@ -22,37 +37,37 @@ from quantfreedom.enums.enums import (
     EntryOrder,
     OrderResult,
     StopsOrder,
+    StateField,
     StaticVariables,
 )
 
 
 @njit(cache=True)
-def check_sl_tp_nb(
+def check_sl_tp_state_nb(
     high_price: float,
     low_price: float,
     open_price: float,
     close_price: float,
-    order_settings_counter: int,
     entry_type: int,
     fee_pct: float,
-    bar: int,
-    account_state: AccountState,
-    order_result: OrderResult,
+    state: Array1d,
     stops_order: StopsOrder,
-    order_records_id: Optional[Array1d] = None,
-    order_records: Optional[RecordArray] = None,
-):
+) -> bool:
+    """
+    Same as check_sl_tp_nb but updates the order result fields of a state array laid out
+    like StateField in place. Returns True if the stop loss or trailing stop loss moved.
+    """
     # Check SL
-    moved_sl_to_be_new = order_result.moved_sl_to_be
+    moved_sl_to_be_new = state[StateField.moved_sl_to_be] != 0
     moved_tsl = False
     record_sl_move = False
     order_type_new = entry_type
-    price_new = order_result.price
+    price_new = state[StateField.price]
     size_value_new = np.inf
-    sl_prices_new = order_result.sl_prices
-    tsl_prices_new = order_result.tsl_prices
+    sl_prices_new = state[StateField.sl_prices]
+    tsl_prices_new = state[StateField.tsl_prices]
 
-    average_entry = order_result.average_entry
+    average_entry = state[StateField.average_entry]
 
     # checking if we are in a long
     if order_type_new == OrderType.LongEntry:
@@ -65,12 +80,12 @@ def check_sl_tp_nb(
             price_new = tsl_prices_new
             order_type_new = OrderType.LongTSL
         # Liquidation
-        elif low_price <= order_result.liq_price:
-            price_new = order_result.liq_price
+        elif low_price <= state[StateField.liq_price]:
+            price_new = state[StateField.liq_price]
             order_type_new = OrderType.LongLiq
         # Take Profit
-        elif high_price >= order_result.tp_prices:
-            price_new = order_result.tp_prices
+        elif high_price >= state[StateField.tp_prices]:
+            price_new = state[StateField.tp_prices]
             order_type_new = OrderType.LongTP
 
         # Stop Loss to break even
@@ -141,12 +156,12 @@ def check_sl_tp_nb(
             price_new = tsl_prices_new
             order_type_new = OrderType.ShortTSL
         # Liquidation
-        elif high_price >= order_result.liq_price:
-            price_new = order_result.liq_price
+        elif high_price >= state[StateField.liq_price]:
+            price_new = state[StateField.liq_price]
             order_type_new = OrderType.ShortLiq
         # Take Profit
-        elif low_price <= order_result.tp_prices:
-            price_new = order_result.tp_prices
+        elif low_price <= state[StateField.tp_prices]:
+            price_new = state[StateField.tp_prices]
             order_type_new = OrderType.ShortTP
 
         # Stop Loss to break even
@@ -206,29 +221,46 @@ def check_sl_tp_nb(
             price_new = np.nan
             size_value_new = np.nan
 
-    order_result_new = OrderResult(
-        average_entry=order_result.average_entry,
-        fees_paid=order_result.fees_paid,
-        leverage=order_result.leverage,
-        liq_price=order_result.liq_price,
-        moved_sl_to_be=moved_sl_to_be_new,
-        order_status=order_result.order_status,
-        order_status_info=order_result.order_status_info,
-        order_type=order_type_new,
-        pct_chg_trade=order_result.pct_chg_trade,
-        position=order_result.position,
-        price=price_new,
-        realized_pnl=order_result.realized_pnl,
-        size_value=size_value_new,
-        sl_pcts=order_result.sl_pcts,
-        sl_prices=sl_prices_new,
-        tp_pcts=order_result.tp_pcts,
-        tp_prices=order_result.tp_prices,
-        tsl_pcts_init=order_result.tsl_pcts_init,
-        tsl_prices=tsl_prices_new,
+    state[StateField.moved_sl_to_be] = moved_sl_to_be_new
+    state[StateField.order_type] = order_type_new
+    state[StateField.price] = price_new
+    state[StateField.size_value] = size_value_new
+    state[StateField.sl_prices] = sl_prices_new
+    state[StateField.tsl_prices] = tsl_prices_new
+
+    return record_sl_move or moved_tsl
+
+
+@njit(cache=True)
+def check_sl_tp_nb(
+    high_price: float,
+    low_price: float,
+    open_price: float,
+    close_price: float,
+    order_settings_counter: int,
+    entry_type: int,
+    fee_pct: float,
+    bar: int,
+    account_state: AccountState,
+    order_result: OrderResult,
+    stops_order: StopsOrder,
+    order_records_id: Optional[Array1d] = None,
+    order_records: Optional[RecordArray] = None,
+):
+    state = create_state_nb(account_state=account_state, order_result=order_result)
+    stops_moved = check_sl_tp_state_nb(
+        close_price=close_price,
+        entry_type=entry_type,
+        fee_pct=fee_pct,
+        high_price=high_price,
+        low_price=low_price,
+        open_price=open_price,
+        state=state,
+        stops_order=stops_order,
     )
+    order_result_new = get_order_result_nb(state)
 
-    if order_records is not None and (record_sl_move or moved_tsl):
+    if order_records is not None and stops_moved:
         fill_order_records_nb(
             bar=bar,
             order_records=order_records,
@@ -237,10 +269,51 @@ def check_sl_tp_nb(
             account_state=account_state,
             order_result=order_result_new,
         )
-
     return order_result_new
 
 
+@njit(cache=True)
+def process_order_state_nb(
+    price: float,
+    order_type: int,
+    entry_order: EntryOrder,
+    state: Array1d,
+    static_variables_tuple: StaticVariables,
+) -> bool:
+    """
+    Same as process_order_nb but updates a state array laid out like StateField in place.
+    Returns True if the order closed or reduced a position so the caller knows when to
+    record the strategy pnl.
+    """
+    if order_type == OrderType.LongEntry:
+        long_increase_state_nb(
+            price=price,
+            entry_order=entry_order,
+            state=state,
+            static_variables_tuple=static_variables_tuple,
+        )
+    elif order_type == OrderType.ShortEntry:
+        short_increase_state_nb(
+            price=price,
+            entry_order=entry_order,
+            state=state,
+            static_variables_tuple=static_variables_tuple,
+        )
+    elif OrderType.LongLiq <= order_type <= OrderType.LongTSL:
+        long_decrease_state_nb(
+            fee_pct=static_variables_tuple.fee_pct,
+            state=state,
+        )
+        return True
+    elif OrderType.ShortLiq <= order_type <= OrderType.ShortTSL:
+        short_decrease_state_nb(
+            fee_pct=static_variables_tuple.fee_pct,
+            state=state,
+        )
+        return True
+    return False
+
+
 @njit(cache=True)
 def process_order_nb(
     price: float,
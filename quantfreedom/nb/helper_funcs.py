@@ -15,20 +15,28 @@ from quantfreedom.enums import (
     LeverageMode,
     OrderResult,
     OrderType,
+    ResultFilterOp,
+    ResultMetric,
     SizeType,
     SL_BE_or_Trail_BasedOn,
+    StateField,
     StaticVariables,
     StopsOrder,
+    TradeMetricField,
 )
 
+# how many bars get grouped together when searching for the bar a static stop gets hit
+STOPS_SEARCH_BLOCK_SIZE = 32
+
 
 @njit(cache=True)
 def static_var_checker_nb(
-    divide_records_array_size_by: float,
     equity: float,
+    equity_floor_pct_filter: float,
     fee_pct: float,
     gains_pct_filter: float,
     lev_mode: int,
+    max_drawdown_pct_filter: float,
     max_lev: float,
     max_order_size_pct: float,
     max_order_size_value: float,
@@ -39,6 +47,8 @@ def static_var_checker_nb(
     size_type: int,
     sl_to_be_then_trail: bool,
     sl_to_be: bool,
+    top_k: int,
+    top_k_metric: int,
     total_trade_filter: int,
     tsl_true_or_false: bool,
     upside_filter: float,
@@ -97,8 +107,17 @@ def static_var_checker_nb(
     if not (-1 <= upside_filter <= 1):
         raise ValueError("upside filter must be between -1 and 1")
 
-    if not (1 <= divide_records_array_size_by <= 1000):
-        raise ValueError("divide_records_array_size_by filter must be between 1 and 1000")
+    if equity_floor_pct_filter < 0 or not np.isfinite(equity_floor_pct_filter):
+        raise ValueError("equity_floor_pct_filter needs to be 0 or greater")
+
+    if not (0 < max_drawdown_pct_filter):
+        raise ValueError("max_drawdown_pct_filter needs to be greater than 0")
+
+    if top_k < 0:
+        raise ValueError("top_k needs to be 0 to keep everything or greater than 0")
+
+    if not (0 <= top_k_metric < len(ResultMetric)):
+        raise ValueError("top_k_metric is invalid")
 
     # Static variables creation
     fee_pct /= 100
@@ -106,22 +125,26 @@ def static_var_checker_nb(
     max_order_size_pct /= 100
     min_order_size_pct /= 100
 
+    # the same types no matter if ints or floats got passed in so the kernels compile once
     return StaticVariables(
-        divide_records_array_size_by=divide_records_array_size_by,
-        fee_pct=fee_pct,
-        lev_mode=lev_mode,
-        max_lev=max_lev,
-        max_order_size_pct=max_order_size_pct,
-        max_order_size_value=max_order_size_value,
-        min_order_size_pct=min_order_size_pct,
-        min_order_size_value=min_order_size_value,
-        mmr_pct=mmr_pct,
-        order_type=order_type,
-        size_type=size_type,
-        sl_to_be_then_trail=sl_to_be_then_trail,
-        sl_to_be=sl_to_be,
-        tsl_true_or_false=tsl_true_or_false,
-        upside_filter=upside_filter,
+        equity_floor_pct_filter=float(equity_floor_pct_filter),
+        fee_pct=float(fee_pct),
+        lev_mode=int(lev_mode),
+        max_drawdown_pct_filter=float(max_drawdown_pct_filter),
+        max_lev=float(max_lev),
+        max_order_size_pct=float(max_order_size_pct),
+        max_order_size_value=float(max_order_size_value),
+        min_order_size_pct=float(min_order_size_pct),
+        min_order_size_value=float(min_order_size_value),
+        mmr_pct=float(mmr_pct),
+        order_type=int(order_type),
+        size_type=int(size_type),
+        sl_to_be_then_trail=bool(sl_to_be_then_trail),
+        sl_to_be=bool(sl_to_be),
+        top_k=int(top_k),
+        top_k_metric=int(top_k_metric),
+        tsl_true_or_false=bool(tsl_true_or_false),
+        upside_filter=float(upside_filter),
     )
 
 
@@ -595,6 +618,309 @@ def create_cart_product_nb(
     )
 
 
+@njit(cache=True)
+def create_cart_strides_nb(
+    arrays_1d_tuple: Arrays1dTuple,
+) -> Array1d:
+    """
+    Strides that turn an order settings id into the index of every 1d array, in the same
+    order create_cart_product_nb would have put the rows.
+    """
+    cart_strides = np.empty(len(arrays_1d_tuple), dtype=np.int_)
+    stride = 1
+    for i in range(len(arrays_1d_tuple) - 1, -1, -1):
+        cart_strides[i] = stride
+        stride *= arrays_1d_tuple[i].size
+    return cart_strides
+
+
+@njit(cache=True)
+def get_cart_value_nb(
+    cart_array: Array1d,
+    cart_stride: int,
+    order_settings_counter: int,
+) -> float:
+    return cart_array[(order_settings_counter // cart_stride) % cart_array.size]
+
+
+@njit(cache=True)
+def create_cart_slice_nb(
+    arrays_1d_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    order_settings_start: int,
+    order_settings_end: int,
+) -> Arrays1dTuple:
+    """
+    Only creates the rows order_settings_start to order_settings_end of the cartesian product.
+    """
+    n = order_settings_end - order_settings_start
+    out = np.empty((len(arrays_1d_tuple), n))
+    for i in range(len(arrays_1d_tuple)):
+        for j in range(n):
+            out[i, j] = get_cart_value_nb(
+                cart_array=arrays_1d_tuple[i],
+                cart_stride=cart_strides[i],
+                order_settings_counter=order_settings_start + j,
+            )
+
+    return Arrays1dTuple(
+        out[0],
+        out[1],
+        out[2],
+        out[3],
+        out[4],
+        out[5],
+        out[6],
+        out[7],
+        out[8],
+        out[9],
+        out[10],
+        out[11],
+        out[12],
+        out[13],
+        out[14],
+        out[15],
+    )
+
+
+@njit(cache=True)
+def get_order_settings_nb(
+    order_settings_counter: int,
+    cart_array_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    static_variables_tuple: StaticVariables,
+):
+    """
+    Decodes the order settings id into an EntryOrder and a StopsOrder.
+
+    cart_array_tuple can either be the full cartesian product with strides of 1 or just the
+    1d arrays with the strides from create_cart_strides_nb.
+    """
+    entry_order = EntryOrder(
+        leverage=get_cart_value_nb(
+            cart_array_tuple.leverage, cart_strides[0], order_settings_counter
+        ),
+        max_equity_risk_pct=get_cart_value_nb(
+            cart_array_tuple.max_equity_risk_pct, cart_strides[1], order_settings_counter
+        ),
+        max_equity_risk_value=get_cart_value_nb(
+            cart_array_tuple.max_equity_risk_value,
+            cart_strides[2],
+            order_settings_counter,
+        ),
+        order_type=static_variables_tuple.order_type,
+        risk_rewards=get_cart_value_nb(
+            cart_array_tuple.risk_rewards, cart_strides[3], order_settings_counter
+        ),
+        size_pct=get_cart_value_nb(
+            cart_array_tuple.size_pct, cart_strides[4], order_settings_counter
+        ),
+        size_value=get_cart_value_nb(
+            cart_array_tuple.size_value, cart_strides[5], order_settings_counter
+        ),
+        sl_pcts=get_cart_value_nb(
+            cart_array_tuple.sl_pcts, cart_strides[6], order_settings_counter
+        ),
+        tp_pcts=get_cart_value_nb(
+            cart_array_tuple.tp_pcts, cart_strides[11], order_settings_counter
+        ),
+        tsl_pcts_init=get_cart_value_nb(
+            cart_array_tuple.tsl_pcts_init, cart_strides[13], order_settings_counter
+        ),
+    )
+    stops_order = StopsOrder(
+        sl_to_be=static_variables_tuple.sl_to_be,
+        sl_to_be_based_on=get_cart_value_nb(
+            cart_array_tuple.sl_to_be_based_on, cart_strides[7], order_settings_counter
+        ),
+        sl_to_be_then_trail=static_variables_tuple.sl_to_be_then_trail,
+        sl_to_be_trail_by_when_pct_from_avg_entry=get_cart_value_nb(
+            cart_array_tuple.sl_to_be_trail_by_when_pct_from_avg_entry,
+            cart_strides[8],
+            order_settings_counter,
+        ),
+        sl_to_be_when_pct_from_avg_entry=get_cart_value_nb(
+            cart_array_tuple.sl_to_be_when_pct_from_avg_entry,
+            cart_strides[9],
+            order_settings_counter,
+        ),
+        sl_to_be_zero_or_entry=get_cart_value_nb(
+            cart_array_tuple.sl_to_be_zero_or_entry,
+            cart_strides[10],
+            order_settings_counter,
+        ),
+        tsl_based_on=get_cart_value_nb(
+            cart_array_tuple.tsl_based_on, cart_strides[12], order_settings_counter
+        ),
+        tsl_trail_by_pct=get_cart_value_nb(
+            cart_array_tuple.tsl_trail_by_pct, cart_strides[14], order_settings_counter
+        ),
+        tsl_true_or_false=static_variables_tuple.tsl_true_or_false,
+        tsl_when_pct_from_avg_entry=get_cart_value_nb(
+            cart_array_tuple.tsl_when_pct_from_avg_entry,
+            cart_strides[15],
+            order_settings_counter,
+        ),
+    )
+    return entry_order, stops_order
+
+
+@njit(cache=True)
+def get_block_order_settings_nb(
+    order_settings_start: int,
+    lanes: int,
+    cart_array_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    static_variables_tuple: StaticVariables,
+):
+    """
+    Decodes the order settings ids order_settings_start up to order_settings_start + lanes
+    into a list of EntryOrder and a list of StopsOrder, one for every lane of a block.
+    """
+    entry_order, stops_order = get_order_settings_nb(
+        cart_array_tuple=cart_array_tuple,
+        cart_strides=cart_strides,
+        order_settings_counter=order_settings_start,
+        static_variables_tuple=static_variables_tuple,
+    )
+    entry_orders = [entry_order]
+    stops_orders = [stops_order]
+    for lane in range(1, lanes):
+        entry_order, stops_order = get_order_settings_nb(
+            cart_array_tuple=cart_array_tuple,
+            cart_strides=cart_strides,
+            order_settings_counter=order_settings_start + lane,
+            static_variables_tuple=static_variables_tuple,
+        )
+        entry_orders.append(entry_order)
+        stops_orders.append(stops_order)
+    return entry_orders, stops_orders
+
+
+@njit(cache=True)
+def fill_state_nb(
+    state: Array1d,
+    account_state: AccountState,
+    order_result: OrderResult,
+):
+    """
+    Copies an AccountState and an OrderResult into a state array laid out like StateField.
+    """
+    state[StateField.available_balance] = account_state.available_balance
+    state[StateField.cash_borrowed] = account_state.cash_borrowed
+    state[StateField.cash_used] = account_state.cash_used
+    state[StateField.equity] = account_state.equity
+    state[StateField.average_entry] = order_result.average_entry
+    state[StateField.fees_paid] = order_result.fees_paid
+    state[StateField.leverage] = order_result.leverage
+    state[StateField.liq_price] = order_result.liq_price
+    state[StateField.moved_sl_to_be] = order_result.moved_sl_to_be
+    state[StateField.order_status] = order_result.order_status
+    state[StateField.order_status_info] = order_result.order_status_info
+    state[StateField.order_type] = order_result.order_type
+    state[StateField.pct_chg_trade] = order_result.pct_chg_trade
+    state[StateField.position] = order_result.position
+    state[StateField.price] = order_result.price
+    state[StateField.realized_pnl] = order_result.realized_pnl
+    state[StateField.size_value] = order_result.size_value
+    state[StateField.sl_pcts] = order_result.sl_pcts
+    state[StateField.sl_prices] = order_result.sl_prices
+    state[StateField.tp_pcts] = order_result.tp_pcts
+    state[StateField.tp_prices] = order_result.tp_prices
+    state[StateField.tsl_pcts_init] = order_result.tsl_pcts_init
+    state[StateField.tsl_prices] = order_result.tsl_prices
+
+
+@njit(cache=True)
+def create_state_nb(
+    account_state: AccountState,
+    order_result: OrderResult,
+) -> Array1d:
+    state = np.empty(len(StateField))
+    fill_state_nb(
+        state=state,
+        account_state=account_state,
+        order_result=order_result,
+    )
+    return state
+
+
+@njit(cache=True)
+def reset_state_nb(
+    state: Array1d,
+    og_equity: float,
+    order_type: int,
+):
+    """
+    Puts a state array back to the account state and order result every backtest starts with.
+    """
+    fill_state_nb(
+        state=state,
+        account_state=AccountState(
+            available_balance=og_equity,
+            cash_borrowed=0.0,
+            cash_used=0.0,
+            equity=og_equity,
+        ),
+        order_result=OrderResult(
+            average_entry=0.0,
+            fees_paid=0.0,
+            leverage=0.0,
+            liq_price=np.nan,
+            moved_sl_to_be=False,
+            order_status=0,
+            order_status_info=0,
+            order_type=order_type,
+            pct_chg_trade=0.0,
+            position=0.0,
+            price=0.0,
+            realized_pnl=0.0,
+            size_value=0.0,
+            sl_pcts=0.0,
+            sl_prices=0.0,
+            tp_pcts=0.0,
+            tp_prices=0.0,
+            tsl_pcts_init=0.0,
+            tsl_prices=0.0,
+        ),
+    )
+
+
+@njit(cache=True)
+def get_account_state_nb(state: Array1d) -> AccountState:
+    return AccountState(
+        available_balance=state[StateField.available_balance],
+        cash_borrowed=state[StateField.cash_borrowed],
+        cash_used=state[StateField.cash_used],
+        equity=state[StateField.equity],
+    )
+
+
+@njit(cache=True)
+def get_order_result_nb(state: Array1d) -> OrderResult:
+    return OrderResult(
+        average_entry=state[StateField.average_entry],
+        fees_paid=state[StateField.fees_paid],
+        leverage=state[StateField.leverage],
+        liq_price=state[StateField.liq_price],
+        moved_sl_to_be=state[StateField.moved_sl_to_be] != 0,
+        order_status=int(state[StateField.order_status]),
+        order_status_info=int(state[StateField.order_status_info]),
+        order_type=int(state[StateField.order_type]),
+        pct_chg_trade=state[StateField.pct_chg_trade],
+        position=state[StateField.position],
+        price=state[StateField.price],
+        realized_pnl=state[StateField.realized_pnl],
+        size_value=state[StateField.size_value],
+        sl_pcts=state[StateField.sl_pcts],
+        sl_prices=state[StateField.sl_prices],
+        tp_pcts=state[StateField.tp_pcts],
+        tp_prices=state[StateField.tp_prices],
+        tsl_pcts_init=state[StateField.tsl_pcts_init],
+        tsl_prices=state[StateField.tsl_prices],
+    )
+
+
 @njit(cache=True)
 def fill_order_records_nb(
     bar: int,  # time stamp
@@ -641,65 +967,495 @@ def fill_strat_records_nb(
 
 
 @njit(cache=True)
-def get_to_the_upside_nb(
-    gains_pct: float,
-    wins_and_losses_array_no_be: Array1d,
+def reset_trade_metrics_nb(
+    og_equity: float,
+    trade_metrics: Array1d,
 ):
-    x = np.arange(1, len(wins_and_losses_array_no_be) + 1)
-    y = wins_and_losses_array_no_be.cumsum()
+    """
+    Puts a trade metrics array laid out like TradeMetricField back to no trades, with the
+    starting equity as the peak equity on bar 0.
+    """
+    trade_metrics[:] = 0.0
+    trade_metrics[TradeMetricField.peak_equity] = og_equity
 
-    xm = x.mean()
-    ym = y.mean()
 
-    y_ym = y - ym
-    y_ym_s = y_ym**2
+@njit(cache=True)
+def update_trade_metrics_nb(
+    bar: int,
+    equity: float,
+    pnl: float,
+    trade_metrics: Array1d,
+):
+    """
+    Adds a trade that closed on bar to the running metrics of a combination in a trade metrics
+    array laid out like TradeMetricField.
+
+    The pnl gets rounded to 4 decimals like the order records do. Break even trades count
+    towards total trades, total pnl, the returns, profit factor and drawdown but not towards
+    win rate, to the upside or the losing streaks. The sums of squares and products are
+    updated the Welford way so they don't lose precision on long runs of trades.
+
+    The drawdown is measured on the equity after every closed trade, the same equity the max
+    drawdown filter looks at.
+    """
+    trade_metrics[TradeMetricField.closed_trades] += 1
+    trade_metrics[TradeMetricField.ending_eq] = equity
+
+    pnl = round(pnl, 4)
+    if np.isnan(pnl):
+        return
+    total_trades = trade_metrics[TradeMetricField.total_trades] + 1
+    trade_metrics[TradeMetricField.total_trades] = total_trades
+    trade_metrics[TradeMetricField.total_pnl] += pnl
+
+    # return of the trade on the equity it was opened with
+    trade_equity = equity - pnl
+    if trade_equity > 0:
+        trade_return = pnl / trade_equity
+    else:
+        trade_return = 0.0
+    return_dif = trade_return - trade_metrics[TradeMetricField.mean_return]
+    trade_metrics[TradeMetricField.mean_return] += return_dif / total_trades
+    trade_metrics[TradeMetricField.m2_return] += return_dif * (
+        trade_return - trade_metrics[TradeMetricField.mean_return]
+    )
+    if trade_return < 0:
+        trade_metrics[TradeMetricField.downside_sq_return] += trade_return * trade_return
+
+    # drawdown
+    peak_equity = trade_metrics[TradeMetricField.peak_equity]
+    if equity >= peak_equity:
+        if trade_metrics[TradeMetricField.in_drawdown]:
+            trade_metrics[TradeMetricField.max_drawdown_bars] = max(
+                trade_metrics[TradeMetricField.max_drawdown_bars],
+                bar - trade_metrics[TradeMetricField.peak_bar],
+            )
+            trade_metrics[TradeMetricField.in_drawdown] = 0.0
+        trade_metrics[TradeMetricField.peak_equity] = equity
+        trade_metrics[TradeMetricField.peak_bar] = bar
+    else:
+        trade_metrics[TradeMetricField.in_drawdown] = 1.0
+        trade_metrics[TradeMetricField.max_drawdown_pct] = max(
+            trade_metrics[TradeMetricField.max_drawdown_pct],
+            (peak_equity - equity) / peak_equity * 100,
+        )
 
-    x_xm = x - xm
-    x_xm_s = x_xm**2
+    open_risk = trade_metrics[TradeMetricField.open_risk]
+    if open_risk > 0 and np.isfinite(open_risk):
+        trade_metrics[TradeMetricField.r_trades] += 1
+        trade_metrics[TradeMetricField.total_r] += pnl / open_risk
+
+    if pnl == 0:
+        return
+
+    if pnl > 0:
+        trade_metrics[TradeMetricField.gross_profit] += pnl
+        trade_metrics[TradeMetricField.losing_streak] = 0.0
+    else:
+        trade_metrics[TradeMetricField.gross_loss] -= pnl
+        losing_streak = trade_metrics[TradeMetricField.losing_streak] + 1
+        trade_metrics[TradeMetricField.losing_streak] = losing_streak
+        trade_metrics[TradeMetricField.longest_losing_streak] = max(
+            trade_metrics[TradeMetricField.longest_losing_streak], losing_streak
+        )
 
-    b1 = (x_xm * y_ym).sum() / x_xm_s.sum()
-    b0 = ym - b1 * xm
+    x = trade_metrics[TradeMetricField.no_be_trades] + 1
+    trade_metrics[TradeMetricField.no_be_trades] = x
+    if pnl > 0:
+        trade_metrics[TradeMetricField.wins] += 1
+    y = trade_metrics[TradeMetricField.cum_pnl] + pnl
+    trade_metrics[TradeMetricField.cum_pnl] = y
 
-    y_pred = b0 + b1 * x
+    x_dif = x - trade_metrics[TradeMetricField.mean_x]
+    y_dif = y - trade_metrics[TradeMetricField.mean_y]
+    trade_metrics[TradeMetricField.mean_x] += x_dif / x
+    trade_metrics[TradeMetricField.mean_y] += y_dif / x
+    trade_metrics[TradeMetricField.sxx] += x_dif * (x - trade_metrics[TradeMetricField.mean_x])
+    trade_metrics[TradeMetricField.syy] += y_dif * (y - trade_metrics[TradeMetricField.mean_y])
+    trade_metrics[TradeMetricField.sxy] += x_dif * (y - trade_metrics[TradeMetricField.mean_y])
 
-    yp_ym = y_pred - ym
 
-    yp_ym_s = yp_ym**2
+@njit(cache=True)
+def get_entries_signal_bars_nb(
+    entries: Array2d,
+):
+    """
+    Turns every entries column into the bars it has an entry signal on.
+
+    The bars of all columns are put one after the other in entries_signal_bars and the
+    bars of column i are entries_signal_bars[entries_signal_starts[i] : entries_signal_starts[i + 1]].
+
+    entries can be bools or entries packed into uint64 words by pack_entries, where bit b of
+    word w is the signal of bar w * 64 + b.
+    """
+    total_entries_cols = entries.shape[1]
+    entries_signal_starts = np.zeros(total_entries_cols + 1, dtype=np.int_)
+
+    if entries.itemsize == 1:
+        for col in range(total_entries_cols):
+            entries_signal_starts[col + 1] = entries_signal_starts[
+                col
+            ] + np.count_nonzero(entries[:, col])
+
+        entries_signal_bars = np.empty(entries_signal_starts[-1], dtype=np.int_)
+        for col in range(total_entries_cols):
+            entries_signal_bars[
+                entries_signal_starts[col] : entries_signal_starts[col + 1]
+            ] = np.flatnonzero(entries[:, col])
+        return entries_signal_bars, entries_signal_starts
+
+    for col in range(total_entries_cols):
+        total_signals = 0
+        for word_idx in range(entries.shape[0]):
+            word = np.uint64(entries[word_idx, col])
+            while word:
+                # clears the lowest bit that is set
+                word &= word - np.uint64(1)
+                total_signals += 1
+        entries_signal_starts[col + 1] = entries_signal_starts[col] + total_signals
+
+    entries_signal_bars = np.empty(entries_signal_starts[-1], dtype=np.int_)
+    for col in range(total_entries_cols):
+        signal_idx = entries_signal_starts[col]
+        for word_idx in range(entries.shape[0]):
+            word = np.uint64(entries[word_idx, col])
+            bar = word_idx * 64
+            while word:
+                if word & np.uint64(1):
+                    entries_signal_bars[signal_idx] = bar
+                    signal_idx += 1
+                word >>= np.uint64(1)
+                bar += 1
+    return entries_signal_bars, entries_signal_starts
+
+
+@njit(cache=True)
+def get_second_entries_signal_bars_nb(
+    second_entries: Array2d,
+    entries_pairs: Array2d,
+):
+    """
+    get_entries_signal_bars_nb of the second entries of combined entries. Without entries
+    pairs the entries aren't combined and there is nothing to do.
+    """
+    if entries_pairs.shape[0] == 0:
+        return np.empty(0, dtype=np.int_), np.zeros(1, dtype=np.int_)
+    return get_entries_signal_bars_nb(entries=second_entries)
 
-    to_the_upside = yp_ym_s.sum() / y_ym_s.sum()
+
+@njit(cache=True)
+def get_max_entries_signals_nb(
+    entries_pairs: Array2d,
+    entries_signal_starts: Array1d,
+    second_signal_starts: Array1d,
+) -> int:
+    """
+    The most entry signals any entries column has. A combined entries column can't have more
+    signals than either of the two columns it is made of.
+    """
+    if entries_pairs.shape[0] == 0:
+        return np.diff(entries_signal_starts).max()
+
+    max_signals = 0
+    for entries_col in range(entries_pairs.shape[0]):
+        first_col = entries_pairs[entries_col, 0]
+        second_col = entries_pairs[entries_col, 1]
+        max_signals = max(
+            max_signals,
+            min(
+                entries_signal_starts[first_col + 1] - entries_signal_starts[first_col],
+                second_signal_starts[second_col + 1] - second_signal_starts[second_col],
+            ),
+        )
+    return max_signals
+
+
+@njit(cache=True)
+def get_entries_col_signal_bars_nb(
+    combined_signal_bars: Array1d,
+    entries_col: int,
+    entries_pairs: Array2d,
+    entries_signal_bars: Array1d,
+    entries_signal_starts: Array1d,
+    second_signal_bars: Array1d,
+    second_signal_starts: Array1d,
+) -> Array1d:
+    """
+    Bars entries column entries_col has an entry signal on.
+
+    With entries pairs the column is first entries column entries_pairs[entries_col, 0] and
+    second entries column entries_pairs[entries_col, 1]. Both signal bar lists are sorted so
+    walking them at the same time gives the bars both have a signal on, which get written to
+    combined_signal_bars. That is the same as anding the two columns without ever creating the
+    combined column.
+    """
+    if entries_pairs.shape[0] == 0:
+        return entries_signal_bars[
+            entries_signal_starts[entries_col] : entries_signal_starts[entries_col + 1]
+        ]
+
+    first_col = entries_pairs[entries_col, 0]
+    second_col = entries_pairs[entries_col, 1]
+    first_idx = entries_signal_starts[first_col]
+    first_end = entries_signal_starts[first_col + 1]
+    second_idx = second_signal_starts[second_col]
+    second_end = second_signal_starts[second_col + 1]
+    total_signals = 0
+    while first_idx < first_end and second_idx < second_end:
+        first_bar = entries_signal_bars[first_idx]
+        second_bar = second_signal_bars[second_idx]
+        if first_bar < second_bar:
+            first_idx += 1
+        elif second_bar < first_bar:
+            second_idx += 1
+        else:
+            combined_signal_bars[total_signals] = first_bar
+            total_signals += 1
+            first_idx += 1
+            second_idx += 1
+    return combined_signal_bars[:total_signals]
+
+
+@njit(cache=True)
+def create_stops_search_tables_nb(
+    num_of_symbols: int,
+    prices: Array2d,
+):
+    """
+    Lowest lows and highest highs of every block of STOPS_SEARCH_BLOCK_SIZE bars for every
+    symbol, with a sparse table over the blocks so get_first_stop_hit_bar_nb can skip over
+    runs of blocks where a static stop loss or take profit can't be hit.
+
+    lows_table[symbol, level, block] is the lowest low of the 2**level blocks starting at block
+    and highs_table is the same for the highest high.
+    """
+    total_bars = prices.shape[0]
+    total_blocks = -(-total_bars // STOPS_SEARCH_BLOCK_SIZE)
+    levels = 1
+    while (1 << levels) <= total_blocks:
+        levels += 1
+
+    lows_table = np.full((num_of_symbols, levels, total_blocks), np.inf)
+    highs_table = np.full((num_of_symbols, levels, total_blocks), -np.inf)
+    for symbol_counter in range(num_of_symbols):
+        high_prices = prices[:, symbol_counter * 4 + 1]
+        low_prices = prices[:, symbol_counter * 4 + 2]
+        for bar in range(total_bars):
+            block = bar // STOPS_SEARCH_BLOCK_SIZE
+            if low_prices[bar] < lows_table[symbol_counter, 0, block]:
+                lows_table[symbol_counter, 0, block] = low_prices[bar]
+            if high_prices[bar] > highs_table[symbol_counter, 0, block]:
+                highs_table[symbol_counter, 0, block] = high_prices[bar]
+
+        for level in range(1, levels):
+            half = 1 << (level - 1)
+            for block in range(total_blocks - (1 << level) + 1):
+                lows_table[symbol_counter, level, block] = min(
+                    lows_table[symbol_counter, level - 1, block],
+                    lows_table[symbol_counter, level - 1, block + half],
+                )
+                highs_table[symbol_counter, level, block] = max(
+                    highs_table[symbol_counter, level - 1, block],
+                    highs_table[symbol_counter, level - 1, block + half],
+                )
+    return lows_table, highs_table
+
+
+@njit(cache=True)
+def get_stops_search_tables_nb(
+    num_of_symbols: int,
+    prices: Array2d,
+    static_variables_tuple: StaticVariables,
+):
+    """
+    The stops search tables are only used when the stops can't move, so they only get
+    created when sl_to_be and the trailing stop loss are both off.
+    """
+    if static_variables_tuple.sl_to_be or static_variables_tuple.tsl_true_or_false:
+        return (
+            np.empty((num_of_symbols, 0, 0)),
+            np.empty((num_of_symbols, 0, 0)),
+        )
+    return create_stops_search_tables_nb(num_of_symbols=num_of_symbols, prices=prices)
+
+
+@njit(cache=True)
+def get_first_stop_hit_bar_nb(
+    start_bar: int,
+    end_bar: int,
+    high_prices: Array1d,
+    low_prices: Array1d,
+    stops_lows_table: Array2d,
+    stops_highs_table: Array2d,
+    low_stop: float,
+    high_stop: float,
+) -> int:
+    """
+    First bar from start_bar up to, but not including, end_bar where low <= low_stop or
+    high >= high_stop. Returns end_bar if there isn't one.
+
+    stops_lows_table and stops_highs_table are the tables of one symbol from
+    create_stops_search_tables_nb.
+    """
+    bar = start_bar
+
+    # bars before the start of the next whole block
+    bars_end = min(-(-bar // STOPS_SEARCH_BLOCK_SIZE) * STOPS_SEARCH_BLOCK_SIZE, end_bar)
+    while bar < bars_end:
+        if low_prices[bar] <= low_stop or high_prices[bar] >= high_stop:
+            return bar
+        bar += 1
+
+    # jumping over the whole blocks that can't have a hit, biggest jumps first
+    block = bar // STOPS_SEARCH_BLOCK_SIZE
+    end_block = end_bar // STOPS_SEARCH_BLOCK_SIZE
+    if block < end_block:
+        for level in range(stops_lows_table.shape[0] - 1, -1, -1):
+            if (
+                block + (1 << level) <= end_block
+                and stops_lows_table[level, block] > low_stop
+                and stops_highs_table[level, block] < high_stop
+            ):
+                block += 1 << level
+        bar = max(bar, block * STOPS_SEARCH_BLOCK_SIZE)
+
+    # the block with the hit or the bars after the last whole block
+    while bar < end_bar:
+        if low_prices[bar] <= low_stop or high_prices[bar] >= high_stop:
+            return bar
+        bar += 1
+    return end_bar
+
+
+@njit(cache=True)
+def get_to_the_upside_nb(
+    gains_pct: float,
+    trade_metrics: Array1d,
+):
+    """
+    R squared of the line fit to the cumulative pnl of the trades that weren't break even,
+    negative if the combination lost money. It is nan when there aren't two of those trades
+    or they don't move the cumulative pnl.
+    """
+    sxx = trade_metrics[TradeMetricField.sxx]
+    syy = trade_metrics[TradeMetricField.syy]
+    if sxx == 0 or syy == 0:
+        return np.nan
+    sxy = trade_metrics[TradeMetricField.sxy]
+    to_the_upside = sxy * sxy / (sxx * syy)
 
     if gains_pct <= 0:
         to_the_upside = -to_the_upside
     return to_the_upside
 
 
+@njit(cache=True)
+def get_sharpe_ratio_nb(
+    trade_metrics: Array1d,
+) -> float:
+    """
+    Mean over the sample standard deviation of the trade returns, per trade and not
+    annualized. It is nan when there aren't two trades or every trade returned the same.
+    """
+    total_trades = trade_metrics[TradeMetricField.total_trades]
+    if total_trades < 2:
+        return np.nan
+    std_return = np.sqrt(trade_metrics[TradeMetricField.m2_return] / (total_trades - 1))
+    if std_return == 0:
+        return np.nan
+    return trade_metrics[TradeMetricField.mean_return] / std_return
+
+
+@njit(cache=True)
+def get_sortino_ratio_nb(
+    trade_metrics: Array1d,
+) -> float:
+    """
+    Mean over the downside deviation of the trade returns, per trade and not annualized. It
+    is inf when the trades made money without a single losing one and nan when there are no
+    trades or they made nothing without losing.
+    """
+    total_trades = trade_metrics[TradeMetricField.total_trades]
+    if total_trades == 0:
+        return np.nan
+    mean_return = trade_metrics[TradeMetricField.mean_return]
+    downside_sq_return = trade_metrics[TradeMetricField.downside_sq_return]
+    if downside_sq_return == 0:
+        return np.inf if mean_return > 0 else np.nan
+    return mean_return / np.sqrt(downside_sq_return / total_trades)
+
+
 @njit(cache=True)
 def fill_strategy_result_records_nb(
+    entries_col: int,
     gains_pct: float,
+    order_settings_counter: int,
     strategy_result_records: RecordArray,
-    temp_strat_records: Array1d,
+    symbol_counter: int,
     to_the_upside: float,
-    total_trades: int,
-    wins_and_losses_array_no_be: Array1d,
+    total_bars: int,
+    trade_metrics: Array1d,
 ) -> RecordArray:
     # win rate calc
-    win_loss = np.where(wins_and_losses_array_no_be < 0, 0, 1)
-    win_rate = round(np.count_nonzero(win_loss) / win_loss.size * 100, 2)
-
-    total_pnl = temp_strat_records["real_pnl"][
-        ~np.isnan(temp_strat_records["real_pnl"])
-    ].sum()
+    win_rate = round(
+        trade_metrics[TradeMetricField.wins]
+        / trade_metrics[TradeMetricField.no_be_trades]
+        * 100,
+        2,
+    )
 
     # strat array
-    strategy_result_records["symbol"] = temp_strat_records["symbol"][0]
-    strategy_result_records["entries_col"] = temp_strat_records["entries_col"][0]
-    strategy_result_records["or_set"] = temp_strat_records["or_set"][0]
-    strategy_result_records["total_trades"] = total_trades
+    strategy_result_records["symbol"] = symbol_counter
+    strategy_result_records["entries_col"] = entries_col
+    strategy_result_records["or_set"] = order_settings_counter
+    strategy_result_records["total_trades"] = trade_metrics[TradeMetricField.total_trades]
     strategy_result_records["gains_pct"] = gains_pct
     strategy_result_records["win_rate"] = win_rate
     strategy_result_records["to_the_upside"] = to_the_upside
-    strategy_result_records["total_pnl"] = total_pnl
-    strategy_result_records["ending_eq"] = temp_strat_records["equity"][-1]
+    strategy_result_records["total_pnl"] = trade_metrics[TradeMetricField.total_pnl]
+    strategy_result_records["ending_eq"] = trade_metrics[TradeMetricField.ending_eq]
+
+    strategy_result_records["sharpe_ratio"] = get_sharpe_ratio_nb(trade_metrics)
+    strategy_result_records["sortino_ratio"] = get_sortino_ratio_nb(trade_metrics)
+
+    # a drawdown that never recovered lasts until the last bar
+    max_drawdown_bars = trade_metrics[TradeMetricField.max_drawdown_bars]
+    if trade_metrics[TradeMetricField.in_drawdown]:
+        max_drawdown_bars = max(
+            max_drawdown_bars,
+            total_bars - 1 - trade_metrics[TradeMetricField.peak_bar],
+        )
+    strategy_result_records["max_drawdown_pct"] = trade_metrics[
+        TradeMetricField.max_drawdown_pct
+    ]
+    strategy_result_records["max_drawdown_bars"] = max_drawdown_bars
+
+    gross_profit = trade_metrics[TradeMetricField.gross_profit]
+    gross_loss = trade_metrics[TradeMetricField.gross_loss]
+    if gross_loss > 0:
+        profit_factor = gross_profit / gross_loss
+    elif gross_profit > 0:
+        profit_factor = np.inf
+    else:
+        profit_factor = np.nan
+    strategy_result_records["profit_factor"] = profit_factor
+
+    total_trades = trade_metrics[TradeMetricField.total_trades]
+    if total_trades > 0:
+        strategy_result_records["expectancy"] = (
+            trade_metrics[TradeMetricField.total_pnl] / total_trades
+        )
+    else:
+        strategy_result_records["expectancy"] = np.nan
+
+    r_trades = trade_metrics[TradeMetricField.r_trades]
+    if r_trades > 0:
+        strategy_result_records["avg_r"] = trade_metrics[TradeMetricField.total_r] / r_trades
+    else:
+        strategy_result_records["avg_r"] = np.nan
+    strategy_result_records["longest_losing_streak"] = trade_metrics[
+        TradeMetricField.longest_losing_streak
+    ]
 
 
 @njit(cache=True)
@@ -740,6 +1496,259 @@ def fill_settings_result_records_nb(
     )
 
 
+@njit(cache=True)
+def get_result_metric_nb(
+    strategy_result_records: RecordArray,
+    result_metric: int,
+) -> float:
+    """
+    Gets the metric picked with ResultMetric out of one row of the strategy result records.
+    """
+    if result_metric == ResultMetric.total_trades:
+        return strategy_result_records["total_trades"]
+    elif result_metric == ResultMetric.gains_pct:
+        return strategy_result_records["gains_pct"]
+    elif result_metric == ResultMetric.win_rate:
+        return strategy_result_records["win_rate"]
+    elif result_metric == ResultMetric.to_the_upside:
+        return strategy_result_records["to_the_upside"]
+    elif result_metric == ResultMetric.total_pnl:
+        return strategy_result_records["total_pnl"]
+    elif result_metric == ResultMetric.ending_eq:
+        return strategy_result_records["ending_eq"]
+    elif result_metric == ResultMetric.sharpe_ratio:
+        return strategy_result_records["sharpe_ratio"]
+    elif result_metric == ResultMetric.sortino_ratio:
+        return strategy_result_records["sortino_ratio"]
+    elif result_metric == ResultMetric.max_drawdown_pct:
+        return strategy_result_records["max_drawdown_pct"]
+    elif result_metric == ResultMetric.max_drawdown_bars:
+        return strategy_result_records["max_drawdown_bars"]
+    elif result_metric == ResultMetric.profit_factor:
+        return strategy_result_records["profit_factor"]
+    elif result_metric == ResultMetric.expectancy:
+        return strategy_result_records["expectancy"]
+    elif result_metric == ResultMetric.avg_r:
+        return strategy_result_records["avg_r"]
+    else:
+        return strategy_result_records["longest_losing_streak"]
+
+
+@njit(cache=True)
+def get_top_k_key_nb(
+    strategy_result_records: RecordArray,
+    top_k_metric: int,
+) -> float:
+    """
+    Key the top k gets sorted by, higher is better. Drawdowns and losing streaks are better
+    when they are lower so they get flipped, and nan is always the worst.
+    """
+    key = get_result_metric_nb(
+        strategy_result_records=strategy_result_records,
+        result_metric=top_k_metric,
+    )
+    if np.isnan(key):
+        return -np.inf
+    if (
+        top_k_metric == ResultMetric.max_drawdown_pct
+        or top_k_metric == ResultMetric.max_drawdown_bars
+        or top_k_metric == ResultMetric.longest_losing_streak
+    ):
+        return -key
+    return key
+
+
+@njit(cache=True)
+def passes_result_filters_nb(
+    result_filters: Array2d,
+    strategy_result_records: RecordArray,
+) -> bool:
+    """
+    True if one row of the strategy result records passes every result filter. Every row of
+    result_filters is a ResultMetric, a ResultFilterOp and the threshold the metric gets
+    compared to. A metric that is nan never passes.
+    """
+    for i in range(result_filters.shape[0]):
+        metric = get_result_metric_nb(
+            strategy_result_records=strategy_result_records,
+            result_metric=int(result_filters[i, 0]),
+        )
+        op = int(result_filters[i, 1])
+        threshold = result_filters[i, 2]
+        if op == ResultFilterOp.GreaterThan:
+            passes = metric > threshold
+        elif op == ResultFilterOp.GreaterThanOrEqual:
+            passes = metric >= threshold
+        elif op == ResultFilterOp.LessThan:
+            passes = metric < threshold
+        else:
+            passes = metric <= threshold
+        if not passes:
+            return False
+    return True
+
+
+@njit(cache=True)
+def top_k_is_better_nb(
+    key_a: float,
+    work_idx_a: int,
+    key_b: float,
+    work_idx_b: int,
+) -> bool:
+    """
+    Higher keys are better and when the keys are the same the combination that was
+    backtested first wins, so the top k never depends on how the work was split up.
+    """
+    return key_a > key_b or (key_a == key_b and work_idx_a < work_idx_b)
+
+
+@njit(cache=True)
+def top_k_swap_nb(
+    top_k_keys: Array1d,
+    top_k_work_idx: Array1d,
+    top_k_slots: Array1d,
+    a: int,
+    b: int,
+):
+    top_k_keys[a], top_k_keys[b] = top_k_keys[b], top_k_keys[a]
+    top_k_work_idx[a], top_k_work_idx[b] = top_k_work_idx[b], top_k_work_idx[a]
+    top_k_slots[a], top_k_slots[b] = top_k_slots[b], top_k_slots[a]
+
+
+@njit(cache=True)
+def top_k_sift_up_nb(
+    top_k_keys: Array1d,
+    top_k_work_idx: Array1d,
+    top_k_slots: Array1d,
+    pos: int,
+):
+    while pos > 0:
+        parent = (pos - 1) // 2
+        if top_k_is_better_nb(
+            key_a=top_k_keys[parent],
+            work_idx_a=top_k_work_idx[parent],
+            key_b=top_k_keys[pos],
+            work_idx_b=top_k_work_idx[pos],
+        ):
+            top_k_swap_nb(top_k_keys, top_k_work_idx, top_k_slots, parent, pos)
+            pos = parent
+        else:
+            break
+
+
+@njit(cache=True)
+def top_k_sift_down_nb(
+    top_k_keys: Array1d,
+    top_k_work_idx: Array1d,
+    top_k_slots: Array1d,
+    heap_size: int,
+    pos: int,
+):
+    while True:
+        worst = pos
+        for child in (2 * pos + 1, 2 * pos + 2):
+            if child < heap_size and top_k_is_better_nb(
+                key_a=top_k_keys[worst],
+                work_idx_a=top_k_work_idx[worst],
+                key_b=top_k_keys[child],
+                work_idx_b=top_k_work_idx[child],
+            ):
+                worst = child
+        if worst == pos:
+            break
+        top_k_swap_nb(top_k_keys, top_k_work_idx, top_k_slots, worst, pos)
+        pos = worst
+
+
+@njit(cache=True)
+def collect_result_nb(
+    collector_state: Array1d,
+    strategy_result_records: RecordArray,
+    top_k: int,
+    top_k_keys: Array1d,
+    top_k_metric: int,
+    top_k_slots: Array1d,
+    top_k_work_idx: Array1d,
+    work_idx: int,
+):
+    """
+    Call this after a combination passed the filters and was written into the row
+    collector_state[1] of the result records. collector_state[0] is how many rows are
+    collected and collector_state[1] is the row the next combination gets written into.
+
+    With top_k at 0 every row is kept. Otherwise the rows are kept in a heap with the worst
+    row on top, so once the heap is full a new row either replaces the worst one or its row
+    just gets written over by the next combination. The result records need top_k + 1 rows.
+    """
+    slot = collector_state[1]
+    if top_k == 0:
+        collector_state[0] += 1
+        collector_state[1] = collector_state[0]
+        return
+
+    key = get_top_k_key_nb(
+        strategy_result_records=strategy_result_records[slot],
+        top_k_metric=top_k_metric,
+    )
+
+    heap_size = collector_state[0]
+    if heap_size < top_k:
+        top_k_keys[heap_size] = key
+        top_k_work_idx[heap_size] = work_idx
+        top_k_slots[heap_size] = slot
+        top_k_sift_up_nb(top_k_keys, top_k_work_idx, top_k_slots, heap_size)
+        collector_state[0] += 1
+        collector_state[1] = collector_state[0]
+    elif top_k_is_better_nb(
+        key_a=key,
+        work_idx_a=work_idx,
+        key_b=top_k_keys[0],
+        work_idx_b=top_k_work_idx[0],
+    ):
+        # the row of the worst one is free now
+        collector_state[1] = top_k_slots[0]
+        top_k_keys[0] = key
+        top_k_work_idx[0] = work_idx
+        top_k_slots[0] = slot
+        top_k_sift_down_nb(top_k_keys, top_k_work_idx, top_k_slots, heap_size, 0)
+
+
+@njit(cache=True)
+def get_collected_slots_nb(
+    collector_state: Array1d,
+    top_k: int,
+    top_k_slots: Array1d,
+    top_k_work_idx: Array1d,
+) -> Array1d:
+    """
+    Rows of the result records that were collected, in the order they were backtested.
+    """
+    if top_k == 0:
+        return np.arange(collector_state[0])
+    heap_size = collector_state[0]
+    return top_k_slots[:heap_size][np.argsort(top_k_work_idx[:heap_size])]
+
+
+@njit(cache=True)
+def select_top_k_nb(
+    strategy_result_records: RecordArray,
+    top_k: int,
+    top_k_metric: int,
+) -> Array1d:
+    """
+    Picks the top k rows out of strategy result records that are in backtest order, the same
+    way collect_result_nb does, and returns their indexes in backtest order.
+    """
+    keys = np.empty(strategy_result_records.size)
+    for i in range(strategy_result_records.size):
+        keys[i] = -get_top_k_key_nb(
+            strategy_result_records=strategy_result_records[i],
+            top_k_metric=top_k_metric,
+        )
+    # stable sort so ties keep the order they were backtested in
+    return np.sort(np.argsort(keys, kind="mergesort")[:top_k])
+
+
 @njit(cache=True)
 def to_1d_array_nb(var: PossibleArray) -> Array1d:
     """Resize array to one dimension."""
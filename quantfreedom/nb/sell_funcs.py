@@ -1,8 +1,13 @@
 import numpy as np
 from numba import njit
 
-from quantfreedom._typing import Tuple
+from quantfreedom._typing import Array1d, Tuple
 
+from quantfreedom.nb.helper_funcs import (
+    create_state_nb,
+    get_account_state_nb,
+    get_order_result_nb,
+)
 from quantfreedom.enums.enums import (
     AccountState,
     EntryOrder,
@@ -14,26 +19,31 @@ from quantfreedom.enums.enums import (
     OrderStatusInfo,
     LeverageMode,
     SizeType,
+    StateField,
 )
 
 
 # Long order to enter or add to a long position
+# Short order to enter or add to a short position
 @njit(cache=True)
-def short_increase_nb(
+def short_increase_state_nb(
     price: float,
-    account_state: AccountState,
     entry_order: EntryOrder,
-    order_result: OrderResult,
+    state: Array1d,
     static_variables_tuple: StaticVariables,
-) -> Tuple[AccountState, OrderResult]:
+):
+    """
+    Same as short_increase_nb but updates the account state and order result fields of a
+    state array laid out like StateField in place.
+    """
 
     # new cash borrowed needs to be returned
-    available_balance_new = account_state.available_balance
-    cash_used_new = account_state.cash_used
+    available_balance_new = state[StateField.available_balance]
+    cash_used_new = state[StateField.cash_used]
     leverage_new = entry_order.leverage
-    average_entry_new = order_result.average_entry
-    liq_price_new = order_result.liq_price
-    position_new = order_result.position
+    average_entry_new = state[StateField.average_entry]
+    liq_price_new = state[StateField.liq_price]
+    position_new = state[StateField.position]
 
     sl_pcts_new = entry_order.sl_pcts
     tp_pcts_new = entry_order.tp_pcts
@@ -54,7 +64,9 @@ def short_increase_nb(
 
         if np.isfinite(sl_pcts_new):
             if static_variables_tuple.size_type == SizeType.RiskPercentOfAccount:
-                size_value = account_state.equity * entry_order.size_pct / sl_pcts_new
+                size_value = (
+                    state[StateField.equity] * entry_order.size_pct / sl_pcts_new
+                )
 
             elif static_variables_tuple.size_type == SizeType.RiskAmount:
                 size_value = entry_order.size_value / sl_pcts_new
@@ -75,7 +87,7 @@ def short_increase_nb(
         elif np.isfinite(tsl_pcts_init_new):
             if static_variables_tuple.size_type == SizeType.RiskPercentOfAccount:
                 size_value = (
-                    account_state.equity * entry_order.size_pct / tsl_pcts_init_new
+                    state[StateField.equity] * entry_order.size_pct / tsl_pcts_init_new
                 )
 
             elif static_variables_tuple.size_type == SizeType.RiskAmount:
@@ -99,11 +111,11 @@ def short_increase_nb(
         if size_value > static_variables_tuple.max_order_size_value:
             size_value = static_variables_tuple.max_order_size_value
         elif size_value == np.inf:
-            size_value = order_result.position
+            size_value = state[StateField.position]
 
     # getting size_value for percent of account
     elif static_variables_tuple.size_type == SizeType.PercentOfAccount:
-        size_value = account_state.equity * entry_order.size_pct  # math checked
+        size_value = state[StateField.equity] * entry_order.size_pct  # math checked
 
     else:
         raise TypeError(
@@ -206,34 +218,22 @@ def short_increase_nb(
         # getting account risk amount
         if not np.isnan(entry_order.max_equity_risk_pct):
             account_risk_amount = float(
-                int(account_state.equity * entry_order.max_equity_risk_pct)
+                int(state[StateField.equity] * entry_order.max_equity_risk_pct)
             )
         elif not np.isnan(entry_order.max_equity_risk_value):
             account_risk_amount = entry_order.max_equity_risk_value
 
         # check if our possible loss is more than what we are willing to risk of our account
         if 0 < possible_loss > account_risk_amount:
-            return account_state, OrderResult(
-                average_entry=order_result.average_entry,
-                fees_paid=np.nan,
-                leverage=order_result.leverage,
-                liq_price=order_result.liq_price,
-                moved_sl_to_be=order_result.moved_sl_to_be,
-                order_status=OrderStatus.Ignored,
-                order_status_info=OrderStatusInfo.MaxEquityRisk,
-                order_type=entry_order.order_type,
-                pct_chg_trade=np.nan,
-                position=order_result.position,
-                price=price,
-                realized_pnl=np.nan,
-                size_value=np.nan,
-                sl_pcts=order_result.sl_pcts,
-                sl_prices=order_result.sl_prices,
-                tp_pcts=order_result.tp_pcts,
-                tp_prices=order_result.tp_prices,
-                tsl_pcts_init=order_result.tsl_pcts_init,
-                tsl_prices=order_result.tsl_prices,
-            )
+            state[StateField.fees_paid] = np.nan
+            state[StateField.order_status] = OrderStatus.Ignored
+            state[StateField.order_status_info] = OrderStatusInfo.MaxEquityRisk
+            state[StateField.order_type] = entry_order.order_type
+            state[StateField.pct_chg_trade] = np.nan
+            state[StateField.price] = price
+            state[StateField.realized_pnl] = np.nan
+            state[StateField.size_value] = np.nan
+            return
 
     # check if leverage_new amount is possible with size_value and free cash
     # TODO add in info for leverage iso
@@ -285,8 +285,8 @@ def short_increase_nb(
         # liq formula
         # https://www.bybithelp.com/HelpCenterKnowledge/bybitHC_Article?id=000001067&language=en_US
         available_balance_new = available_balance_new - cash_used_new
-        cash_used_new = account_state.cash_used + cash_used_new
-        cash_borrowed_new = account_state.cash_borrowed + size_value - cash_used_new
+        cash_used_new = state[StateField.cash_used] + cash_used_new
+        cash_borrowed_new = state[StateField.cash_borrowed] + size_value - cash_used_new
 
         liq_price_new = average_entry_new * (
             1 + (1 / leverage_new) - static_variables_tuple.mmr_pct
@@ -333,107 +333,122 @@ def short_increase_nb(
     if available_balance_new < 0:
         raise RejectedOrderError("long increase - avaialbe balance < 0")
 
-    return AccountState(
-        available_balance=available_balance_new,
-        cash_borrowed=cash_borrowed_new,
-        cash_used=cash_used_new,
-        equity=account_state.equity,
-    ), OrderResult(
-        average_entry=average_entry_new,
-        fees_paid=np.nan,
-        leverage=leverage_new,
-        liq_price=liq_price_new,
-        moved_sl_to_be=False,
-        order_status=OrderStatus.Filled,
-        order_status_info=OrderStatusInfo.HopefullyNoProblems,
-        order_type=entry_order.order_type,
-        pct_chg_trade=np.nan,
-        position=position_new,
+    state[StateField.available_balance] = available_balance_new
+    state[StateField.cash_borrowed] = cash_borrowed_new
+    state[StateField.cash_used] = cash_used_new
+    state[StateField.average_entry] = average_entry_new
+    state[StateField.fees_paid] = np.nan
+    state[StateField.leverage] = leverage_new
+    state[StateField.liq_price] = liq_price_new
+    state[StateField.moved_sl_to_be] = False
+    state[StateField.order_status] = OrderStatus.Filled
+    state[StateField.order_status_info] = OrderStatusInfo.HopefullyNoProblems
+    state[StateField.order_type] = entry_order.order_type
+    state[StateField.pct_chg_trade] = np.nan
+    state[StateField.position] = position_new
+    state[StateField.price] = price
+    state[StateField.realized_pnl] = np.nan
+    state[StateField.size_value] = size_value
+    state[StateField.sl_pcts] = sl_pcts_new
+    state[StateField.sl_prices] = sl_prices_new
+    state[StateField.tp_pcts] = tp_pcts_new
+    state[StateField.tp_prices] = tp_prices_new
+    state[StateField.tsl_pcts_init] = tsl_pcts_init_new
+    state[StateField.tsl_prices] = tsl_prices_new
+
+
+@njit(cache=True)
+def short_increase_nb(
+    price: float,
+    account_state: AccountState,
+    entry_order: EntryOrder,
+    order_result: OrderResult,
+    static_variables_tuple: StaticVariables,
+) -> Tuple[AccountState, OrderResult]:
+    state = create_state_nb(account_state=account_state, order_result=order_result)
+    short_increase_state_nb(
         price=price,
-        realized_pnl=np.nan,
-        size_value=size_value,
-        sl_pcts=sl_pcts_new,
-        sl_prices=sl_prices_new,
-        tp_pcts=tp_pcts_new,
-        tp_prices=tp_prices_new,
-        tsl_pcts_init=tsl_pcts_init_new,
-        tsl_prices=tsl_prices_new,
+        entry_order=entry_order,
+        state=state,
+        static_variables_tuple=static_variables_tuple,
     )
+    return get_account_state_nb(state), get_order_result_nb(state)
 
 
 @njit(cache=True)
-def short_decrease_nb(
+def short_decrease_state_nb(
     fee_pct: float,
-    order_result: OrderResult,
-    account_state: AccountState,
+    state: Array1d,
 ):
     """
     This is where the long position gets decreased or closed out.
+    Updates the state array in place.
     """
 
-    if order_result.size_value >= order_result.position:
-        size_value = order_result.position
+    if state[StateField.size_value] >= state[StateField.position]:
+        size_value = state[StateField.position]
     else:
-        size_value = order_result.size_value
+        size_value = state[StateField.size_value]
 
     pct_chg_trade = (
-        order_result.average_entry - order_result.price
-    ) / order_result.average_entry  # math checked
+        state[StateField.average_entry] - state[StateField.price]
+    ) / state[StateField.average_entry]  # math checked
 
-    # Set new order_result.position size_value and cash borrowed and cash used
-    position_new = order_result.position - size_value
+    # Set new position size_value and cash borrowed and cash used
+    position_new = state[StateField.position] - size_value
     position_pct_chg = (
-        order_result.position - position_new
-    ) / order_result.position  # math checked
+        state[StateField.position] - position_new
+    ) / state[StateField.position]  # math checked
 
     # profit and loss calulation
-    coin_size = size_value / order_result.average_entry  # math checked
-    pnl = coin_size * (order_result.average_entry - order_result.price)  # math checked
-    fee_open = coin_size * order_result.average_entry * fee_pct  # math checked
-    fee_close = coin_size * order_result.price * fee_pct  # math checked
+    coin_size = size_value / state[StateField.average_entry]  # math checked
+    pnl = coin_size * (
+        state[StateField.average_entry] - state[StateField.price]
+    )  # math checked
+    fee_open = coin_size * state[StateField.average_entry] * fee_pct  # math checked
+    fee_close = coin_size * state[StateField.price] * fee_pct  # math checked
     fees_paid = fee_open + fee_close  # math checked
     realized_pnl = pnl - fees_paid  # math checked
 
-    # Setting new account_state.equity
-    equity_new = account_state.equity + realized_pnl
+    # Setting new equity
+    equity_new = state[StateField.equity] + realized_pnl
 
-    cash_borrowed_new = account_state.cash_borrowed - (
-        account_state.cash_borrowed * position_pct_chg
+    cash_borrowed_new = state[StateField.cash_borrowed] - (
+        state[StateField.cash_borrowed] * position_pct_chg
     )
 
-    cash_used_new = account_state.cash_used - (
-        account_state.cash_used * position_pct_chg
+    cash_used_new = state[StateField.cash_used] - (
+        state[StateField.cash_used] * position_pct_chg
     )
 
     available_balance_new = (
         realized_pnl
-        + account_state.available_balance
-        + (account_state.cash_used * position_pct_chg)
+        + state[StateField.available_balance]
+        + (state[StateField.cash_used] * position_pct_chg)
     )
 
-    return AccountState(
-        available_balance=available_balance_new,
-        cash_borrowed=cash_borrowed_new,
-        cash_used=cash_used_new,
-        equity=equity_new,
-    ), OrderResult(
-        average_entry=order_result.average_entry,
-        fees_paid=fees_paid,
-        leverage=order_result.leverage,
-        liq_price=order_result.liq_price,
-        moved_sl_to_be=order_result.moved_sl_to_be,
-        order_status=OrderStatus.Filled,
-        order_status_info=OrderStatusInfo.HopefullyNoProblems,
-        order_type=order_result.order_type,
-        pct_chg_trade=pct_chg_trade,
-        position=position_new,
-        price=order_result.price,
-        realized_pnl=realized_pnl,
-        size_value=size_value,
-        sl_pcts=order_result.sl_pcts,
-        sl_prices=order_result.sl_prices,
-        tp_pcts=order_result.tp_pcts,
-        tp_prices=order_result.tp_prices,
-        tsl_pcts_init=order_result.tsl_pcts_init,
-        tsl_prices=order_result.tsl_prices,
-    )
+    state[StateField.available_balance] = available_balance_new
+    state[StateField.cash_borrowed] = cash_borrowed_new
+    state[StateField.cash_used] = cash_used_new
+    state[StateField.equity] = equity_new
+    state[StateField.fees_paid] = fees_paid
+    state[StateField.order_status] = OrderStatus.Filled
+    state[StateField.order_status_info] = OrderStatusInfo.HopefullyNoProblems
+    state[StateField.pct_chg_trade] = pct_chg_trade
+    state[StateField.position] = position_new
+    state[StateField.realized_pnl] = realized_pnl
+    state[StateField.size_value] = size_value
+
+
+@njit(cache=True)
+def short_decrease_nb(
+    fee_pct: float,
+    order_result: OrderResult,
+    account_state: AccountState,
+):
+    """
+    This is where the short position gets decreased or closed out.
+    """
+    state = create_state_nb(account_state=account_state, order_result=order_result)
+    short_decrease_state_nb(fee_pct=fee_pct, state=state)
+    return get_account_state_nb(state), get_order_result_nb(state)
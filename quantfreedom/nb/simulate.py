@@ -1,29 +1,414 @@
 import numpy as np
 
-from numba import njit
-from quantfreedom._typing import PossibleArray, Array1d, RecordArray
-from quantfreedom.nb.execute_funcs import process_order_nb, check_sl_tp_nb
+from numba import njit, prange
+from quantfreedom._typing import PossibleArray, Array1d, Array2d, RecordArray
+from quantfreedom.nb.execute_funcs import (
+    check_sl_tp_nb,
+    check_sl_tp_state_nb,
+    process_order_nb,
+    process_order_state_nb,
+)
 from quantfreedom.nb.helper_funcs import (
     static_var_checker_nb,
     create_1d_arrays_nb,
     check_1d_arrays_nb,
     fill_strategy_result_records_nb,
     fill_settings_result_records_nb,
+    get_entries_col_signal_bars_nb,
+    get_entries_signal_bars_nb,
+    get_first_stop_hit_bar_nb,
+    get_max_entries_signals_nb,
+    get_second_entries_signal_bars_nb,
+    get_stops_search_tables_nb,
+    get_block_order_settings_nb,
     get_to_the_upside_nb,
+    passes_result_filters_nb,
+    collect_result_nb,
+    get_collected_slots_nb,
+    select_top_k_nb,
+    get_account_state_nb,
+    reset_state_nb,
+    reset_trade_metrics_nb,
+    update_trade_metrics_nb,
 )
 from quantfreedom.enums.enums import (
     or_dt,
     strat_df_array_dt,
-    strat_records_dt,
     settings_array_dt,
     AccountState,
     EntryOrder,
     OrderResult,
+    OrderStatus,
+    OrderType,
+    StateField,
     StopsOrder,
     StaticVariables,
     Arrays1dTuple,
+    TradeMetricField,
 )
 
+# how many bars every lane of a block runs before the next lane gets its turn
+BLOCK_WINDOW_BARS = 1024
+
+
+@njit(cache=True)
+def simulate_df_lane_nb(
+    bar: int,
+    end_bar: int,
+    entries_col: int,
+    order_settings_counter: int,
+    symbol_counter: int,
+    total_bars: int,
+    entries_signal_bars: Array1d,
+    signal_idx: int,
+    peak_equity: float,
+    equity_floor: float,
+    open_prices: Array1d,
+    high_prices: Array1d,
+    low_prices: Array1d,
+    close_prices: Array1d,
+    entry_order: EntryOrder,
+    stops_order: StopsOrder,
+    static_variables_tuple: StaticVariables,
+    state: Array1d,
+    trade_metrics: Array1d,
+    total_trade_filter: int,
+    stops_lows_table: Array2d,
+    stops_highs_table: Array2d,
+):
+    """
+    Runs the bar loop of one order setting of a block from bar up to end_bar and adds every
+    closed trade to its trade_metrics.
+
+    entries_signal_bars are the bars the entries column has a signal on and signal_idx is the
+    index of the first one at or after bar. Nothing can happen while there is no open position,
+    so the loop jumps straight to the next signal and only goes bar by bar while a position is
+    open.
+
+    Without sl_to_be or a trailing stop loss the stops can't move while a position is open, so
+    the loop also jumps straight to the first bar the stop loss, liquidation or take profit
+    gets hit, using the stops search tables of this symbol from create_stops_search_tables_nb.
+
+    The loop stops early once the combination can't pass the filters anymore: when there
+    aren't enough entry signals left to get over total_trade_filter, or when a closed trade
+    takes equity past max_drawdown_pct_filter or under equity_floor.
+
+    Returns the bar to carry on from, which is total_bars once the combination is done, the
+    new signal_idx and peak equity, and True if the combination was pruned.
+    """
+    total_signals = entries_signal_bars.size
+    static_stops = not stops_order.sl_to_be and not stops_order.tsl_true_or_false
+
+    # entries loop
+    while bar < end_bar:
+        if state[StateField.available_balance] < 5:
+            return total_bars, signal_idx, peak_equity, False
+
+        if not state[StateField.position] > 0:
+            if signal_idx == total_signals:
+                return total_bars, signal_idx, peak_equity, False
+            bar = entries_signal_bars[signal_idx]
+        elif static_stops and (
+            entry_order.order_type == OrderType.LongEntry
+            or entry_order.order_type == OrderType.ShortEntry
+        ):
+            if signal_idx < total_signals:
+                next_signal_bar = entries_signal_bars[signal_idx]
+            else:
+                next_signal_bar = total_bars
+
+            # the same checks check_sl_tp_nb does, the nan stops just never get hit
+            if entry_order.order_type == OrderType.LongEntry:
+                low_stop = -np.inf
+                for stop_price in (
+                    state[StateField.sl_prices],
+                    state[StateField.tsl_prices],
+                    state[StateField.liq_price],
+                ):
+                    if stop_price > low_stop:
+                        low_stop = stop_price
+                high_stop = np.inf
+                if state[StateField.tp_prices] < high_stop:
+                    high_stop = state[StateField.tp_prices]
+            else:
+                high_stop = np.inf
+                for stop_price in (
+                    state[StateField.sl_prices],
+                    state[StateField.tsl_prices],
+                    state[StateField.liq_price],
+                ):
+                    if stop_price < high_stop:
+                        high_stop = stop_price
+                low_stop = -np.inf
+                if state[StateField.tp_prices] > low_stop:
+                    low_stop = state[StateField.tp_prices]
+
+            bar = get_first_stop_hit_bar_nb(
+                start_bar=bar,
+                end_bar=next_signal_bar,
+                high_prices=high_prices,
+                low_prices=low_prices,
+                stops_lows_table=stops_lows_table,
+                stops_highs_table=stops_highs_table,
+                low_stop=low_stop,
+                high_stop=high_stop,
+            )
+
+        # jumped past the end, the same jump gets worked out again from here next time
+        if bar >= end_bar:
+            break
+
+        # every trade still to close needs the open position or an entry signal from here on
+        if total_trade_filter > 0:
+            if state[StateField.position] > 0:
+                trades_left = total_signals - signal_idx + 1
+            else:
+                trades_left = total_signals - signal_idx
+            if (
+                trade_metrics[TradeMetricField.closed_trades] + trades_left
+                <= total_trade_filter
+            ):
+                return total_bars, signal_idx, peak_equity, True
+
+        if signal_idx < total_signals and entries_signal_bars[signal_idx] == bar:
+            signal_idx += 1
+            # Process Order nb
+            process_order_state_nb(
+                entry_order=entry_order,
+                order_type=entry_order.order_type,
+                price=open_prices[bar],
+                state=state,
+                static_variables_tuple=static_variables_tuple,
+            )
+            # what the position loses if the stop loss gets hit, for the R of the trade
+            if np.isnan(state[StateField.sl_pcts]):
+                trade_metrics[TradeMetricField.open_risk] = (
+                    state[StateField.position] * state[StateField.tsl_pcts_init]
+                )
+            else:
+                trade_metrics[TradeMetricField.open_risk] = (
+                    state[StateField.position] * state[StateField.sl_pcts]
+                )
+        if state[StateField.position] > 0:
+            # Check Stops
+            check_sl_tp_state_nb(
+                close_price=close_prices[bar],
+                entry_type=entry_order.order_type,
+                fee_pct=static_variables_tuple.fee_pct,
+                high_price=high_prices[bar],
+                low_price=low_prices[bar],
+                open_price=open_prices[bar],
+                state=state,
+                stops_order=stops_order,
+            )
+            # process stops
+            if not np.isnan(state[StateField.size_value]):
+                if (
+                    process_order_state_nb(
+                        entry_order=entry_order,
+                        order_type=int(state[StateField.order_type]),
+                        price=open_prices[bar],
+                        state=state,
+                        static_variables_tuple=static_variables_tuple,
+                    )
+                    and state[StateField.order_status] == OrderStatus.Filled
+                ):
+                    update_trade_metrics_nb(
+                        bar=bar,
+                        equity=state[StateField.equity],
+                        pnl=state[StateField.realized_pnl],
+                        trade_metrics=trade_metrics,
+                    )
+
+                # a trade closed so check the drawdown and equity floor filters
+                equity = state[StateField.equity]
+                peak_equity = max(peak_equity, equity)
+                if (
+                    (peak_equity - equity) / peak_equity * 100
+                    > static_variables_tuple.max_drawdown_pct_filter
+                    or equity < equity_floor
+                ):
+                    return total_bars, signal_idx, peak_equity, True
+        bar += 1
+    if bar >= total_bars:
+        bar = total_bars
+    return bar, signal_idx, peak_equity, False
+
+
+@njit(cache=True)
+def simulate_df_block_nb(
+    entries_col: int,
+    order_settings_start: int,
+    symbol_counter: int,
+    total_bars: int,
+    og_equity: float,
+    entries_signal_bars: Array1d,
+    open_prices: Array1d,
+    high_prices: Array1d,
+    low_prices: Array1d,
+    close_prices: Array1d,
+    entry_orders,
+    stops_orders,
+    static_variables_tuple: StaticVariables,
+    block_state: Array2d,
+    block_trade_metrics: Array2d,
+    block_pruned: Array1d,
+    total_trade_filter: int,
+    stops_lows_table: Array2d,
+    stops_highs_table: Array2d,
+):
+    """
+    Runs the bar loop for a block of order settings of one symbol and entries column in
+    lockstep and keeps the trade metrics of every lane up to date as its trades close.
+
+    Lane i is order setting order_settings_start + i with entry_orders[i] and stops_orders[i].
+    Every lane has its own row in block_state, laid out like StateField, and its own row in
+    block_trade_metrics, laid out like TradeMetricField.
+
+    The lanes move through the bars together one window of BLOCK_WINDOW_BARS bars at a time.
+    Every lane runs its own bar loop up to the end of the window before the next lane gets its
+    turn, so the prices of a window get read from memory once for the whole block and stay in
+    the cpu cache for the rest of the lanes, instead of every order setting streaming the whole
+    price history on its own.
+
+    block_pruned[i] is set to True if lane i was stopped early because it can't pass the
+    filters anymore. Every lane ends up with the same results as running it on its own.
+    """
+    lanes = len(entry_orders)
+    equity_floor = og_equity * static_variables_tuple.equity_floor_pct_filter / 100
+
+    next_bars = np.zeros(lanes, dtype=np.int_)
+    signal_idxs = np.zeros(lanes, dtype=np.int_)
+    peak_equities = np.full(lanes, og_equity)
+
+    for lane in range(lanes):
+        # Account State and Order Result Reset
+        reset_state_nb(
+            state=block_state[lane],
+            og_equity=og_equity,
+            order_type=entry_orders[lane].order_type,
+        )
+        reset_trade_metrics_nb(
+            og_equity=og_equity,
+            trade_metrics=block_trade_metrics[lane],
+        )
+        block_pruned[lane] = False
+
+    # a single lane has nobody to share the prices of a window with
+    if lanes > 1:
+        window_bars = BLOCK_WINDOW_BARS
+    else:
+        window_bars = total_bars
+
+    # windows loop
+    window_start = 0
+    while window_start < total_bars:
+        window_end = min(window_start + window_bars, total_bars)
+
+        # lanes loop
+        for lane in range(lanes):
+            if next_bars[lane] >= window_end:
+                continue
+
+            (
+                next_bars[lane],
+                signal_idxs[lane],
+                peak_equities[lane],
+                block_pruned[lane],
+            ) = simulate_df_lane_nb(
+                bar=next_bars[lane],
+                close_prices=close_prices,
+                end_bar=window_end,
+                entries_col=entries_col,
+                entries_signal_bars=entries_signal_bars,
+                entry_order=entry_orders[lane],
+                equity_floor=equity_floor,
+                high_prices=high_prices,
+                low_prices=low_prices,
+                open_prices=open_prices,
+                order_settings_counter=order_settings_start + lane,
+                peak_equity=peak_equities[lane],
+                signal_idx=signal_idxs[lane],
+                state=block_state[lane],
+                static_variables_tuple=static_variables_tuple,
+                stops_highs_table=stops_highs_table,
+                stops_lows_table=stops_lows_table,
+                stops_order=stops_orders[lane],
+                symbol_counter=symbol_counter,
+                total_bars=total_bars,
+                total_trade_filter=total_trade_filter,
+                trade_metrics=block_trade_metrics[lane],
+            )
+
+        window_start = window_end
+
+
+@njit(cache=True)
+def check_and_fill_df_results_nb(
+    entries_col: int,
+    order_settings_counter: int,
+    symbol_counter: int,
+    total_bars: int,
+    og_equity: float,
+    gains_pct_filter: float,
+    total_trade_filter: int,
+    result_filters: Array2d,
+    account_state: AccountState,
+    entry_order: EntryOrder,
+    stops_order: StopsOrder,
+    static_variables_tuple: StaticVariables,
+    trade_metrics: Array1d,
+    strategy_result_records: RecordArray,
+    settings_result_records: RecordArray,
+) -> bool:
+    """
+    Applies the results filters to a finished combination and fills one row of the
+    strategy and settings result records if it passes. Returns True if the row was filled.
+
+    The result_filters from passes_result_filters_nb are checked on the filled strategy row
+    before the settings row gets filled, so a combination that fails them is never kept.
+
+    Everything comes from the running trade_metrics of the combination, so nothing gets
+    allocated.
+    """
+    # Checking if gains
+    gains_pct = ((account_state.equity - og_equity) / og_equity) * 100
+    if gains_pct > gains_pct_filter:
+        # Checking total trade filter
+        if trade_metrics[TradeMetricField.total_trades] > total_trade_filter:
+            to_the_upside = get_to_the_upside_nb(
+                gains_pct=gains_pct,
+                trade_metrics=trade_metrics,
+            )
+
+            # Checking to the upside filter
+            if to_the_upside > static_variables_tuple.upside_filter:
+                fill_strategy_result_records_nb(
+                    entries_col=entries_col,
+                    gains_pct=gains_pct,
+                    order_settings_counter=order_settings_counter,
+                    strategy_result_records=strategy_result_records,
+                    symbol_counter=symbol_counter,
+                    to_the_upside=to_the_upside,
+                    total_bars=total_bars,
+                    trade_metrics=trade_metrics,
+                )
+                if not passes_result_filters_nb(
+                    result_filters=result_filters,
+                    strategy_result_records=strategy_result_records,
+                ):
+                    return False
+
+                fill_settings_result_records_nb(
+                    entries_col=entries_col,
+                    entry_order=entry_order,
+                    settings_result_records=settings_result_records,
+                    stops_order=stops_order,
+                    symbol_counter=symbol_counter,
+                )
+                return True
+    return False
+
 
 @njit(cache=True)
 def backtest_df_only_nb(
@@ -34,21 +419,27 @@ def backtest_df_only_nb(
     # entry info
     og_equity: float,
     entries: PossibleArray,
+    second_entries: PossibleArray,
+    entries_pairs: Array2d,
     prices: PossibleArray,
     # filters
     gains_pct_filter: float,
     total_trade_filter: int,
+    result_filters: Array2d,
     # Tuples
     static_variables_tuple: StaticVariables,
     cart_array_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    order_settings_block_size: int,
 ) -> Array1d[Array1d, Array1d]:
     # Creating strat records
-    array_size = int(
-        num_of_symbols
-        * total_indicator_settings
-        * total_order_settings
-        / static_variables_tuple.divide_records_array_size_by
-    )
+    total_work = total_indicator_settings * total_order_settings
+    top_k = min(static_variables_tuple.top_k, total_work)
+    if top_k > 0:
+        # one spare row for the combination that is being checked against the top k
+        array_size = top_k + 1
+    else:
+        array_size = total_work
 
     strategy_result_records = np.empty(
         array_size,
@@ -58,16 +449,41 @@ def backtest_df_only_nb(
         array_size,
         dtype=settings_array_dt,
     )
-    result_records_filled = 0
+    collector_state = np.zeros(2, dtype=np.int_)
+    top_k_keys = np.empty(top_k)
+    top_k_work_idx = np.empty(top_k, dtype=np.int_)
+    top_k_slots = np.empty(top_k, dtype=np.int_)
+
+    # entry signal bars of every entries column, shared by all the order settings
+    entries_signal_bars, entries_signal_starts = get_entries_signal_bars_nb(
+        entries=entries
+    )
+    second_signal_bars, second_signal_starts = get_second_entries_signal_bars_nb(
+        entries_pairs=entries_pairs,
+        second_entries=second_entries,
+    )
+    max_signals = get_max_entries_signals_nb(
+        entries_pairs=entries_pairs,
+        entries_signal_starts=entries_signal_starts,
+        second_signal_starts=second_signal_starts,
+    )
+    combined_signal_bars = np.empty(
+        max_signals if entries_pairs.shape[0] else 0, dtype=np.int_
+    )
 
-    strat_records = np.empty(int(total_bars / 3), dtype=strat_records_dt)
-    strat_records_filled = np.array([0])
+    block_size = max(1, min(order_settings_block_size, total_order_settings))
+    block_trade_metrics = np.empty((block_size, len(TradeMetricField)))
+    block_state = np.empty((block_size, len(StateField)))
+    block_pruned = np.zeros(block_size, dtype=np.bool_)
+    stops_lows_table, stops_highs_table = get_stops_search_tables_nb(
+        num_of_symbols=num_of_symbols,
+        prices=prices,
+        static_variables_tuple=static_variables_tuple,
+    )
 
     prices_start = 0
     prices_end = 4
-    entries_per_symbol = int(entries.shape[1] / num_of_symbols)
-    entries_start = 0
-    entries_end = entries_per_symbol
+    entries_per_symbol = int(total_indicator_settings / num_of_symbols)
     entries_col = 0
 
     for symbol_counter in range(num_of_symbols):
@@ -79,188 +495,334 @@ def backtest_df_only_nb(
         prices_start = prices_end
         prices_end += 4
 
-        symbol_entries = entries[:, entries_start:entries_end]
-        entries_start = entries_end
-        entries_end += entries_per_symbol
-
         # ind set loop
         for indicator_settings_counter in range(entries_per_symbol):
-            current_indicator_entries = symbol_entries[:, indicator_settings_counter]
+            current_entries_signal_bars = get_entries_col_signal_bars_nb(
+                combined_signal_bars=combined_signal_bars,
+                entries_col=entries_col,
+                entries_pairs=entries_pairs,
+                entries_signal_bars=entries_signal_bars,
+                entries_signal_starts=entries_signal_starts,
+                second_signal_bars=second_signal_bars,
+                second_signal_starts=second_signal_starts,
+            )
 
-            for order_settings_counter in range(total_order_settings):
-                entry_order = EntryOrder(
-                    leverage=cart_array_tuple.leverage[order_settings_counter],
-                    max_equity_risk_pct=cart_array_tuple.max_equity_risk_pct[
-                        order_settings_counter
-                    ],
-                    max_equity_risk_value=cart_array_tuple.max_equity_risk_value[
-                        order_settings_counter
-                    ],
-                    order_type=static_variables_tuple.order_type,
-                    risk_rewards=cart_array_tuple.risk_rewards[order_settings_counter],
-                    size_pct=cart_array_tuple.size_pct[order_settings_counter],
-                    size_value=cart_array_tuple.size_value[order_settings_counter],
-                    sl_pcts=cart_array_tuple.sl_pcts[order_settings_counter],
-                    tp_pcts=cart_array_tuple.tp_pcts[order_settings_counter],
-                    tsl_pcts_init=cart_array_tuple.tsl_pcts_init[
-                        order_settings_counter
-                    ],
-                )
-                stops_order = StopsOrder(
-                    sl_to_be=static_variables_tuple.sl_to_be,
-                    sl_to_be_based_on=cart_array_tuple.sl_to_be_based_on[
-                        order_settings_counter
-                    ],
-                    sl_to_be_then_trail=static_variables_tuple.sl_to_be_then_trail,
-                    sl_to_be_trail_by_when_pct_from_avg_entry=cart_array_tuple.sl_to_be_trail_by_when_pct_from_avg_entry[
-                        order_settings_counter
-                    ],
-                    sl_to_be_when_pct_from_avg_entry=cart_array_tuple.sl_to_be_when_pct_from_avg_entry[
-                        order_settings_counter
-                    ],
-                    sl_to_be_zero_or_entry=cart_array_tuple.sl_to_be_zero_or_entry[
-                        order_settings_counter
-                    ],
-                    tsl_based_on=cart_array_tuple.tsl_based_on[order_settings_counter],
-                    tsl_trail_by_pct=cart_array_tuple.tsl_trail_by_pct[
-                        order_settings_counter
-                    ],
-                    tsl_true_or_false=static_variables_tuple.tsl_true_or_false,
-                    tsl_when_pct_from_avg_entry=cart_array_tuple.tsl_when_pct_from_avg_entry[
-                        order_settings_counter
-                    ],
-                )
-                # Account State Reset
-                account_state = AccountState(
-                    available_balance=og_equity,
-                    cash_borrowed=0.0,
-                    cash_used=0.0,
-                    equity=og_equity,
+            for order_settings_start in range(0, total_order_settings, block_size):
+                lanes = min(block_size, total_order_settings - order_settings_start)
+                entry_orders, stops_orders = get_block_order_settings_nb(
+                    cart_array_tuple=cart_array_tuple,
+                    cart_strides=cart_strides,
+                    lanes=lanes,
+                    order_settings_start=order_settings_start,
+                    static_variables_tuple=static_variables_tuple,
                 )
 
-                # Order Result Reset
-                order_result = OrderResult(
-                    average_entry=0.0,
-                    fees_paid=0.0,
-                    leverage=0.0,
-                    liq_price=np.nan,
-                    moved_sl_to_be=False,
-                    order_status=0,
-                    order_status_info=0,
-                    order_type=entry_order.order_type,
-                    pct_chg_trade=0.0,
-                    position=0.0,
-                    price=0.0,
-                    realized_pnl=0.0,
-                    size_value=0.0,
-                    sl_pcts=0.0,
-                    sl_prices=0.0,
-                    tp_pcts=0.0,
-                    tp_prices=0.0,
-                    tsl_pcts_init=0.0,
-                    tsl_prices=0.0,
+                simulate_df_block_nb(
+                    block_pruned=block_pruned,
+                    block_state=block_state,
+                    block_trade_metrics=block_trade_metrics,
+                    close_prices=close_prices,
+                    entries_col=entries_col,
+                    entries_signal_bars=current_entries_signal_bars,
+                    entry_orders=entry_orders,
+                    high_prices=high_prices,
+                    low_prices=low_prices,
+                    og_equity=og_equity,
+                    open_prices=open_prices,
+                    order_settings_start=order_settings_start,
+                    static_variables_tuple=static_variables_tuple,
+                    stops_highs_table=stops_highs_table[symbol_counter],
+                    stops_lows_table=stops_lows_table[symbol_counter],
+                    stops_orders=stops_orders,
+                    symbol_counter=symbol_counter,
+                    total_bars=total_bars,
+                    total_trade_filter=total_trade_filter,
                 )
-                strat_records_filled[0] = 0
-
-                # entries loop
-                for bar in range(total_bars):
-                    if account_state.available_balance < 5:
-                        break
-
-                    if current_indicator_entries[bar]:
-                        # Process Order nb
-                        account_state, order_result = process_order_nb(
-                            account_state=account_state,
-                            bar=bar,
-                            entries_col=entries_col,
-                            entry_order=entry_order,
-                            order_result=order_result,
-                            order_settings_counter=order_settings_counter,
-                            order_type=entry_order.order_type,
-                            price=open_prices[bar],
-                            static_variables_tuple=static_variables_tuple,
-                            strat_records_filled=strat_records_filled,
-                            strat_records=strat_records[strat_records_filled[0]],
-                            symbol_counter=symbol_counter,
-                        )
-                    if order_result.position > 0:
-                        # Check Stops
-                        order_result = check_sl_tp_nb(
-                            account_state=account_state,
-                            bar=bar,
-                            close_price=close_prices[bar],
-                            entry_type=entry_order.order_type,
-                            fee_pct=static_variables_tuple.fee_pct,
-                            high_price=high_prices[bar],
-                            low_price=low_prices[bar],
-                            open_price=open_prices[bar],
-                            order_result=order_result,
-                            order_settings_counter=order_settings_counter,
-                            stops_order=stops_order,
-                        )
-                        # process stops
-                        if not np.isnan(order_result.size_value):
-                            account_state, order_result = process_order_nb(
-                                account_state=account_state,
-                                bar=bar,
-                                entries_col=entries_col,
-                                entry_order=entry_order,
-                                order_result=order_result,
-                                order_settings_counter=order_settings_counter,
-                                order_type=order_result.order_type,
-                                price=open_prices[bar],
-                                static_variables_tuple=static_variables_tuple,
-                                strat_records_filled=strat_records_filled,
-                                strat_records=strat_records[strat_records_filled[0]],
-                                symbol_counter=symbol_counter,
-                            )
-
-                # Checking if gains
-                gains_pct = ((account_state.equity - og_equity) / og_equity) * 100
-                if gains_pct > gains_pct_filter:
-                    temp_strat_records = strat_records[0 : strat_records_filled[0]]
-                    wins_and_losses_array = temp_strat_records["real_pnl"][
-                        ~np.isnan(temp_strat_records["real_pnl"])
-                    ]
-
-                    # Checking total trade filter
-                    if wins_and_losses_array.size > total_trade_filter:
-                        wins_and_losses_array_no_be = wins_and_losses_array[
-                            wins_and_losses_array != 0
-                        ]
-                        to_the_upside = get_to_the_upside_nb(
-                            gains_pct=gains_pct,
-                            wins_and_losses_array_no_be=wins_and_losses_array_no_be,
-                        )
 
-                        # Checking to the upside filter
-                        if to_the_upside > static_variables_tuple.upside_filter:
-                            fill_strategy_result_records_nb(
-                                gains_pct=gains_pct,
-                                strategy_result_records=strategy_result_records[
-                                    result_records_filled
-                                ],
-                                temp_strat_records=temp_strat_records,
-                                to_the_upside=to_the_upside,
-                                total_trades=wins_and_losses_array.size,
-                                wins_and_losses_array_no_be=wins_and_losses_array_no_be,
-                            )
-
-                            fill_settings_result_records_nb(
-                                entries_col=entries_col,
-                                entry_order=entry_order,
-                                settings_result_records=settings_result_records[
-                                    result_records_filled
-                                ],
-                                stops_order=stops_order,
-                                symbol_counter=symbol_counter,
-                            )
-                            result_records_filled += 1
+                for lane in range(lanes):
+                    if not block_pruned[lane] and check_and_fill_df_results_nb(
+                        account_state=get_account_state_nb(block_state[lane]),
+                        entries_col=entries_col,
+                        entry_order=entry_orders[lane],
+                        gains_pct_filter=gains_pct_filter,
+                        og_equity=og_equity,
+                        result_filters=result_filters,
+                        settings_result_records=settings_result_records[
+                            collector_state[1]
+                        ],
+                        static_variables_tuple=static_variables_tuple,
+                        order_settings_counter=order_settings_start + lane,
+                        stops_order=stops_orders[lane],
+                        strategy_result_records=strategy_result_records[
+                            collector_state[1]
+                        ],
+                        symbol_counter=symbol_counter,
+                        total_bars=total_bars,
+                        total_trade_filter=total_trade_filter,
+                        trade_metrics=block_trade_metrics[lane],
+                    ):
+                        collect_result_nb(
+                            collector_state=collector_state,
+                            strategy_result_records=strategy_result_records,
+                            top_k=top_k,
+                            top_k_keys=top_k_keys,
+                            top_k_metric=static_variables_tuple.top_k_metric,
+                            top_k_slots=top_k_slots,
+                            top_k_work_idx=top_k_work_idx,
+                            work_idx=entries_col * total_order_settings
+                            + order_settings_start
+                            + lane,
+                        )
             entries_col += 1
+
+    collected_slots = get_collected_slots_nb(
+        collector_state=collector_state,
+        top_k=top_k,
+        top_k_slots=top_k_slots,
+        top_k_work_idx=top_k_work_idx,
+    )
     return (
-        strategy_result_records[:result_records_filled],
-        settings_result_records[:result_records_filled],
+        strategy_result_records[collected_slots],
+        settings_result_records[collected_slots],
+    )
+
+
+@njit(cache=True, parallel=True)
+def backtest_df_only_parallel_nb(
+    num_of_symbols: int,
+    total_indicator_settings: int,
+    total_order_settings: int,
+    total_bars: int,
+    # entry info
+    og_equity: float,
+    entries: PossibleArray,
+    second_entries: PossibleArray,
+    entries_pairs: Array2d,
+    prices: PossibleArray,
+    # filters
+    gains_pct_filter: float,
+    total_trade_filter: int,
+    result_filters: Array2d,
+    # Tuples
+    static_variables_tuple: StaticVariables,
+    cart_array_tuple: Arrays1dTuple,
+    cart_strides: Array1d,
+    order_settings_block_size: int,
+) -> Array1d[Array1d, Array1d]:
+    """
+    Multi-core version of backtest_df_only_nb.
+
+    Every (symbol, entries column, order setting) combination gets a work index in the same
+    order the serial loops walk them. The work is split into chunks that run under prange,
+    each with its own block scratch buffers and its own slice of the result records. Inside a
+    chunk the order settings of an entries column are run order_settings_block_size at a time
+    with simulate_df_block_nb.
+    With top_k every chunk keeps its own top k and the best top k of all the chunks is picked
+    at the end, so the results match the serial path either way.
+    """
+    entries_per_symbol = int(total_indicator_settings / num_of_symbols)
+    total_work = num_of_symbols * entries_per_symbol * total_order_settings
+    top_k = min(static_variables_tuple.top_k, total_work)
+
+    # plenty of chunks so the threads stay busy even when some combinations take longer
+    num_of_chunks = min(total_work, 1024)
+    if top_k > 0:
+        # every chunk holds its own top k so this keeps the rows of all chunks around 1 mil
+        num_of_chunks = min(num_of_chunks, max(64, 2**20 // top_k))
+    chunk_size = -(-total_work // max(num_of_chunks, 1))
+    if top_k > 0:
+        chunk_top_k = min(top_k, chunk_size)
+        chunk_stride = chunk_top_k + 1
+    else:
+        chunk_top_k = 0
+        chunk_stride = chunk_size
+
+    strategy_result_records = np.empty(
+        num_of_chunks * chunk_stride,
+        dtype=strat_df_array_dt,
+    )
+    settings_result_records = np.empty(
+        num_of_chunks * chunk_stride,
+        dtype=settings_array_dt,
+    )
+    chunk_result_slots = np.empty(num_of_chunks * chunk_stride, dtype=np.int_)
+    chunk_records_filled = np.zeros(num_of_chunks, dtype=np.int_)
+
+    # entry signal bars of every entries column, shared by all the chunks
+    entries_signal_bars, entries_signal_starts = get_entries_signal_bars_nb(
+        entries=entries
     )
+    second_signal_bars, second_signal_starts = get_second_entries_signal_bars_nb(
+        entries_pairs=entries_pairs,
+        second_entries=second_entries,
+    )
+    max_signals = get_max_entries_signals_nb(
+        entries_pairs=entries_pairs,
+        entries_signal_starts=entries_signal_starts,
+        second_signal_starts=second_signal_starts,
+    )
+    stops_lows_table, stops_highs_table = get_stops_search_tables_nb(
+        num_of_symbols=num_of_symbols,
+        prices=prices,
+        static_variables_tuple=static_variables_tuple,
+    )
+
+    block_size = max(1, min(order_settings_block_size, total_order_settings))
+
+    for chunk in prange(num_of_chunks):
+        block_trade_metrics = np.empty((block_size, len(TradeMetricField)))
+        combined_signal_bars = np.empty(
+            max_signals if entries_pairs.shape[0] else 0, dtype=np.int_
+        )
+        # the signal bars of the entries column the chunk is on, only worked out again when
+        # the chunk gets to the next entries column
+        current_entries_col = -1
+        current_entries_signal_bars = entries_signal_bars[:0]
+        block_state = np.empty((block_size, len(StateField)))
+        block_pruned = np.zeros(block_size, dtype=np.bool_)
+        result_records_start = chunk * chunk_stride
+        chunk_strategy_result_records = strategy_result_records[
+            result_records_start : result_records_start + chunk_stride
+        ]
+        chunk_settings_result_records = settings_result_records[
+            result_records_start : result_records_start + chunk_stride
+        ]
+        collector_state = np.zeros(2, dtype=np.int_)
+        top_k_keys = np.empty(chunk_top_k)
+        top_k_work_idx = np.empty(chunk_top_k, dtype=np.int_)
+        top_k_slots = np.empty(chunk_top_k, dtype=np.int_)
+
+        work_idx = chunk * chunk_size
+        chunk_end = min((chunk + 1) * chunk_size, total_work)
+        while work_idx < chunk_end:
+            order_settings_start = work_idx % total_order_settings
+            entries_col = work_idx // total_order_settings
+            symbol_counter = entries_col // entries_per_symbol
+
+            prices_start = symbol_counter * 4
+            if entries_col != current_entries_col:
+                current_entries_col = entries_col
+                current_entries_signal_bars = get_entries_col_signal_bars_nb(
+                    combined_signal_bars=combined_signal_bars,
+                    entries_col=entries_col,
+                    entries_pairs=entries_pairs,
+                    entries_signal_bars=entries_signal_bars,
+                    entries_signal_starts=entries_signal_starts,
+                    second_signal_bars=second_signal_bars,
+                    second_signal_starts=second_signal_starts,
+                )
+
+            # a block never goes past the end of the chunk or of the entries column
+            lanes = min(
+                block_size,
+                chunk_end - work_idx,
+                total_order_settings - order_settings_start,
+            )
+            entry_orders, stops_orders = get_block_order_settings_nb(
+                cart_array_tuple=cart_array_tuple,
+                cart_strides=cart_strides,
+                lanes=lanes,
+                order_settings_start=order_settings_start,
+                static_variables_tuple=static_variables_tuple,
+            )
+
+            simulate_df_block_nb(
+                block_pruned=block_pruned,
+                block_state=block_state,
+                block_trade_metrics=block_trade_metrics,
+                close_prices=prices[:, prices_start + 3],
+                entries_col=entries_col,
+                entries_signal_bars=current_entries_signal_bars,
+                entry_orders=entry_orders,
+                high_prices=prices[:, prices_start + 1],
+                low_prices=prices[:, prices_start + 2],
+                og_equity=og_equity,
+                open_prices=prices[:, prices_start],
+                order_settings_start=order_settings_start,
+                static_variables_tuple=static_variables_tuple,
+                stops_highs_table=stops_highs_table[symbol_counter],
+                stops_lows_table=stops_lows_table[symbol_counter],
+                stops_orders=stops_orders,
+                symbol_counter=symbol_counter,
+                total_bars=total_bars,
+                total_trade_filter=total_trade_filter,
+            )
+
+            for lane in range(lanes):
+                if not block_pruned[lane] and check_and_fill_df_results_nb(
+                    account_state=get_account_state_nb(block_state[lane]),
+                    entries_col=entries_col,
+                    entry_order=entry_orders[lane],
+                    gains_pct_filter=gains_pct_filter,
+                    og_equity=og_equity,
+                    result_filters=result_filters,
+                    settings_result_records=chunk_settings_result_records[
+                        collector_state[1]
+                    ],
+                    static_variables_tuple=static_variables_tuple,
+                    order_settings_counter=order_settings_start + lane,
+                    stops_order=stops_orders[lane],
+                    strategy_result_records=chunk_strategy_result_records[
+                        collector_state[1]
+                    ],
+                    symbol_counter=symbol_counter,
+                    total_bars=total_bars,
+                    total_trade_filter=total_trade_filter,
+                    trade_metrics=block_trade_metrics[lane],
+                ):
+                    collect_result_nb(
+                        collector_state=collector_state,
+                        strategy_result_records=chunk_strategy_result_records,
+                        top_k=chunk_top_k,
+                        top_k_keys=top_k_keys,
+                        top_k_metric=static_variables_tuple.top_k_metric,
+                        top_k_slots=top_k_slots,
+                        top_k_work_idx=top_k_work_idx,
+                        work_idx=work_idx + lane,
+                    )
+            work_idx += lanes
+
+        collected_slots = get_collected_slots_nb(
+            collector_state=collector_state,
+            top_k=chunk_top_k,
+            top_k_slots=top_k_slots,
+            top_k_work_idx=top_k_work_idx,
+        )
+        chunk_records_filled[chunk] = collected_slots.size
+        chunk_result_slots[
+            result_records_start : result_records_start + collected_slots.size
+        ] = (collected_slots + result_records_start)
+
+    # stitching the chunks back together in work order
+    total_records_filled = chunk_records_filled.sum()
+    final_strategy_result_records = np.empty(
+        total_records_filled,
+        dtype=strat_df_array_dt,
+    )
+    final_settings_result_records = np.empty(
+        total_records_filled,
+        dtype=settings_array_dt,
+    )
+    final_filled = 0
+    for chunk in range(num_of_chunks):
+        result_records_start = chunk * chunk_stride
+        for i in range(chunk_records_filled[chunk]):
+            slot = chunk_result_slots[result_records_start + i]
+            final_strategy_result_records[final_filled] = strategy_result_records[slot]
+            final_settings_result_records[final_filled] = settings_result_records[slot]
+            final_filled += 1
+
+    if top_k > 0:
+        top_k_idx = select_top_k_nb(
+            strategy_result_records=final_strategy_result_records,
+            top_k=top_k,
+            top_k_metric=static_variables_tuple.top_k_metric,
+        )
+        return (
+            final_strategy_result_records[top_k_idx],
+            final_settings_result_records[top_k_idx],
+        )
+    return final_strategy_result_records, final_settings_result_records
 
 
 @njit(cache=True)
@@ -328,7 +890,10 @@ def simulate_up_to_6_nb(
         tsl_true_or_false=tsl_true_or_false,
         gains_pct_filter=-np.inf,
         total_trade_filter=0,
-        divide_records_array_size_by=1,
+        equity_floor_pct_filter=0.0,
+        max_drawdown_pct_filter=np.inf,
+        top_k=0,
+        top_k_metric=0,
         upside_filter=-1,
     )
 
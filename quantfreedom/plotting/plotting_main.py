@@ -20,21 +20,38 @@ np.set_printoptions(formatter={"float_kind": "{:.2f}".format})
 
 pd.options.display.float_format = "{:,.2f}".format
 
-load_figure_template("darkly")
 dbc_css = "https://cdn.jsdelivr.net/gh/AnnMarieW/dash-bootstrap-templates/dbc.min.css"
-try:
-    shell = str(get_ipython())
-    if "ZMQInteractiveShell" in shell:
-        app = JupyterDash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
-    elif shell == "TerminalInteractiveShell":
-        app = JupyterDash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
-    else:
-        app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
-except NameError:
-    app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
-
 bg_color = "#0b0b18"
 
+_app = None
+
+
+def get_app() -> JupyterDash:
+    """
+    The dash app the dashboards get shown in. It only gets made the first time you make a
+    dashboard instead of when quantfreedom gets imported, so backtesting never has to wait
+    on dash.
+
+    Returns
+    -------
+    JupyterDash
+        JupyterDash app inside of jupyter or ipython, Dash app anywhere else
+    """
+    global _app
+    if _app is None:
+        load_figure_template("darkly")
+        try:
+            shell = str(get_ipython())
+            if "ZMQInteractiveShell" in shell:
+                _app = JupyterDash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
+            elif shell == "TerminalInteractiveShell":
+                _app = JupyterDash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
+            else:
+                _app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
+        except NameError:
+            _app = Dash(__name__, external_stylesheets=[dbc.themes.DARKLY, dbc_css])
+    return _app
+
 
 def strat_dashboard(
     indicator_dict: dict,
@@ -245,6 +262,7 @@ def strat_dashboard(
         ),
     )
 
+    app = get_app()
     app.layout = html.Div(
         [
             html.Div(
@@ -1,6 +1,17 @@
-from quantfreedom.utils.helpers import clear_cache, pretty
+from quantfreedom.utils.helpers import CombinedEntries, clear_cache, pack_entries, pretty, unpack_entries
+from quantfreedom.utils.polars_frames import get_polars_layout, pandas_to_polars, polars_to_pandas
+from quantfreedom.utils.warmup import warmup
+from quantfreedom._cache_dir import get_numba_cache_dir
 
 __all__ = [
     'pretty',
+    "CombinedEntries",
     "clear_cache",
+    "get_numba_cache_dir",
+    "get_polars_layout",
+    "pack_entries",
+    "pandas_to_polars",
+    "polars_to_pandas",
+    "unpack_entries",
+    "warmup",
     ]
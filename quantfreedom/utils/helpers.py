@@ -3,11 +3,8 @@ import numpy as np
 import pandas as pd
 
 from pathlib import Path
-import plotly.graph_objects as go
 
-from quantfreedom._typing import pdFrame
-
-dir_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "../.."))
+from quantfreedom._typing import pdFrame, Array2d, NamedTuple
 
 
 def delete_dir(
@@ -32,9 +29,14 @@ def delete_dir(
 def clear_cache():
     """
     clears the python cache and numba cache
+
+    The numba cache is the NUMBA_CACHE_DIR quantfreedom was imported with, see
+    get_numba_cache_dir. A numba_cache folder in the current folder, which is where older
+    versions kept it, gets deleted too.
     """
-    for p in Path(dir_path).parent.parent.rglob("numba_cache"):
-        delete_dir(p)
+    for p in (os.environ.get("NUMBA_CACHE_DIR"), "numba_cache"):
+        if p is not None and Path(p).is_dir():
+            delete_dir(Path(p))
     for p in Path(__file__).parent.parent.rglob("__pycache__"):
         delete_dir(p)
     for p in Path(__file__).parent.parent.rglob("*.py[co]"):
@@ -116,6 +118,8 @@ def generate_candles(
         ],
         name=["symbol", "candle_info"],
     )
+    import plotly.graph_objects as go
+
     fig = go.Figure(
         data=go.Candlestick(
             x=data.index,
@@ -129,3 +133,119 @@ def generate_candles(
     fig.show()
 
     return data
+
+
+def pack_entries(
+    entries: pdFrame,
+) -> pdFrame:
+    """
+    Packs a dataframe of bool entries into uint64 words, 64 bars in every word, so they take 8
+    times less memory. Bit b of word w is the entry signal of bar w * 64 + b. The columns stay
+    the same and backtest_df_only and combine_evals take the packed entries just like the bools.
+
+    Parameters
+    ----------
+    entries : pdFrame
+        Dataframe of bool entries
+
+    Returns
+    -------
+    pdFrame
+        Dataframe of uint64 words with one row for every 64 bars
+    """
+    total_bars = entries.shape[0]
+    total_words = -(-total_bars // 64)
+    # every column's bits are packed into bytes that sit next to each other and then every 8 of
+    # those bytes are looked at as one little endian uint64
+    packed_bytes = np.zeros((entries.shape[1], total_words * 8), dtype=np.uint8)
+    packed_bytes[:, : -(-total_bars // 8)] = np.packbits(
+        np.ascontiguousarray(entries.values.T, dtype=np.bool_),
+        axis=1,
+        bitorder="little",
+    )
+    return pd.DataFrame(
+        packed_bytes.view("<u8").astype(np.uint64, copy=False).T,
+        columns=entries.columns,
+    )
+
+
+def unpack_entries(
+    packed_entries: pdFrame,
+    index: pd.Index,
+) -> pdFrame:
+    """
+    Turns entries packed by pack_entries back into bools.
+
+    Parameters
+    ----------
+    packed_entries : pdFrame
+        Dataframe of uint64 words from pack_entries
+    index : pd.Index
+        index of the bars, usually the index of your prices
+
+    Returns
+    -------
+    pdFrame
+        Dataframe of bool entries
+    """
+    packed_bytes = np.ascontiguousarray(
+        packed_entries.values.T.astype("<u8", copy=False)
+    ).view(np.uint8)
+    return pd.DataFrame(
+        np.unpackbits(packed_bytes, axis=1, count=len(index), bitorder="little")
+        .astype(np.bool_)
+        .T,
+        index=index,
+        columns=packed_entries.columns,
+    )
+
+
+class CombinedEntries(NamedTuple):
+    """
+    Entries made by combining two sets of entries without ever creating them.
+
+    Entries column i is first_entries column entries_pairs[i, 0] and second_entries column
+    entries_pairs[i, 1]. You get these from combine_evals with lazy=True and backtest_df_only
+    takes them just like a dataframe of entries, it works out the bars both columns have a
+    signal on as it gets to every entries column. Only the two parent entries are ever in
+    memory, so combinations that would need hundreds of GB as bools fit in a few GB.
+
+    first_entries and second_entries are either both bools or both packed by pack_entries.
+    """
+
+    first_entries: pdFrame
+    second_entries: pdFrame
+    entries_pairs: Array2d
+    columns: pd.MultiIndex
+
+    @property
+    def shape(self) -> tuple:
+        return self.first_entries.shape[0], self.entries_pairs.shape[0]
+
+    def to_frame(self) -> pdFrame:
+        """
+        Creates the combined entries, the same dataframe combine_evals gives back without lazy.
+
+        Returns
+        -------
+        pdFrame
+            Dataframe of the combined entries
+        """
+        from quantfreedom.nb.eval_funcs import combine_evals_nb
+
+        first_entries = self.first_entries.values
+        if first_entries.dtype != np.uint64:
+            first_entries = first_entries == True
+        second_entries = self.second_entries.values
+        if second_entries.dtype != np.uint64:
+            second_entries = second_entries == True
+        return pd.DataFrame(
+            combine_evals_nb(
+                first_evals=np.asfortranarray(first_entries),
+                second_evals=np.asfortranarray(second_entries),
+                first_cols=self.entries_pairs[:, 0],
+                second_cols=self.entries_pairs[:, 1],
+            ),
+            index=self.second_entries.index,
+            columns=self.columns,
+        )
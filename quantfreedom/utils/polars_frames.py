@@ -0,0 +1,339 @@
+"""
+Polars frames in and out of quantfreedom.
+
+Everything in quantfreedom works on a numpy array and the pandas MultiIndex that names its
+columns, like (symbol, candle_info) for prices or (symbol, rsi_timeperiod) for an indicator.
+Polars has no MultiIndex, so every level of a column goes in its name as level=value, joined
+by |, like symbol=BTCUSDT|rsi_timeperiod=14. A level without a name is just its value.
+Values written like python writes numbers come back as numbers, except symbols, and strings
+that would look like numbers get written in quotes, like ma_type="14".
+
+A polars frame can be laid out two ways
+
+    wide    one row for every bar and one column for every column of the pandas frame, like
+            symbol=BTCUSDT|candle_info=close
+    long    one row for every bar of every symbol, a symbol column that says which symbol the
+            row is, and one column for every column of one symbol, like close or
+            rsi_timeperiod=14. Rows are sorted by symbol, like the levels of a MultiIndex,
+            and by open_time inside every symbol. Every symbol needs the same number of rows
+            and, if there is an open_time column, the very same open times, since the rows of
+            the symbols get lined up by position.
+
+An open_time column becomes the index of the pandas frame and comes back as a column.
+
+Every column is read with to_numpy, which doesn't copy a float column without nulls, straight
+into its place in one fortran ordered array, the layout the numba kernels read, so that array
+is the only copy that gets made and pandas never has to put it together.
+"""
+
+import functools
+import inspect
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from quantfreedom._typing import Array2d, Callable, pdFrame, plFrame, Tuple
+
+__all__ = [
+    "accepts_polars",
+    "get_polars_layout",
+    "pandas_to_polars",
+    "polars_to_pandas",
+]
+
+_level_sep = "|"
+_value_sep = "="
+
+
+def _parse_value(
+    value: str,
+    parse_numbers: bool = True,
+):
+    # strings that look like numbers get written in quotes so they stay strings
+    if len(value) > 1 and value[0] == value[-1] == '"':
+        return value[1:-1]
+    if parse_numbers:
+        for value_type in (int, float):
+            try:
+                number = value_type(value)
+            except ValueError:
+                continue
+            # only numbers written the way python writes them, so nan, inf or 007 stay strings
+            if repr(number) == value and np.isfinite(number):
+                return number
+    return value
+
+
+def _format_value(
+    value,
+) -> str:
+    value_str = f"{value}"
+    if isinstance(value, str) and _parse_value(value_str) != value:
+        return f'"{value_str}"'
+    return value_str
+
+
+def _parse_column_name(
+    column_name: str,
+    symbol_col: str = "symbol",
+) -> Tuple[list, list]:
+    names = []
+    values = []
+    for level in column_name.split(_level_sep):
+        name, sep, value = level.partition(_value_sep)
+        if sep:
+            names.append(name)
+            # symbols are always strings, even ones like 1000
+            values.append(_parse_value(value, parse_numbers=name != symbol_col))
+        else:
+            names.append(None)
+            values.append(_parse_value(level))
+    return names, values
+
+
+def _get_column_name(
+    names: list,
+    values: tuple,
+) -> str:
+    return _level_sep.join(
+        _format_value(value) if name is None else f"{name}{_value_sep}{_format_value(value)}"
+        for name, value in zip(names, values)
+    )
+
+
+def _get_pandas_columns(
+    column_names: list,
+    symbols: list = None,
+    symbol_col: str = "symbol",
+) -> pd.MultiIndex:
+    parsed = [
+        _parse_column_name(column_name, symbol_col=symbol_col) for column_name in column_names
+    ]
+    level_names = parsed[0][0] if parsed else []
+    if any(names != level_names for names, _ in parsed):
+        raise ValueError("every column needs the same levels")
+    level_values = [values for _, values in parsed]
+    if symbols is None:
+        return pd.MultiIndex.from_tuples(level_values, names=level_names)
+    # long frames have the symbol level first and every column of one symbol for every symbol
+    return pd.MultiIndex.from_tuples(
+        [(symbol, *values) for symbol in symbols for values in level_values],
+        names=[symbol_col] + level_names,
+    )
+
+
+def _get_values_dtype(
+    dtypes: list,
+) -> np.dtype:
+    if dtypes and all(dtype == pl.Boolean for dtype in dtypes):
+        return np.dtype(np.bool_)
+    if dtypes and all(dtype == pl.UInt64 for dtype in dtypes):
+        return np.dtype(np.uint64)
+    return np.dtype(np.float_)
+
+
+def _fill_values(
+    values: Array2d,
+    cols: slice,
+    series: pl.Series,
+    total_rows: int,
+):
+    if series.dtype == pl.Boolean:
+        series = series.fill_null(False)
+    elif values.dtype == np.float_:
+        series = series.cast(pl.Float64).fill_null(np.nan)
+    # a long column is every symbol one after the other, so each symbol is a column of this
+    values[:, cols] = series.to_numpy().reshape(-1, total_rows).T
+
+
+def get_polars_layout(
+    frame: plFrame,
+    symbol_col: str = "symbol",
+) -> str:
+    """
+    "long" if the frame has a symbol column and "wide" if it doesn't.
+    """
+    return "long" if symbol_col in frame.columns else "wide"
+
+
+def polars_to_pandas(
+    frame: plFrame,
+    symbol_col: str = "symbol",
+    time_col: str = "open_time",
+) -> pdFrame:
+    """
+    Turns a polars frame in the wide or long layout into the pandas frame with MultiIndex
+    columns every quantfreedom function takes.
+
+    Parameters
+    ----------
+    frame : plFrame
+        wide or long frame of prices, indicator values or entries
+    symbol_col : str, "symbol"
+        column that says which symbol every row of a long frame is
+    time_col : str, "open_time"
+        column that becomes the index if the frame has one
+
+    Returns
+    -------
+    pdFrame
+        frame with one fortran ordered block of values
+    """
+    layout = get_polars_layout(frame, symbol_col=symbol_col)
+    value_cols = [col for col in frame.columns if col not in (symbol_col, time_col)]
+    values_dtype = _get_values_dtype([frame.schema[col] for col in value_cols])
+
+    if layout == "wide":
+        values = np.empty((len(value_cols), frame.height), dtype=values_dtype).T
+        for col, column_name in enumerate(value_cols):
+            _fill_values(
+                values, slice(col, col + 1), frame.get_column(column_name), frame.height
+            )
+        columns = _get_pandas_columns(value_cols, symbol_col=symbol_col)
+        time_frame = frame
+    else:
+        # sorted like the levels of a MultiIndex so the symbol numbers of the backtest match,
+        # and by time inside every symbol, after that every column of a symbol is one block of
+        # rows
+        sort_cols = [symbol_col, time_col] if time_col in frame.columns else [symbol_col]
+        frame = frame.with_columns(pl.col(symbol_col).cast(pl.Utf8)).sort(
+            sort_cols, maintain_order=True
+        )
+        symbols, symbol_rows = np.unique(
+            frame.get_column(symbol_col).to_numpy(), return_counts=True
+        )
+        total_rows = symbol_rows[0] if symbols.size else 0
+        if (symbol_rows != total_rows).any():
+            raise ValueError("every symbol of a long frame needs the same number of rows")
+        # rows get lined up by where they are, so every symbol needs the very same bars
+        if time_col in frame.columns and symbols.size:
+            symbol_times = frame.get_column(time_col).to_numpy().reshape(symbols.size, -1)
+            if not all(np.array_equal(times, symbol_times[0]) for times in symbol_times[1:]):
+                raise ValueError(f"every symbol of a long frame needs the same {time_col}")
+        values = np.empty(
+            (symbols.size * len(value_cols), total_rows), dtype=values_dtype
+        ).T
+        for col, column_name in enumerate(value_cols):
+            _fill_values(
+                values,
+                slice(col, None, len(value_cols)),
+                frame.get_column(column_name),
+                total_rows,
+            )
+        symbols = symbols.tolist()
+        columns = _get_pandas_columns(value_cols, symbols=symbols, symbol_col=symbol_col)
+        time_frame = frame.head(total_rows)
+
+    if time_col in frame.columns:
+        index = pd.Index(time_frame.get_column(time_col).to_numpy(), name=time_col)
+    else:
+        index = None
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def pandas_to_polars(
+    frame: pdFrame,
+    layout: str = "wide",
+    symbol_col: str = "symbol",
+    time_col: str = "open_time",
+) -> plFrame:
+    """
+    Turns a pandas frame with MultiIndex columns, like the ones from_talib, is_above and
+    combine_evals give back, into a polars frame in the wide or long layout.
+
+    Parameters
+    ----------
+    frame : pdFrame
+        frame to turn into a polars frame
+    layout : str, "wide"
+        "wide" or "long", long frames need the symbol to be the first level of the columns
+    symbol_col : str, "symbol"
+        name of the symbol column of a long frame
+    time_col : str, "open_time"
+        name of the column the index goes into, if the index is more than just the row number
+
+    Returns
+    -------
+    plFrame
+        the polars frame
+    """
+    if layout not in ("wide", "long"):
+        raise ValueError('layout needs to be "wide" or "long"')
+    columns = frame.columns
+    if not isinstance(columns, pd.MultiIndex):
+        columns = pd.MultiIndex.from_arrays([columns])
+    level_names = list(columns.names)
+    values = frame.to_numpy()
+    has_time = not isinstance(frame.index, pd.RangeIndex)
+    time_name = frame.index.name or time_col
+
+    if layout == "wide":
+        polars_columns = {}
+        if has_time:
+            polars_columns[time_name] = frame.index.to_numpy()
+        for col, column in enumerate(columns):
+            polars_columns[_get_column_name(level_names, column)] = values[:, col]
+        return pl.DataFrame(polars_columns)
+
+    symbols = list(columns.get_level_values(0).unique())
+    symbol_columns = columns.droplevel(0) if columns.nlevels > 1 else None
+    if symbol_columns is None:
+        raise ValueError("a long frame needs more levels than just the symbol")
+    first_symbol_columns = symbol_columns[columns.get_level_values(0) == symbols[0]]
+    symbol_positions = []
+    for symbol in symbols:
+        positions = np.flatnonzero(columns.get_level_values(0) == symbol)
+        if not symbol_columns[positions].equals(first_symbol_columns):
+            raise ValueError("every symbol of a long frame needs the same columns")
+        symbol_positions.append(positions)
+
+    total_rows = frame.shape[0]
+    polars_columns = {
+        symbol_col: pl.Series(
+            np.repeat([str(symbol) for symbol in symbols], total_rows),
+            dtype=pl.Enum([str(symbol) for symbol in symbols]),
+        )
+    }
+    if has_time:
+        polars_columns[time_name] = np.tile(frame.index.to_numpy(), len(symbols))
+    for col, column in enumerate(first_symbol_columns):
+        name = _get_column_name(
+            level_names[1:], column if isinstance(column, tuple) else (column,)
+        )
+        polars_columns[name] = np.concatenate(
+            [values[:, positions[col]] for positions in symbol_positions]
+        )
+    return pl.DataFrame(polars_columns)
+
+
+def accepts_polars(
+    *frame_args: str,
+) -> Callable:
+    """
+    Lets a function that takes pandas frames take polars frames in frame_args too. The polars
+    frames are turned into pandas frames before the function runs, and if any of them was
+    polars a pandas frame that comes back is turned into a polars frame with the layout of
+    the first one. Anything else that comes back, like CombinedEntries, is left as it is.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound_args = signature.bind(*args, **kwargs)
+            layout = None
+            for arg_name in frame_args:
+                frame = bound_args.arguments.get(arg_name)
+                if isinstance(frame, plFrame):
+                    if layout is None:
+                        layout = get_polars_layout(frame)
+                    bound_args.arguments[arg_name] = polars_to_pandas(frame)
+            result = func(*bound_args.args, **bound_args.kwargs)
+            if layout is not None and isinstance(result, pdFrame):
+                return pandas_to_polars(result, layout=layout)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,115 @@
+"""
+Compiling the numba kernels ahead of time.
+
+Every kernel is compiled with cache=True, so once something has been run the compiled machine
+code is saved to NUMBA_CACHE_DIR and later imports just load it. warmup runs the kernels on a
+tiny made up backtest so that first compile happens when you want it to, like in a docker build
+with python -m quantfreedom.utils.warmup, instead of in the middle of your first backtest.
+
+Numba's ahead of time compiler numba.pycc is deprecated and can't compile the parallel kernel,
+so the numba cache is what gets shipped instead.
+"""
+
+import contextlib
+import io
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from quantfreedom.enums.enums import LeverageMode, OrderType, SizeType
+
+__all__ = [
+    "warmup",
+]
+
+
+def _warmup_data(
+    bars: int = 300,
+) -> tuple:
+    """
+    A made up symbol that goes up and down enough for the warmup backtest to have some trades.
+    """
+    bar = np.arange(bars)
+    close_prices = 100 + 5 * np.sin(bar / 7) + bar * 0.01
+    open_prices = np.r_[close_prices[0], close_prices[:-1]]
+    high_prices = np.maximum(open_prices, close_prices) + 0.5
+    low_prices = np.minimum(open_prices, close_prices) - 0.5
+
+    prices = pd.DataFrame(
+        np.column_stack((open_prices, high_prices, low_prices, close_prices)),
+        columns=pd.MultiIndex.from_product(
+            [["QuantFreedom"], ["open", "high", "low", "close"]],
+            names=["symbol", "candle_info"],
+        ),
+    )
+    entries = pd.DataFrame(
+        np.column_stack((bar % 10 == 0, bar % 15 == 0)),
+        columns=pd.MultiIndex.from_product(
+            [["QuantFreedom"], [10, 15]],
+            names=["symbol", "warmup"],
+        ),
+    )
+    return prices, entries
+
+
+def warmup(
+    parallel: bool = True,
+) -> float:
+    """
+    Compiles everything backtest_df_only uses and saves it to the numba cache so your
+    backtests start right away, even in a brand new process.
+
+    The cache is kept in the user cache folder from get_numba_cache_dir, or in NUMBA_CACHE_DIR
+    if you set it yourself before importing quantfreedom. It only has to be done once for every
+    numba version and machine, after that importing quantfreedom loads the compiled kernels in
+    well under a second.
+
+    simulate_up_to_6_nb isn't warmed up. Numba can only find a function in its cache when the
+    arguments you leave out don't default to np.nan, because nan never equals the nan read
+    back from the cache, so it gets compiled once in every process you call it in.
+
+    Parameters
+    ----------
+    parallel : bool, True
+        Also compile the multi-core kernel used by backtest_df_only with parallel=True. This one
+        takes the longest to compile.
+
+    Returns
+    -------
+    float
+        How many seconds the warmup took
+    """
+    from quantfreedom.base.base import backtest_df_only
+
+    start = time.perf_counter()
+    prices, entries = _warmup_data()
+    backtest_kwargs = dict(
+        equity=1000.0,
+        fee_pct=0.06,
+        mmr_pct=0.5,
+        lev_mode=LeverageMode.LeastFreeCashUsed,
+        order_type=OrderType.LongEntry,
+        size_type=SizeType.RiskPercentOfAccount,
+        max_equity_risk_pct=[3.0],
+        size_pct=1.0,
+        sl_pcts=[1.0, 2.0],
+        risk_rewards=[2.0],
+    )
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        backtest_df_only(prices=prices, entries=entries, **backtest_kwargs)
+        if parallel:
+            backtest_df_only(
+                prices=prices, entries=entries, parallel=True, **backtest_kwargs
+            )
+
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    seconds = warmup()
+    print(
+        f"Compiled the quantfreedom kernels into {os.environ.get('NUMBA_CACHE_DIR')} in {seconds:.1f} seconds"
+    )
@@ -23,6 +23,7 @@ setup(
         "dash",
         "dash_bootstrap_templates",
         "h5py",
+        'importlib_metadata; python_version < "3.8"',
         "ipywidgets==7.7.2",
         "jupyter-dash",
         "jupyterlab-widgets==1.1.1",
@@ -34,7 +35,7 @@ setup(
         'numba>=0.56.0; python_version >= "3.10"',
         "numpy>=1.16.5",
         "pandas",
-        "polars",
+        "polars>=0.20",
         "pyarrow",
         "tables",
         'typing_extensions; python_version < "3.8"',
@@ -0,0 +1,113 @@
+"""
+Made up prices and entries and the backtest settings the backtest tests run on, so they don't
+need a download or the prices in tests/data.
+"""
+
+import contextlib
+import io
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# so python tests/<test>.py finds quantfreedom from a checkout too, pytest doesn't need this
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from quantfreedom.base.base import backtest_df_only
+from quantfreedom.enums.enums import (
+    LeverageMode,
+    OrderType,
+    SL_BE_or_Trail_BasedOn,
+    SizeType,
+)
+
+
+def make_prices_and_entries(
+    num_of_symbols: int = 2,
+    total_bars: int = 1500,
+    total_entries_cols: int = 3,
+    entries_density: float = 0.05,
+    seed: int = 0,
+):
+    """
+    Random walk prices and random entries with the columns backtest_df_only wants.
+    """
+    rng = np.random.default_rng(seed)
+    symbols = [f"S{symbol}" for symbol in range(num_of_symbols)]
+    prices_list = []
+    entries_list = []
+    for _ in symbols:
+        close = 100 + rng.normal(scale=0.6, size=total_bars).cumsum()
+        open_ = np.r_[close[0], close[:-1]]
+        high = np.maximum(open_, close) + rng.random(total_bars) * 0.5
+        low = np.minimum(open_, close) - rng.random(total_bars) * 0.5
+        prices_list.append(np.c_[open_, high, low, close])
+        entries_list.append(rng.random((total_bars, total_entries_cols)) < entries_density)
+
+    prices = pd.DataFrame(
+        np.hstack(prices_list),
+        columns=pd.MultiIndex.from_product(
+            [symbols, ["open", "high", "low", "close"]], names=["symbol", "candle_info"]
+        ),
+    )
+    entries = pd.DataFrame(
+        np.hstack(entries_list),
+        columns=pd.MultiIndex.from_product(
+            [symbols, range(total_entries_cols)], names=["symbol", "rsi_timeperiod"]
+        ),
+    )
+    return prices, entries
+
+
+_base_settings = dict(
+    equity=1000.0,
+    fee_pct=0.06,
+    mmr_pct=0.5,
+    lev_mode=LeverageMode.LeastFreeCashUsed,
+    size_type=SizeType.RiskPercentOfAccount,
+    size_pct=1.0,
+    max_equity_risk_pct=[3.0, 10.0],
+    total_trade_filter=5,
+)
+
+# a few of the ways to exit a trade so every part of the kernels gets run
+backtest_settings = {
+    "long_sl_tp": dict(
+        _base_settings,
+        order_type=OrderType.LongEntry,
+        sl_pcts=[1.0, 2.0, 3.0],
+        risk_rewards=[2.0, 4.0],
+    ),
+    "long_sl_to_be": dict(
+        _base_settings,
+        order_type=OrderType.LongEntry,
+        sl_pcts=[1.0, 3.0],
+        risk_rewards=[3.0],
+        sl_to_be=True,
+        sl_to_be_based_on=[SL_BE_or_Trail_BasedOn.high_price],
+        sl_to_be_when_pct_from_avg_entry=[0.5, 1.0],
+        sl_to_be_zero_or_entry=[0.0],
+    ),
+    "short_tsl": dict(
+        _base_settings,
+        order_type=OrderType.ShortEntry,
+        tsl_pcts_init=[1.0, 2.0],
+        tsl_true_or_false=True,
+        tsl_based_on=[SL_BE_or_Trail_BasedOn.low_price],
+        tsl_trail_by_pct=[0.5, 1.0],
+        tsl_when_pct_from_avg_entry=[0.5],
+        risk_rewards=[4.0],
+    ),
+}
+
+
+def run_backtest(
+    prices: pd.DataFrame,
+    entries: pd.DataFrame,
+    **kwargs,
+):
+    """
+    backtest_df_only without the progress it prints.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return backtest_df_only(prices=prices, entries=entries, **kwargs)
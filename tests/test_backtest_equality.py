@@ -0,0 +1,145 @@
+"""
+Every way of running backtest_df_only has to give back exactly the same results as the plain
+serial backtest, down to the last bit.
+
+Run it with pytest or with python tests/test_backtest_equality.py
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest_data import backtest_settings, make_prices_and_entries, run_backtest
+from quantfreedom.utils.helpers import pack_entries, unpack_entries
+
+# the same backtest run every other way there is
+run_options = {
+    "parallel": dict(parallel=True),
+    "sharded": dict(max_workers=2, order_settings_per_shard=3),
+    "block_size_4": dict(order_settings_block_size=4),
+    "block_size_16_parallel": dict(order_settings_block_size=16, parallel=True),
+    "full_cart_product": dict(lazy_cart_product=False),
+}
+
+
+def _assert_same_results(
+    results: tuple,
+    expected_results: tuple,
+):
+    strat_results, settings_results = results
+    expected_strat_results, expected_settings_results = expected_results
+    pd.testing.assert_frame_equal(strat_results, expected_strat_results, check_exact=True)
+    pd.testing.assert_frame_equal(settings_results, expected_settings_results, check_exact=True)
+
+
+def test_run_options_match_serial():
+    prices, entries = make_prices_and_entries()
+    for settings_name, settings in backtest_settings.items():
+        serial_results = run_backtest(prices, entries, **settings)
+        assert len(serial_results[0]), f"{settings_name} has no results to compare"
+        for option_name, options in run_options.items():
+            try:
+                _assert_same_results(
+                    run_backtest(prices, entries, **settings, **options), serial_results
+                )
+            except AssertionError as e:
+                raise AssertionError(f"{settings_name} {option_name}: {e}") from e
+
+
+def test_packed_entries_match_bools():
+    # 1500 bars isn't a multiple of 64 so the last word is only partly used
+    prices, entries = make_prices_and_entries()
+    packed_entries = pack_entries(entries)
+    pd.testing.assert_frame_equal(unpack_entries(packed_entries, index=entries.index), entries)
+    for settings_name, settings in backtest_settings.items():
+        serial_results = run_backtest(prices, entries, **settings)
+        for option_name, options in {"serial": {}, **run_options}.items():
+            try:
+                _assert_same_results(
+                    run_backtest(prices, packed_entries, **settings, **options), serial_results
+                )
+            except AssertionError as e:
+                raise AssertionError(f"{settings_name} packed {option_name}: {e}") from e
+
+
+def test_packed_entries_bits_past_last_bar_raise():
+    prices, entries = make_prices_and_entries()
+    packed_entries = pack_entries(entries)
+    # bar 1500 + 20 doesn't exist, but its bit is there in the last word
+    packed_entries.iloc[-1, 0] = np.uint64(packed_entries.iloc[-1, 0]) | np.uint64(
+        1 << (prices.shape[0] % 64 + 20)
+    )
+    try:
+        run_backtest(prices, packed_entries, **backtest_settings["long_sl_tp"])
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("packed entries with bits past the last bar didn't raise")
+
+
+def _make_evals(
+    prices: pd.DataFrame,
+):
+    from quantfreedom.evaluators.evaluators import is_above, is_below
+
+    rng = np.random.default_rng(1)
+    symbols = list(prices.columns.levels[0])
+
+    def make_indicator(name, timeperiods):
+        columns = pd.MultiIndex.from_product(
+            [symbols, timeperiods], names=["symbol", f"{name}_timeperiod"]
+        )
+        return pd.DataFrame(
+            rng.normal(50, 20, (prices.shape[0], columns.size)),
+            index=prices.index,
+            columns=columns,
+        )
+
+    return (
+        is_above(make_indicator("rsi", [10, 14]), user_args=[55, 65]),
+        is_below(make_indicator("ema", [5, 9, 20]), user_args=[40]),
+    )
+
+
+def test_lazy_combined_entries_match_combine_evals():
+    # evaluators.py needs plotly for its plots
+    pytest.importorskip("plotly")
+    from quantfreedom.evaluators.evaluators import combine_evals
+
+    prices, _ = make_prices_and_entries()
+    first_evals, second_evals = _make_evals(prices)
+    combined_entries = combine_evals(first_evals, second_evals)
+    lazy_entries = {
+        "lazy": combine_evals(first_evals, second_evals, lazy=True),
+        "packed_lazy": combine_evals(first_evals, second_evals, lazy=True, packed=True),
+    }
+    pd.testing.assert_frame_equal(lazy_entries["lazy"].to_frame(), combined_entries)
+    pd.testing.assert_frame_equal(
+        lazy_entries["packed_lazy"].to_frame(),
+        pack_entries(combined_entries),
+        check_index_type=False,
+    )
+    for settings_name, settings in backtest_settings.items():
+        serial_results = run_backtest(prices, combined_entries, **settings)
+        assert len(serial_results[0]), f"{settings_name} has no results to compare"
+        for entries_name, entries in lazy_entries.items():
+            for option_name, options in {"serial": {}, **run_options}.items():
+                try:
+                    _assert_same_results(
+                        run_backtest(prices, entries, **settings, **options), serial_results
+                    )
+                except AssertionError as e:
+                    raise AssertionError(
+                        f"{settings_name} {entries_name} {option_name}: {e}"
+                    ) from e
+
+
+if __name__ == "__main__":
+    test_run_options_match_serial()
+    test_packed_entries_match_bools()
+    test_packed_entries_bits_past_last_bar_raise()
+    try:
+        test_lazy_combined_entries_match_combine_evals()
+    except pytest.skip.Exception as e:
+        print(f"skipped the lazy combined entries test, {e}")
+    print("backtest equality tests passed")
@@ -0,0 +1,268 @@
+"""
+The downloaders, sync and async, run against a fake exchange, so these check the cache, resuming an interrupted
+download and the retries without going to a real exchange.
+
+Run it with pytest or with python tests/test_data_dl.py
+"""
+
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import pandas as pd
+import pytest
+
+# so python tests/test_data_dl.py finds quantfreedom from a checkout too
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("ccxt")
+
+from quantfreedom.data import data_dl
+from quantfreedom.data.data_dl import data_download_from_ccxt, data_download_from_ccxt_async
+
+START = "2023-01-01T00:00:00Z"
+END = "2023-01-02T00:00:00Z"
+SYMBOLS = ["BTCUSDT", "ETHUSDT"]
+TIMEFRAME = "1m"
+TIMEFRAME_MS = 60_000
+BARS_PER_LOOP = 200
+
+
+class _FakeExchangeError(Exception):
+    pass
+
+
+class FakeExchange:
+    """
+    Answers fetch_ohlcv like bybit does, with the newest limit candles from since to
+    params["end"]. Every call and every candle it gives back gets counted, and it fails every
+    call after fail_after calls.
+    """
+
+    id = "fake"
+    rateLimit = 0
+
+    def __init__(
+        self,
+        fail_after: int = None,
+    ):
+        self.fail_after = fail_after
+        self.calls = 0
+        self.candles_sent = 0
+
+    def load_markets(self):
+        return {}
+
+    def _get_candle(
+        self,
+        symbol: str,
+        open_time: int,
+    ) -> list:
+        price = 100.0 * (SYMBOLS.index(symbol) + 1) + open_time / 1e9
+        return [open_time, price, price + 1, price - 1, price + 0.5, 10.0]
+
+    def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: int,
+        limit: int,
+        params: dict,
+    ) -> list:
+        self.calls += 1
+        if self.fail_after is not None and self.calls > self.fail_after:
+            raise _FakeExchangeError("fake exchange is down")
+        first = -(-since // TIMEFRAME_MS) * TIMEFRAME_MS
+        last = params["end"] // TIMEFRAME_MS * TIMEFRAME_MS
+        if last < first:
+            return []
+        first = max(first, last - (limit - 1) * TIMEFRAME_MS)
+        ohlcvs = [self._get_candle(symbol, t) for t in range(first, last + 1, TIMEFRAME_MS)]
+        self.candles_sent += len(ohlcvs)
+        return ohlcvs
+
+
+class AsyncFakeExchange(FakeExchange):
+    """
+    FakeExchange with the async methods of ccxt.async_support.
+    """
+
+    async def load_markets(self):
+        return {}
+
+    async def fetch_ohlcv(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: int,
+        limit: int,
+        params: dict,
+    ) -> list:
+        return FakeExchange.fetch_ohlcv(self, symbol, timeframe, since, limit, params)
+
+    async def close(self):
+        pass
+
+
+@contextlib.contextmanager
+def _set_module_value(
+    name: str,
+    value,
+):
+    old_value = getattr(data_dl, name)
+    setattr(data_dl, name, value)
+    try:
+        yield
+    finally:
+        setattr(data_dl, name, old_value)
+
+
+def _download(
+    exchange,
+    **kwargs,
+) -> pd.DataFrame:
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return data_download_from_ccxt(
+            exchange=exchange,
+            start=START,
+            end=END,
+            symbols=SYMBOLS,
+            timeframe=TIMEFRAME,
+            drop_volume=False,
+            bars_per_loop=BARS_PER_LOOP,
+            **kwargs,
+        )
+
+
+def _download_async(
+    exchange,
+    **kwargs,
+) -> pd.DataFrame:
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        return asyncio.run(
+            data_download_from_ccxt_async(
+                exchange=exchange,
+                start=START,
+                end=END,
+                symbols=SYMBOLS,
+                timeframe=TIMEFRAME,
+                drop_volume=False,
+                bars_per_loop=BARS_PER_LOOP,
+                **kwargs,
+            )
+        )
+
+
+def _assert_same_prices(
+    prices: pd.DataFrame,
+    expected_prices: pd.DataFrame,
+):
+    pd.testing.assert_frame_equal(prices, expected_prices, check_exact=True, check_freq=False)
+
+
+def _get_total_bars() -> int:
+    return (pd.Timestamp(END) - pd.Timestamp(START)) // pd.Timedelta(TIMEFRAME_MS, "ms") + 1
+
+
+def test_download_without_cache():
+    prices = _download(FakeExchange())
+    # the last candle gets dropped since it might not have closed yet
+    assert prices.shape == (_get_total_bars() - 1, len(SYMBOLS) * 5)
+    assert prices.index.is_monotonic_increasing and not prices.isna().any().any()
+
+
+def test_cache_is_reused():
+    expected_prices = _download(FakeExchange())
+    with tempfile.TemporaryDirectory() as cache_dir:
+        _assert_same_prices(_download(FakeExchange(), cache_dir=cache_dir), expected_prices)
+        exchange = FakeExchange()
+        _assert_same_prices(_download(exchange, cache_dir=cache_dir), expected_prices)
+        assert exchange.calls == 0, f"a cached download made {exchange.calls} requests"
+
+
+def test_interrupted_download_resumes():
+    expected_prices = _download(FakeExchange())
+    full_candles = len(SYMBOLS) * _get_total_bars()
+    with tempfile.TemporaryDirectory() as cache_dir, _set_module_value("CACHE_FLUSH_PAGES", 2):
+        try:
+            _download(FakeExchange(fail_after=5), cache_dir=cache_dir, max_retries=0)
+        except _FakeExchangeError:
+            pass
+        else:
+            raise AssertionError("the fake exchange didn't interrupt the download")
+
+        exchange = FakeExchange()
+        _assert_same_prices(_download(exchange, cache_dir=cache_dir), expected_prices)
+        # the 4 pages that were written to the cache before it died aren't downloaded again
+        assert (
+            exchange.candles_sent <= full_candles - 4 * BARS_PER_LOOP
+        ), f"resuming downloaded {exchange.candles_sent} of {full_candles} candles"
+
+
+def test_max_retries_raises():
+    exchange = FakeExchange(fail_after=0)
+    with _set_module_value("RETRY_BACKOFF_SECONDS", 0.0):
+        with pytest.raises(_FakeExchangeError):
+            _download(exchange, max_retries=2)
+    assert exchange.calls == 3, f"{exchange.calls} requests instead of 1 and 2 retries"
+
+
+def test_async_matches_sync():
+    expected_prices = _download(FakeExchange())
+    _assert_same_prices(_download_async(AsyncFakeExchange()), expected_prices)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        _assert_same_prices(
+            _download_async(AsyncFakeExchange(), cache_dir=cache_dir), expected_prices
+        )
+        # both use the same cache
+        exchange = FakeExchange()
+        _assert_same_prices(_download(exchange, cache_dir=cache_dir), expected_prices)
+        assert exchange.calls == 0, f"sync made {exchange.calls} requests after async"
+        exchange = AsyncFakeExchange()
+        _assert_same_prices(_download_async(exchange, cache_dir=cache_dir), expected_prices)
+        assert exchange.calls == 0, f"a cached async download made {exchange.calls} requests"
+
+
+def test_interrupted_async_download_resumes():
+    expected_prices = _download(FakeExchange())
+    full_candles = len(SYMBOLS) * _get_total_bars()
+    with tempfile.TemporaryDirectory() as cache_dir, _set_module_value("CACHE_FLUSH_PAGES", 2):
+        try:
+            # one request at a time so the pages it gets before it dies are always the same
+            _download_async(
+                AsyncFakeExchange(fail_after=5),
+                cache_dir=cache_dir,
+                max_retries=0,
+                max_concurrent_requests=1,
+            )
+        except _FakeExchangeError:
+            pass
+        else:
+            raise AssertionError("the fake exchange didn't interrupt the download")
+
+        exchange = AsyncFakeExchange()
+        _assert_same_prices(_download_async(exchange, cache_dir=cache_dir), expected_prices)
+        assert (
+            exchange.candles_sent <= full_candles - 4 * BARS_PER_LOOP
+        ), f"resuming downloaded {exchange.candles_sent} of {full_candles} candles"
+
+
+def test_async_max_retries_raises():
+    exchange = AsyncFakeExchange(fail_after=0)
+    with _set_module_value("RETRY_BACKOFF_SECONDS", 0.0):
+        with pytest.raises(_FakeExchangeError):
+            _download_async(exchange, max_retries=2, max_concurrent_requests=1)
+    assert exchange.calls == 3, f"{exchange.calls} requests instead of 1 and 2 retries"
+
+
+if __name__ == "__main__":
+    test_download_without_cache()
+    test_cache_is_reused()
+    test_interrupted_download_resumes()
+    test_max_retries_raises()
+    test_async_matches_sync()
+    test_interrupted_async_download_resumes()
+    test_async_max_retries_raises()
+    print("data download tests passed")
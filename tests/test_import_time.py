@@ -0,0 +1,60 @@
+"""
+import quantfreedom has to stay cheap enough to do in every backtest worker, so a bare import
+can't load any of the heavy packages and has to finish inside IMPORT_TIME_BUDGET seconds.
+
+Run it with pytest or with python tests/test_import_time.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# a bare import takes a few tens of milliseconds, loading numpy, pandas or numba takes far more
+IMPORT_TIME_BUDGET = 0.5
+
+HEAVY_MODULES = ("dash", "plotly", "ccxt", "talib", "numba")
+
+_import_script = f"""
+import json, sys, time
+start = time.perf_counter()
+import quantfreedom
+import_time = time.perf_counter() - start
+print(json.dumps(dict(
+    import_time=import_time,
+    loaded=[name for name in {HEAVY_MODULES!r} if name in sys.modules],
+)))
+"""
+
+
+def _import_quantfreedom() -> dict:
+    # a new interpreter every time so nothing is imported already
+    output = subprocess.run(
+        [sys.executable, "-c", _import_script],
+        cwd=REPO_DIR,
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def test_import_loads_no_heavy_modules():
+    loaded = _import_quantfreedom()["loaded"]
+    assert not loaded, f"import quantfreedom loaded {loaded}"
+
+
+def test_import_time_budget():
+    # the best of a few runs so a busy machine doesn't fail it
+    import_time = min(_import_quantfreedom()["import_time"] for _ in range(3))
+    assert (
+        import_time < IMPORT_TIME_BUDGET
+    ), f"import quantfreedom took {import_time:.3f}s, the budget is {IMPORT_TIME_BUDGET}s"
+
+
+if __name__ == "__main__":
+    test_import_loads_no_heavy_modules()
+    test_import_time_budget()
+    print("import time tests passed")
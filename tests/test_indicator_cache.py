@@ -0,0 +1,133 @@
+"""
+The indicator cache has to keep results up to max_bytes and throw out the least recently used
+ones first, find results saved in cache_dir from a fresh cache, count its hits and misses and
+never give back a result you can change.
+
+Run it with pytest or with python tests/test_indicator_cache.py
+"""
+
+import os
+import sys
+import tempfile
+import numpy as np
+import pytest
+
+# so python tests/test_indicator_cache.py finds quantfreedom from a checkout too
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# quantfreedom.indicators loads the talib indicators too
+pytest.importorskip("talib")
+
+from quantfreedom.indicators.cache import IndicatorCache, hash_arrays
+
+# 1000 floats are 8000 bytes
+RESULT_BYTES = 8000
+
+
+def _make_result(
+    value: float,
+) -> np.ndarray:
+    return np.full((500, 2), value)
+
+
+def _make_key(
+    value: float,
+) -> str:
+    return IndicatorCache.make_key("ema", hash_arrays(np.arange(10.0)), (value,))
+
+
+def _assert_read_only(
+    result: np.ndarray,
+):
+    assert not result.flags.writeable, "the cache gave back a result you can change"
+    with pytest.raises(ValueError):
+        result[0, 0] = -1.0
+
+
+def test_least_recently_used_get_thrown_out():
+    cache = IndicatorCache(max_bytes=3 * RESULT_BYTES)
+    keys = [_make_key(value) for value in range(4)]
+    for value, key in enumerate(keys[:3]):
+        cache.put(key, _make_result(value))
+    assert len(cache) == 3 and cache.nbytes == 3 * RESULT_BYTES
+
+    # getting the first one makes the second one the least recently used
+    assert np.array_equal(cache.get(keys[0]), _make_result(0))
+    cache.put(keys[3], _make_result(3))
+    assert len(cache) == 3 and cache.nbytes == 3 * RESULT_BYTES
+    assert cache.get(keys[1]) is None
+    for value in (0, 2, 3):
+        assert np.array_equal(cache.get(keys[value]), _make_result(value))
+    assert (cache.hits, cache.misses) == (4, 1), f"{cache.hits} hits {cache.misses} misses"
+
+    # putting a key again replaces its result without counting its bytes twice
+    cache.put(keys[3], _make_result(30))
+    assert len(cache) == 3 and cache.nbytes == 3 * RESULT_BYTES
+    assert np.array_equal(cache.get(keys[3]), _make_result(30))
+
+    # a result bigger than max_bytes isn't kept and doesn't throw anything out
+    cache.put(_make_key(4), np.zeros((4, RESULT_BYTES)))
+    assert len(cache) == 3 and cache.nbytes == 3 * RESULT_BYTES
+    assert cache.get(_make_key(4)) is None
+
+    cache.clear()
+    assert (len(cache), cache.nbytes, cache.hits, cache.misses) == (0, 0, 0, 0)
+
+
+def test_cache_dir_round_trip():
+    keys = [_make_key(value) for value in range(3)]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # nothing kept in memory so everything comes from the files
+        cache = IndicatorCache(max_bytes=0, cache_dir=cache_dir)
+        for value, key in enumerate(keys):
+            cache.put(key, _make_result(value))
+        assert len(cache) == 0 and cache.nbytes == 0
+        assert sorted(os.listdir(cache_dir)) == sorted(f"{key}.npy" for key in keys)
+
+        fresh_cache = IndicatorCache(max_bytes=2 * RESULT_BYTES, cache_dir=cache_dir)
+        for value, key in enumerate(keys):
+            result = fresh_cache.get(key)
+            assert np.array_equal(result, _make_result(value))
+            _assert_read_only(result)
+        assert fresh_cache.get(_make_key(3)) is None
+        assert (fresh_cache.hits, fresh_cache.misses) == (3, 1)
+        # what was read from the files is kept in memory up to max_bytes too
+        assert len(fresh_cache) == 2 and fresh_cache.nbytes == 2 * RESULT_BYTES
+
+        fresh_cache.clear(disk=True)
+        assert os.listdir(cache_dir) == []
+        assert IndicatorCache(cache_dir=cache_dir).get(keys[0]) is None
+
+
+def test_results_are_read_only():
+    cache = IndicatorCache()
+    result = _make_result(1.0)
+    cache.put(_make_key(1), result)
+    _assert_read_only(cache.get(_make_key(1)))
+    # the array that was put in stays yours to change when it had to be copied
+    fortran_result = np.asfortranarray(_make_result(2.0))
+    cache.put(_make_key(2), fortran_result)
+    fortran_result[0, 0] = -1.0
+    cached_result = cache.get(_make_key(2))
+    _assert_read_only(cached_result)
+    assert np.array_equal(cached_result, _make_result(2.0))
+
+
+def test_make_key():
+    inputs_hash = hash_arrays(np.arange(10.0))
+    assert IndicatorCache.make_key("ema", inputs_hash, (14,)) == IndicatorCache.make_key(
+        "EMA", inputs_hash, (14,)
+    )
+    assert IndicatorCache.make_key("ema", inputs_hash, (14,)) != IndicatorCache.make_key(
+        "ema", inputs_hash, (15,)
+    )
+    assert hash_arrays(np.arange(10.0)) != hash_arrays(np.arange(10))
+    assert hash_arrays(np.arange(10.0)) != hash_arrays(np.arange(10.0).reshape(2, 5))
+
+
+if __name__ == "__main__":
+    test_least_recently_used_get_thrown_out()
+    test_cache_dir_round_trip()
+    test_results_are_read_only()
+    test_make_key()
+    print("indicator cache tests passed")
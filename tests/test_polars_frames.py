@@ -0,0 +1,130 @@
+"""
+Polars frames have to turn into exactly the pandas frames they came from, in the wide and the
+long layout, and backtest_df_only has to give the same results for both.
+
+Run it with pytest or with python tests/test_polars_frames.py
+"""
+
+import numpy as np
+import pandas as pd
+import polars as pl
+
+from backtest_data import backtest_settings, make_prices_and_entries, run_backtest
+from quantfreedom.utils.polars_frames import pandas_to_polars, polars_to_pandas
+
+
+def _make_timed_prices_and_entries(
+    total_bars: int = 1500,
+):
+    prices, entries = make_prices_and_entries(total_bars=total_bars)
+    prices.index = pd.date_range(
+        "2024-01-01", periods=total_bars, freq="min", name="open_time"
+    )
+    entries.index = prices.index
+    return prices, entries
+
+
+def _assert_same_frame(
+    frame: pd.DataFrame,
+    expected_frame: pd.DataFrame,
+):
+    pd.testing.assert_frame_equal(frame, expected_frame, check_exact=True, check_freq=False)
+
+
+def test_round_trip():
+    prices, entries = _make_timed_prices_and_entries()
+    for layout in ("wide", "long"):
+        for frame in (prices, entries):
+            back = polars_to_pandas(pandas_to_polars(frame, layout=layout))
+            _assert_same_frame(back, frame)
+            assert back.values.flags.f_contiguous, f"{layout} values aren't fortran ordered"
+        assert polars_to_pandas(pandas_to_polars(entries, layout=layout)).values.dtype == np.bool_
+
+
+def test_round_trip_keeps_level_types():
+    # strings that look like numbers have to stay strings and numbers have to stay numbers
+    columns = pd.MultiIndex.from_tuples(
+        [
+            (symbol, timeperiod, ma_type)
+            for symbol in ("1000", "inf")
+            for timeperiod, ma_type in ((14, "nan"), (14, "14"), (21, '"quoted"'))
+        ],
+        names=["symbol", "ema_timeperiod", "ma_type"],
+    )
+    frame = pd.DataFrame(np.arange(12.0).reshape(2, 6), columns=columns)
+    for layout in ("wide", "long"):
+        back = polars_to_pandas(pandas_to_polars(frame, layout=layout))
+        assert back.columns.tolist() == columns.tolist(), f"{layout}: {back.columns.tolist()}"
+        symbol, timeperiod, ma_type = back.columns[0]
+        assert isinstance(symbol, str) and isinstance(ma_type, str), layout
+        assert isinstance(timeperiod, (int, np.integer)), layout
+
+
+def test_long_frames_get_sorted():
+    prices, _ = _make_timed_prices_and_entries(total_bars=50)
+    shuffled = pandas_to_polars(prices, layout="long").sample(
+        fraction=1.0, shuffle=True, seed=1
+    )
+    _assert_same_frame(polars_to_pandas(shuffled), prices)
+
+
+def test_misaligned_long_frames_raise():
+    prices, _ = _make_timed_prices_and_entries(total_bars=50)
+    long_prices = pandas_to_polars(prices, layout="long")
+    other_symbol = long_prices.filter(pl.col("symbol") == "S1")
+    # S1 misses a bar and has an extra one at the end, so it has the right number of rows
+    extra_bar = other_symbol.tail(1).with_columns(
+        (pl.col("open_time") + pl.duration(minutes=1)).cast(long_prices.schema["open_time"])
+    )
+    misaligned = pl.concat(
+        [
+            long_prices.filter(pl.col("symbol") == "S0"),
+            other_symbol.filter(pl.col("open_time") != other_symbol["open_time"][5]),
+            extra_bar,
+        ]
+    )
+    try:
+        polars_to_pandas(misaligned)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("misaligned long frame didn't raise")
+
+    try:
+        polars_to_pandas(long_prices.head(long_prices.height - 1))
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("long frame with a missing row didn't raise")
+
+
+def test_backtest_polars_matches_pandas():
+    prices, entries = _make_timed_prices_and_entries()
+    for layout in ("wide", "long"):
+        polars_prices = pandas_to_polars(prices, layout=layout)
+        polars_entries = pandas_to_polars(entries, layout=layout)
+        for settings_name, settings in backtest_settings.items():
+            strat_results, settings_results = run_backtest(prices, entries, **settings)
+            polars_results = run_backtest(polars_prices, polars_entries, **settings)
+            assert all(isinstance(results, pl.DataFrame) for results in polars_results)
+            polars_strat_results, _ = run_backtest(
+                polars_prices, polars_entries, return_type="pandas", **settings
+            )
+            _assert_same_frame(polars_strat_results, strat_results)
+            # the polars frames have the rows of the pandas frame in the same order
+            for col in ("gains_pct", "to_the_upside", "total_trades"):
+                assert np.array_equal(
+                    polars_results[0].get_column(col).to_numpy(),
+                    strat_results[col].to_numpy(dtype=np.float_),
+                    equal_nan=True,
+                ), f"{layout} {settings_name} {col}"
+            assert polars_results[1].height == len(strat_results), settings_name
+
+
+if __name__ == "__main__":
+    test_round_trip()
+    test_round_trip_keeps_level_types()
+    test_long_frames_get_sorted()
+    test_misaligned_long_frames_raise()
+    test_backtest_polars_matches_pandas()
+    print("polars frame tests passed")
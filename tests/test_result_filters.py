@@ -0,0 +1,80 @@
+"""
+Filtering the results inside the backtest with result_filters has to give back exactly the
+rows you get by backtesting everything and masking the results yourself.
+
+Run it with pytest or with python tests/test_result_filters.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from backtest_data import backtest_settings, make_prices_and_entries, run_backtest
+from quantfreedom.enums.enums import ResultFilterOp, ResultMetric
+
+_ops = {
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+result_filters_list = [
+    [("win_rate", ">=", 30.0)],
+    [("max_drawdown_pct", "<", 25.0), ("profit_factor", ">", 0.6)],
+    [
+        (ResultMetric.total_trades, ResultFilterOp.GreaterThanOrEqual, 30.5),
+        ("sharpe_ratio", ">", -0.3),
+    ],
+    [("total_trades", ">", 20), ("max_drawdown_pct", "<=", 30.0), ("avg_r", "<", 0.1)],
+    [("expectancy", ">", 1e9)],
+]
+
+
+def _get_mask(
+    strat_results: pd.DataFrame,
+    result_filters: list,
+) -> np.ndarray:
+    mask = np.ones(len(strat_results), dtype=np.bool_)
+    for metric, op, threshold in result_filters:
+        if not isinstance(metric, str):
+            metric = ResultMetric._fields[metric]
+        if not isinstance(op, str):
+            op = list(_ops)[op]
+        # nan fails every filter, like it does in the kernel
+        mask &= _ops[op](strat_results[metric].values.astype(np.float_), threshold)
+    return mask
+
+
+def test_result_filters_match_masking():
+    prices, entries = make_prices_and_entries()
+    for settings_name, settings in backtest_settings.items():
+        all_results, all_settings = run_backtest(prices, entries, **settings)
+        for result_filters in result_filters_list:
+            expected_results = all_results[_get_mask(all_results, result_filters)]
+            for parallel in (False, True):
+                name = f"{settings_name} {result_filters} parallel={parallel}"
+                strat_results, settings_results = run_backtest(
+                    prices,
+                    entries,
+                    result_filters=result_filters,
+                    parallel=parallel,
+                    **settings,
+                )
+                pd.testing.assert_frame_equal(
+                    strat_results.reset_index(drop=True),
+                    expected_results.reset_index(drop=True),
+                    check_dtype=len(expected_results) > 0,
+                    obj=name,
+                )
+                if not len(expected_results):
+                    continue
+                # the settings of every strat row are the column its index points to
+                assert np.array_equal(
+                    settings_results[list(strat_results.index)].astype(str).values,
+                    all_settings[list(expected_results.index)].astype(str).values,
+                ), f"{name}: settings don't match"
+
+
+if __name__ == "__main__":
+    test_result_filters_match_masking()
+    print("result filter tests passed")
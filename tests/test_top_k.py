@@ -0,0 +1,72 @@
+"""
+The top k collector has to keep the same strategies you get by backtesting everything and
+sorting the results yourself.
+
+Run it with pytest or with python tests/test_top_k.py
+"""
+
+import numpy as np
+
+from backtest_data import backtest_settings, make_prices_and_entries, run_backtest
+from quantfreedom.enums.enums import ResultMetric
+
+TOP_K = 5
+
+top_k_metrics = (
+    "to_the_upside",
+    "gains_pct",
+    "win_rate",
+    "sharpe_ratio",
+    "max_drawdown_pct",
+    "longest_losing_streak",
+)
+
+# lower is better for these so the top k are the smallest
+_lower_is_better = ("max_drawdown_pct", "max_drawdown_bars", "longest_losing_streak")
+
+
+def _get_top_k_keys(
+    metric_values: np.ndarray,
+    metric_name: str,
+) -> np.ndarray:
+    keys = np.asarray(metric_values, dtype=np.float_)
+    if metric_name in _lower_is_better:
+        keys = -keys
+    return np.where(np.isnan(keys), -np.inf, keys)
+
+
+def _get_rows(strat_results) -> set:
+    # as strings so rows with a nan in them still match
+    return set(strat_results.astype(str).itertuples(index=False, name=None))
+
+
+def test_top_k_matches_brute_force_sort():
+    prices, entries = make_prices_and_entries()
+    for settings_name, settings in backtest_settings.items():
+        all_results = run_backtest(prices, entries, **settings)[0]
+        assert len(all_results) > TOP_K, f"{settings_name} has too few results to compare"
+        all_rows = _get_rows(all_results)
+        for metric_name in top_k_metrics:
+            all_keys = _get_top_k_keys(all_results[metric_name].values, metric_name)
+            expected_keys = np.sort(all_keys)[::-1][:TOP_K]
+            for parallel in (False, True):
+                top_k_results = run_backtest(
+                    prices,
+                    entries,
+                    top_k=TOP_K,
+                    top_k_metric=getattr(ResultMetric, metric_name),
+                    parallel=parallel,
+                    **settings,
+                )[0]
+                name = f"{settings_name} {metric_name} parallel={parallel}"
+                top_k_keys = _get_top_k_keys(top_k_results[metric_name].values, metric_name)
+                assert np.array_equal(
+                    np.sort(top_k_keys)[::-1], expected_keys
+                ), f"{name}: top k {top_k_keys} isn't {expected_keys}"
+                # ties can keep a different one of the tied strategies, but only real ones
+                assert _get_rows(top_k_results) <= all_rows, f"{name}: made up results"
+
+
+if __name__ == "__main__":
+    test_top_k_matches_brute_force_sort()
+    print("top k tests passed")